@@ -0,0 +1,154 @@
+# Copyright 2021 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Compares the size and drawing time of default and compact path data.
+
+Draws every symbol of a synthetic font, and of an SVG per icon, see
+synthetic.py, with the default path data and with --path_precision at each
+of --precisions. Reports the bytes of all symbols, the best time of --runs,
+and how far the farthest point of the compact paths is from where the
+default paths put it, which must stay within half a unit in the last
+decimal place.
+
+Usage:
+python benchmarks/compact_paths.py --icons 300 --svgs 100 --precisions 1,2,3
+"""
+import argparse
+import io
+import re
+import tempfile
+import time
+
+import regex
+import synthetic
+from fontTools import ttLib
+from fontTools.pens.recordingPen import RecordingPen
+from fontTools.svgLib.path import parse_path
+from vf2symbols import batch
+from vf2symbols import icon_font
+from vf2symbols import variants
+
+_PATH_DATA = re.compile(r' d="([^"]*)"')
+
+
+def _points(d, precision):
+    # Drops points at the same rounded place as the last, as compact paths do
+    pen = RecordingPen()
+    parse_path(d, pen)
+    points = []
+    last = None
+    for _, pts in pen.value:
+        for pt in pts:
+            rounded = (round(pt[0], precision), round(pt[1], precision))
+            if rounded != last:
+                points.append(pt)
+            last = rounded
+    return points
+
+
+def _max_error(default_svgs, compact_svgs, precision):
+    """How far the farthest compact point is from its default, inf if any differ."""
+    error = 0.0
+    for default_svg, compact_svg in zip(default_svgs, compact_svgs):
+        for default_d, compact_d in zip(
+            _PATH_DATA.findall(default_svg), _PATH_DATA.findall(compact_svg)
+        ):
+            expected = _points(default_d, precision)
+            actual = _points(compact_d, precision)
+            if len(actual) != len(expected):
+                return float("inf")
+            for (x0, y0), (x1, y1) in zip(expected, actual):
+                error = max(error, abs(x1 - x0), abs(y1 - y0))
+    return error
+
+
+def _time(render_fn, runs):
+    best = None
+    for _ in range(runs):
+        start = time.perf_counter()
+        svgs = render_fn()
+        seconds = time.perf_counter() - start
+        best = seconds if best is None else min(best, seconds)
+    return best, svgs
+
+
+def _report(name, render_fn, precisions, runs):
+    seconds, default = _time(lambda: render_fn(None), runs)
+    size = sum(len(svg) for svg in default)
+    print(f"{name}: {len(default)} symbols")
+    print(f"  {'default':>12} {size:>10} bytes {seconds:8.2f}s")
+    for precision in precisions:
+        compact_seconds, compact = _time(lambda: render_fn(precision), runs)
+        compact_size = sum(len(svg) for svg in compact)
+        print(
+            f"  {f'precision {precision}':>12} {compact_size:>10} bytes "
+            f"{compact_seconds:8.2f}s {compact_size / size - 1:+7.1%} size, "
+            f"max error {_max_error(default, compact, precision):.2g}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--icons", type=int, default=300)
+    parser.add_argument("--svgs", type=int, default=100)
+    parser.add_argument("--points", type=int, default=24)
+    parser.add_argument(
+        "--precisions", type=lambda s: [int(p) for p in s.split(",")], default=[1, 2, 3]
+    )
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    buf = io.BytesIO()
+    synthetic.build_font(args.icons, points=args.points).save(buf)
+    buf.seek(0)
+    ttfont = ttLib.TTFont(buf)
+    instances = batch.load_variable_instances(
+        ttfont,
+        variants.symbol_locations(
+            variants.plan(ttfont, icon_font.wght_range(ttfont), variants.SYMBOL_SCALES)
+        ),
+    )
+    icon_names = list(
+        next(iter(instances.values())).font_index.extract_icon_names(
+            regex.compile(".*")
+        )
+    )
+    _report(
+        "vf2symbols",
+        lambda precision: [
+            svg
+            for _, svg in batch.render_symbols(
+                instances, icon_names, path_precision=precision
+            )
+        ],
+        args.precisions,
+        args.runs,
+    )
+
+    with tempfile.TemporaryDirectory() as svg_dir:
+        svg_files = synthetic.write_svgs(args.svgs, svg_dir, points=args.points)
+        _report(
+            "svg2symbols",
+            lambda precision: [
+                svg
+                for _, svg in batch.render_svg_symbols(
+                    svg_files, path_precision=precision
+                )
+            ],
+            args.precisions,
+            args.runs,
+        )
+
+
+if __name__ == "__main__":
+    main()
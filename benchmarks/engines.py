@@ -0,0 +1,76 @@
+# Copyright 2021 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Compares the ninja and inprocess vf2symbols engines on a synthetic font.
+
+Usage:
+python benchmarks/engines.py --icons 300
+"""
+import argparse
+import filecmp
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import synthetic
+
+
+def _run_engine(font_file, build_dir, engine):
+    start = time.perf_counter()
+    subprocess.run(
+        [
+            sys.executable,
+            "-m",
+            "vf2symbols.vf2symbols",
+            f"--build_dir={build_dir}",
+            f"--engine={engine}",
+            font_file,
+        ],
+        check=True,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--icons", type=int, default=300)
+    parser.add_argument("--points", type=int, default=24)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        font_file = os.path.join(temp_dir, "Synthetic-VF.ttf")
+        synthetic.build_font(args.icons, points=args.points).save(font_file)
+
+        times = {}
+        for engine in ("ninja", "inprocess"):
+            build_dir = os.path.join(temp_dir, engine)
+            times[engine] = _run_engine(font_file, build_dir, engine)
+            print(f"{engine:>10} {times[engine]:8.2f}s")
+
+        symbols = sorted(os.listdir(os.path.join(temp_dir, "ninja", "symbols")))
+        _, mismatch, errors = filecmp.cmpfiles(
+            os.path.join(temp_dir, "ninja", "symbols"),
+            os.path.join(temp_dir, "inprocess", "symbols"),
+            symbols,
+            shallow=False,
+        )
+        print(f"{len(symbols)} symbols, {len(mismatch) + len(errors)} differ")
+        print(f"inprocess is {times['ninja'] / times['inprocess']:.1f}x faster")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+# Copyright 2021 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Times getting icon outlines at the nine symbol weights.
+
+Compares a saved instance font per weight, as the ninja build makes, with
+vf2symbols.outlines computing outlines straight from gvar.
+
+Usage:
+python benchmarks/instancing.py --icons 3000
+"""
+import argparse
+import io
+import re
+import time
+
+import synthetic
+from fontTools import ttLib
+from fontTools.pens.recordingPen import RecordingPen
+from fontTools.varLib import instancer
+from vf2symbols import icon_font
+from vf2symbols import outlines
+
+_WEIGHTS = (100, 200, 300, 400, 500, 600, 700, 800, 900)
+
+
+def _draw_all(glyph_set, glyph_names):
+    pens = []
+    for glyph_name in glyph_names:
+        pen = RecordingPen()
+        glyph_set[glyph_name].draw(pen)
+        pens.append(pen.value)
+    return pens
+
+
+def _instance_fonts(ttfont, glyph_names):
+    drawn, size = [], 0
+    for wght in _WEIGHTS:
+        buf = io.BytesIO()
+        instancer.instantiateVariableFont(ttfont, {"wght": wght}).save(buf)
+        size += buf.tell()
+        buf.seek(0)
+        drawn.append(_draw_all(ttLib.TTFont(buf).getGlyphSet(), glyph_names))
+    return drawn, size
+
+
+def _gvar_outlines(ttfont, glyph_names):
+    glyph_outlines = outlines.GlyphOutlines(ttfont, [{"wght": w} for w in _WEIGHTS])
+    return [_draw_all(gs, glyph_names) for gs in glyph_outlines.glyph_sets()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--icons", type=int, default=3000)
+    parser.add_argument("--points", type=int, default=24)
+    parser.add_argument(
+        "--icon_filter", default="", help="Only draw icons matching this regex."
+    )
+    args = parser.parse_args()
+
+    buf = io.BytesIO()
+    synthetic.build_font(args.icons, points=args.points).save(buf)
+    font_data = buf.getvalue()
+    font_index = icon_font.IconFontIndex.build(ttLib.TTFont(io.BytesIO(font_data)))
+    glyph_names = sorted(
+        {
+            font_index.resolve_ligature(n)
+            for n in font_index.extract_icon_names(re.compile(args.icon_filter))
+        }
+    )
+
+    start = time.perf_counter()
+    expected, size = _instance_fonts(ttLib.TTFont(io.BytesIO(font_data)), glyph_names)
+    instance_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    actual = _gvar_outlines(ttLib.TTFont(io.BytesIO(font_data)), glyph_names)
+    gvar_time = time.perf_counter() - start
+
+    assert actual == expected, "Outlines differ"
+    print(f"{len(glyph_names)} glyphs at {len(_WEIGHTS)} weights")
+    print(f"  instance fonts  {instance_time:8.2f}s, {size / 2**20:.1f} MiB written")
+    print(f"  gvar outlines   {gvar_time:8.2f}s, nothing written")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+# Copyright 2021 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Times resolving every icon of a large font to its ligature glyph.
+
+Compares the original per call cmap and GSUB walk with IconFontIndex.
+
+Usage:
+python benchmarks/ligatures.py --icons 3000
+"""
+import argparse
+import os
+import pickle
+import re
+import tempfile
+import time
+
+import synthetic
+from fontTools import ttLib
+from vf2symbols import icon_font
+
+
+def _old_resolve_ligature(ttfont, icon_name):
+    # icon_font.resolve_ligature before IconFontIndex
+    cmap = icon_font._cmap(ttfont)
+    rev_cmap = {v: k for k, v in icon_font._cmap(ttfont).items()}
+    first_glyph_name = cmap[ord(icon_name[0])]
+    rest_of_glyph_names = [cmap[ord(c)] for c in icon_name[1:]]
+    ligatures = icon_font._ligature_roots(ttfont)[first_glyph_name]
+    return next(
+        filter(lambda l: l.Component == rest_of_glyph_names, ligatures)
+    ).LigGlyph
+
+
+def _time(fn):
+    start = time.perf_counter()
+    result = fn()
+    return time.perf_counter() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--icons", type=int, default=3000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        font_file = os.path.join(temp_dir, "Synthetic-VF.ttf")
+        synthetic.build_font(args.icons).save(font_file)
+        ttfont = ttLib.TTFont(font_file)
+        font_index = icon_font.IconFontIndex.build(ttfont)
+        icon_names = list(font_index.extract_icon_names(re.compile("")))
+
+        old_time, old = _time(
+            lambda: [_old_resolve_ligature(ttfont, n) for n in icon_names]
+        )
+        build_time, font_index = _time(
+            lambda: icon_font.IconFontIndex.build(ttLib.TTFont(font_file))
+        )
+        new_time, new = _time(
+            lambda: [font_index.resolve_ligature(n) for n in icon_names]
+        )
+        assert old == new
+
+        index_file = os.path.join(temp_dir, "index.pickle")
+        icon_font.IconFontIndex.load_or_build(font_file, index_file)
+        load_time, _ = _time(
+            lambda: icon_font.IconFontIndex.load_or_build(font_file, index_file)
+        )
+
+    print(f"{len(icon_names)} icons")
+    print(f"  old resolve_ligature  {old_time * 1000:10.1f}ms")
+    print(f"  IconFontIndex.build   {build_time * 1000:10.1f}ms")
+    print(f"  index lookups         {new_time * 1000:10.1f}ms")
+    print(f"  load pickled index    {load_time * 1000:10.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
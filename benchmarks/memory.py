@@ -0,0 +1,79 @@
+# Copyright 2021 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Peak RSS of vf2symbols --engine=inprocess as the icon count grows.
+
+For synthetic fonts of increasing size, runs vf2symbols with --max_memory_mb
+and with a budget big enough to keep every glyph, reporting the peak RSS and
+time of each.
+
+Usage:
+python benchmarks/memory.py --icons 500,1000,2000,3000 --max_memory_mb 16
+"""
+import argparse
+import os
+import re
+import subprocess
+import sys
+import tempfile
+
+import synthetic
+
+_UNBOUNDED_MB = 2**20
+
+
+def _run(font_file, build_dir, max_memory_mb):
+    stdout = subprocess.run(
+        [
+            sys.executable,
+            "-m",
+            "vf2symbols.vf2symbols",
+            "--engine=inprocess",
+            "--nocache",
+            f"--build_dir={build_dir}",
+            f"--max_memory_mb={max_memory_mb}",
+            font_file,
+        ],
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+    match = re.search(r"in ([\d.]+)s, peak RSS (\d+)MB", stdout)
+    return float(match.group(1)), int(match.group(2))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--icons", default="500,1000,2000,3000")
+    parser.add_argument("--points", type=int, default=24)
+    parser.add_argument("--max_memory_mb", type=int, default=16)
+    args = parser.parse_args()
+
+    print(f"{'icons':>6} {'font':>8} {'bounded':>16} {'unbounded':>16}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for icon_count in (int(n) for n in args.icons.split(",")):
+            font_file = os.path.join(tmp, f"Synthetic-{icon_count}.ttf")
+            synthetic.build_font(icon_count, points=args.points, opsz=True).save(
+                font_file
+            )
+            build_dir = os.path.join(tmp, f"build-{icon_count}")
+            bounded = _run(font_file, build_dir, args.max_memory_mb)
+            unbounded = _run(font_file, build_dir, _UNBOUNDED_MB)
+            print(
+                f"{icon_count:6d} {os.path.getsize(font_file) / 2**20:7.1f}M "
+                + " ".join(f"{mb:7d}MB {s:6.1f}s" for s, mb in (bounded, unbounded))
+            )
+
+
+if __name__ == "__main__":
+    main()
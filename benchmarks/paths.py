@@ -0,0 +1,89 @@
+# Copyright 2021 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Times making SVG path data for every icon of a font with dense outlines.
+
+Compares drawing through TransformPen and SVGPathPen, as Symbol used to,
+with vf2symbols.path_data. The latter records what the glyphs of a font's
+glyph set draw, and reads glyphs of a vf2symbols.outlines glyph set as
+arrays.
+
+Usage:
+python benchmarks/paths.py --icons 200 --points 400
+"""
+import argparse
+import io
+import time
+
+import synthetic
+from fontTools import ttLib
+from fontTools.pens.svgPathPen import SVGPathPen
+from fontTools.pens.transformPen import TransformPen
+from picosvg.geometric_types import Rect
+from vf2symbols import outlines
+from vf2symbols import path_data
+from vf2symbols.symbol import Symbol
+
+
+def _pen_path_data(glyph, glyph_set, transform):
+    svg_pen = SVGPathPen(glyph_set)
+    glyph.draw(TransformPen(svg_pen, transform))
+    return " ".join(svg_pen._commands)
+
+
+def _time(fn, glyphs):
+    start = time.perf_counter()
+    result = [fn(g) for g in glyphs]
+    return time.perf_counter() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--icons", type=int, default=200)
+    parser.add_argument("--points", type=int, default=400)
+    args = parser.parse_args()
+
+    buf = io.BytesIO()
+    synthetic.build_font(args.icons, points=args.points).save(buf)
+    buf.seek(0)
+    ttfont = ttLib.TTFont(buf)
+    icon_names = [n for n in ttfont.getGlyphOrder() if n.startswith("icon")]
+    upem = ttfont["head"].unitsPerEm
+    transform = Symbol()._build_transformation("Regular-M", Rect(0, upem, upem, -upem))
+
+    print(f"{len(icon_names)} icons, ~{args.points} points each")
+    regular = outlines.GlyphOutlines(ttfont, [{"wght": 400}])
+    glyph_sets = {
+        "TTFont.getGlyphSet": ttfont.getGlyphSet(),
+        "OutlineGlyphSet": regular.glyph_sets()[0],
+    }
+    for name, glyph_set in glyph_sets.items():
+        glyphs = [glyph_set[n] for n in icon_names]
+        # Don't time decoding glyphs
+        _time(lambda g: _pen_path_data(g, glyph_set, transform), glyphs)
+
+        pen_time, expected = _time(
+            lambda g: _pen_path_data(g, glyph_set, transform), glyphs
+        )
+        fast_time, actual = _time(
+            lambda g: path_data.svg_path_data(g, glyph_set, transform), glyphs
+        )
+        assert actual == expected
+
+        print(f"  {name}")
+        print(f"    TransformPen + SVGPathPen  {pen_time * 1000:8.1f}ms")
+        print(f"    path_data                  {fast_time * 1000:8.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+# Copyright 2021 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Times importing each vf2symbols entry point, per python -X importtime.
+
+Reports the best of several runs of the entry module's cumulative import
+time, the wall time of running it with --help, and the slowest modules it
+imports directly.
+
+Usage:
+python benchmarks/startup.py --runs 5
+"""
+import argparse
+import subprocess
+import sys
+import time
+
+ENTRY_POINTS = (
+    "vf2symbols.vf2symbols",
+    "vf2symbols.svg2symbols",
+    "vf2symbols.write_symbol_from_fonts",
+    "vf2symbols.write_symbol_from_svg",
+    "vf2symbols.write_symbol_from_svgs",
+    "vf2symbols.client",
+)
+
+
+def import_times(module):
+    """(nesting level, module, cumulative microseconds) for each import.
+
+    The module itself is level 0, what it imports level 1 and so on.
+    """
+    stderr = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stderr
+    times = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        _, cumulative, name = line.split("|")
+        if not cumulative.strip().isdigit():
+            continue  # the header
+        level = (len(name) - len(name.lstrip()) - 1) // 2
+        times.append((level, name.strip(), int(cumulative)))
+    return times
+
+
+def _total(times, module):
+    return next(us for _, name, us in times if name == module)
+
+
+def _help_seconds(module):
+    start = time.perf_counter()
+    # absl exits 1 after printing help
+    subprocess.run([sys.executable, "-m", module, "--help"], capture_output=True)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=5)
+    args = parser.parse_args()
+
+    for module in ENTRY_POINTS:
+        runs = [import_times(module) for _ in range(args.runs)]
+        best = min(runs, key=lambda t: _total(t, module))
+        help_seconds = min(_help_seconds(module) for _ in range(args.runs))
+        direct = sorted(
+            ((us, name) for level, name, us in best if level == 1), reverse=True
+        )
+
+        print(f"{module}")
+        print(f"  import     {_total(best, module) / 1000:8.1f}ms")
+        print(f"  --help     {help_seconds * 1000:8.1f}ms")
+        for us, name in direct[: args.top]:
+            print(f"    {name:28} {us / 1000:8.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,224 @@
+# Copyright 2021 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Times vf2symbols and svg2symbols end to end, and by stage, as JSON.
+
+Generates a synthetic variable icon font and an SVG per icon, see
+synthetic.py, then runs each pipeline several times from a cold build dir,
+without the symbol cache. Keeps the best wall time of each case along with
+the stage timings and counters --profile reported for that run.
+
+Results go to benchmarks/results/<commit>.json by default. Pass --compare
+with the results of another commit to print the change of each case and
+stage, exiting 1 if any case got slower than --threshold.
+
+Usage:
+python benchmarks/suite.py --icons 300 --svgs 100
+python benchmarks/suite.py --compare benchmarks/results/1a2b3c4.json
+"""
+import argparse
+import datetime
+import glob
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+import synthetic
+
+_RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+
+def _git(*args):
+    try:
+        return subprocess.run(
+            ["git", *args],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            check=True,
+            capture_output=True,
+            text=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _run(argv, build_dir, clean):
+    """Seconds to run argv from clean(), and what --profile reported."""
+    profile_file = os.path.join(build_dir, "profile.json")
+    clean()
+    start = time.perf_counter()
+    subprocess.run(
+        [sys.executable, "-m", *argv, f"--profile={profile_file}"],
+        check=True,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    seconds = time.perf_counter() - start
+    with open(profile_file) as f:
+        return seconds, json.load(f)
+
+
+def _case(runs, argv, build_dir, clean=lambda: None):
+    results = [_run(argv, build_dir, clean) for _ in range(runs)]
+    seconds, profile = min(results, key=lambda r: r[0])
+    return {
+        "seconds": round(seconds, 4),
+        "runs": [round(s, 4) for s, _ in results],
+        "stages": profile["stages"],
+        "counters": profile["counters"],
+    }
+
+
+def run_suite(args, temp_dir):
+    font_file = os.path.join(temp_dir, "Synthetic-VF.ttf")
+    synthetic.build_font(
+        args.icons, points=args.points, opsz=args.opsz, wght=args.wght
+    ).save(font_file)
+    svg_dir = os.path.join(temp_dir, "svgs")
+    svg_files = synthetic.write_svgs(args.svgs, svg_dir, points=args.points)
+
+    cases = {}
+    for engine in ("inprocess", "ninja"):
+        build_dir = os.path.join(temp_dir, f"vf-{engine}")
+        argv = [
+            "vf2symbols.vf2symbols",
+            f"--engine={engine}",
+            f"--jobs={args.jobs}",
+            f"--build_dir={build_dir}",
+            "--nocache",
+            font_file,
+        ]
+        cases[f"vf2symbols_{engine}"] = _case(
+            args.runs,
+            argv,
+            build_dir,
+            lambda: shutil.rmtree(build_dir, ignore_errors=True),
+        )
+        if engine == "ninja":
+            # Nothing changed since the last run
+            cases["vf2symbols_ninja_noop"] = _case(args.runs, argv, build_dir)
+
+    for engine in ("inprocess", "ninja"):
+        build_dir = os.path.join(temp_dir, f"svg-{engine}")
+        os.makedirs(build_dir)
+        argv = [
+            "vf2symbols.svg2symbols",
+            f"--engine={engine}",
+            f"--jobs={args.jobs}",
+            f"--build_dir={build_dir}",
+            "--nocache",
+            *svg_files,
+        ]
+
+        # Symbols are written next to their SVGs
+        def clean(build_dir=build_dir):
+            for symbol_file in glob.glob(os.path.join(svg_dir, "*_symbol.svg")):
+                os.remove(symbol_file)
+            for entry in (".ninja_log", "build.ninja"):
+                if os.path.exists(os.path.join(build_dir, entry)):
+                    os.remove(os.path.join(build_dir, entry))
+
+        cases[f"svg2symbols_{engine}"] = _case(args.runs, argv, build_dir, clean)
+    return cases
+
+
+def _change(before, after):
+    if not before:
+        return "     new"
+    return f"{(after - before) / before * 100:+7.1f}%"
+
+
+def compare(baseline, results, threshold):
+    """Prints the change of each case and stage, returns the slower cases."""
+    slower = []
+    print(
+        f"{'':32} {baseline.get('commit') or '?':>10} "
+        f"{results.get('commit') or '?':>10}"
+    )
+    for name, case in results["cases"].items():
+        before = baseline["cases"].get(name)
+        if before is None:
+            print(f"{name:32} {'':>10} {case['seconds']:9.3f}s")
+            continue
+        change = (case["seconds"] - before["seconds"]) / before["seconds"]
+        if change > threshold:
+            slower.append(name)
+        print(
+            f"{name:32} {before['seconds']:9.3f}s {case['seconds']:9.3f}s "
+            f"{_change(before['seconds'], case['seconds'])}"
+        )
+        for stage, timing in case["stages"].items():
+            stage_before = before["stages"].get(stage, {}).get("seconds")
+            print(
+                f"  {stage:30} {stage_before or 0:9.3f}s {timing['seconds']:9.3f}s "
+                f"{_change(stage_before, timing['seconds'])}"
+            )
+    return slower
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--icons", type=int, default=300)
+    parser.add_argument("--svgs", type=int, default=100)
+    parser.add_argument("--points", type=int, default=24)
+    parser.add_argument("--opsz", action="store_true")
+    parser.add_argument("--wght", type=synthetic.parse_wght, default=(100, 400, 900))
+    parser.add_argument("--jobs", type=int, default=1)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--out", help="Defaults to results/<commit>.json")
+    parser.add_argument("--compare", help="Results to compare with")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.1,
+        help="With --compare, how much slower a case may get, 0.1 for 10%%",
+    )
+    args = parser.parse_args()
+
+    commit = _git("rev-parse", "--short", "HEAD")
+    with tempfile.TemporaryDirectory() as temp_dir:
+        cases = run_suite(args, temp_dir)
+    results = {
+        "commit": commit,
+        "dirty": bool(_git("status", "--porcelain", "--untracked-files=no")),
+        "date": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "params": {k: v for k, v in vars(args).items() if k != "compare"},
+        "cases": cases,
+    }
+
+    out = args.out or os.path.join(_RESULTS_DIR, f"{commit or 'results'}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, "w") as f:
+        json.dump(results, f, indent=2)
+        f.write("\n")
+    print(f"Wrote {out}")
+
+    if not args.compare:
+        for name, case in cases.items():
+            print(f"{name:32} {case['seconds']:9.3f}s")
+        return
+    with open(args.compare) as f:
+        baseline = json.load(f)
+    slower = compare(baseline, results, args.threshold)
+    if slower:
+        sys.exit(f"Slower by over {args.threshold:.0%}: {', '.join(slower)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+# Copyright 2021 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Times creating, pruning and serializing many symbols.
+
+Compares copying the parsed template per symbol, adding path elements to
+its variant groups, dropping empty groups with xpath and serializing the
+tree, as Symbol used to, with splicing paths into the template serialized
+once. Drawing is left out, each symbol gets the same path in each variant.
+
+Usage:
+python benchmarks/symbols.py --symbols 10000
+"""
+import argparse
+import copy
+import time
+
+from lxml import etree
+from picosvg.svg import SVG
+from picosvg.svg_meta import svgns
+from vf2symbols import symbol
+
+# One per weight, as a symbol drawn from a wght font has
+_VARIANTS = (
+    "Ultralight-M",
+    "Thin-M",
+    "Light-M",
+    "Regular-M",
+    "Medium-M",
+    "Semibold-M",
+    "Bold-M",
+    "Heavy-M",
+    "Black-M",
+)
+
+_PATH = "M10 10 H20 V20 H10 Z"
+
+
+def _old_symbol(template):
+    svg = SVG(copy.deepcopy(template.svg_root))
+    groups = {g.get("id"): g for g in svg.svg_root.iter(f"{{{svgns()}}}g")}
+    for variant in _VARIANTS:
+        etree.SubElement(groups[variant], "path").attrib["d"] = _PATH
+    for empty_icon in svg.xpath("//svg:g[not(*)]"):
+        empty_icon.getparent().remove(empty_icon)
+    return svg.tostring()
+
+
+def _new_symbol(template):
+    new_symbol = symbol.Symbol()
+    for variant in _VARIANTS:
+        new_symbol._paths[new_symbol._skeleton.index[variant]] = [
+            f'<path d="{_PATH}"/>'
+        ]
+    new_symbol.drop_empty_icons()
+    return new_symbol.tostring()
+
+
+def _time(fn, count):
+    template = SVG.parse(symbol._SYMBOL_FILEPATH)
+    start = time.perf_counter()
+    for _ in range(count):
+        svg = fn(template)
+    return time.perf_counter() - start, svg
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--symbols", type=int, default=10000)
+    args = parser.parse_args()
+
+    old_time, old_svg = _time(_old_symbol, args.symbols)
+    new_time, new_svg = _time(_new_symbol, args.symbols)
+    assert new_svg == old_svg
+
+    print(f"{args.symbols} symbols, {len(_VARIANTS)} variants drawn each")
+    print(f"  copy + xpath + tostring   {old_time:8.2f}s")
+    print(f"  template splicing         {new_time:8.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,276 @@
+# Copyright 2021 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Generates synthetic variable icon fonts, and SVG icons, for benchmarking.
+
+The fonts mimic the layout vf2symbols expects: a cmap covering the letters
+used in icon names and a single GSUB ligature lookup mapping each icon name
+to an icon glyph. Icons have a wght axis; a share of them are composites and
+a share have alias ligatures, as in real icon fonts. Optionally icons also
+have an opsz axis, drawn bolder at small optical sizes.
+
+The SVGs are the same rings, written the way icon editors tend to: in groups
+with transforms, some as strokes, for picosvg to normalize.
+
+Usage:
+python benchmarks/synthetic.py --icons 3000 --out build/Synthetic-VF.ttf
+python benchmarks/synthetic.py --icons 300 --svg_dir build/svgs
+"""
+import argparse
+import math
+import os
+import string
+
+from fontTools.fontBuilder import FontBuilder
+from fontTools.pens.ttGlyphPen import TTGlyphPen
+from fontTools.ttLib.tables.TupleVariation import TupleVariation
+
+_UPEM = 1000
+_LETTERS = string.ascii_lowercase + "_"
+_CENTER = (_UPEM / 2, _UPEM / 2)
+
+
+def icon_names(count):
+    names = []
+    for i in range(count):
+        suffix = ""
+        i += 1
+        while i:
+            i, rem = divmod(i - 1, 26)
+            suffix = string.ascii_lowercase[rem] + suffix
+        names.append("ic_" + suffix)
+    return names
+
+
+def _ring(radius, points, phase):
+    # alternating on/off curve points, on curve points first
+    return [
+        (
+            round(_CENTER[0] + radius * math.cos(phase + 2 * math.pi * i / points)),
+            round(_CENTER[1] + radius * math.sin(phase + 2 * math.pi * i / points)),
+        )
+        for i in range(points)
+    ]
+
+
+def _draw_ring(pen, ring, reverse=False):
+    if reverse:
+        ring = ring[::-1]
+    pen.moveTo(ring[0])
+    for i in range(1, len(ring) - 1, 2):
+        pen.qCurveTo(ring[i], ring[i + 1])
+    pen.qCurveTo(ring[-1], ring[0])
+    pen.closePath()
+
+
+def _simple_icon(index, points, opsz=False):
+    phase = index / 7
+    outer = _ring(420, points, phase)
+    inner = _ring(220 + index % 80, points, phase)
+    pen = TTGlyphPen(None)
+    _draw_ring(pen, outer)
+    _draw_ring(pen, inner, reverse=True)
+    glyph = pen.glyph()
+
+    # thicker at wght max, thinner at wght min; the min master only has
+    # explicit deltas for on curve points, the rest are inferred by IUP
+    bold = [(0, 0)] * len(outer)
+    light = [(0, 0)] * len(outer)
+    for i, (x, y) in enumerate(inner[::-1]):
+        dx, dy = x - _CENTER[0], y - _CENTER[1]
+        bold.append((round(-dx * 0.3), round(-dy * 0.3)))
+        light.append((round(dx * 0.2), round(dy * 0.2)) if i % 2 == 0 else None)
+    phantoms = [(0, 0)] * 4
+    variations = [
+        TupleVariation({"wght": (0.0, 1.0, 1.0)}, bold + phantoms),
+        TupleVariation({"wght": (-1.0, -1.0, 0.0)}, light + phantoms),
+    ]
+    if opsz:
+        small = [(0, 0)] * len(outer) + [
+            (round(-dx * 0.1), round(-dy * 0.1))
+            for dx, dy in ((x - _CENTER[0], y - _CENTER[1]) for x, y in inner[::-1])
+        ]
+        variations.append(TupleVariation({"opsz": (-1.0, -1.0, 0.0)}, small + phantoms))
+    return glyph, variations
+
+
+def _letter():
+    pen = TTGlyphPen(None)
+    pen.moveTo((100, 0))
+    pen.lineTo((100, 500))
+    pen.lineTo((400, 500))
+    pen.lineTo((400, 0))
+    pen.closePath()
+    return pen.glyph()
+
+
+def _check_ligatures_fit(ligatures):
+    # A single subtable, as vf2symbols requires, reaches its ligatures with
+    # 16 bit offsets; past that fontTools spends ages splitting it
+    size = sum(2 + 4 + 2 * (len(name) - 1) for name, _ in ligatures)
+    if size > 0xFFFF:
+        raise ValueError(
+            f"{len(ligatures)} ligatures overflow the single ligature subtable "
+            "vf2symbols reads, use fewer icons"
+        )
+
+
+def build_font(
+    icon_count,
+    points=24,
+    composite_every=7,
+    alias_every=11,
+    opsz=False,
+    wght=(100, 400, 900),
+):
+    """Returns a TTFont with icon_count icons of roughly points points each.
+
+    wght is the (min, default, max) of the wght axis. With opsz the font
+    also has an opsz axis, 18 to 48 with default 24.
+    """
+    points += points % 2
+    names = icon_names(icon_count)
+    letter_glyphs = {c: f"uni{ord(c):04X}" for c in _LETTERS}
+
+    glyphs = {".notdef": _letter()}
+    variations = {}
+    for c, glyph_name in letter_glyphs.items():
+        glyphs[glyph_name] = _letter()
+
+    base, base_variations = _simple_icon(0, points, opsz)
+    glyphs["base"] = base
+    variations["base"] = base_variations
+
+    ligatures = []
+    for i, name in enumerate(names):
+        glyph_name = f"icon{i:05d}"
+        if composite_every and i % composite_every == composite_every - 1:
+            pen = TTGlyphPen(glyphs)
+            pen.addComponent("base", (1, 0, 0, 1, 0, 0))
+            pen.addComponent(letter_glyphs["a"], (1, 0, 0, 1, 250, 200 + i % 50))
+            glyphs[glyph_name] = pen.glyph()
+            # move the second component as weight changes
+            variations[glyph_name] = [
+                TupleVariation(
+                    {"wght": (0.0, 1.0, 1.0)}, [(0, 0), (20, 30)] + [(0, 0)] * 4
+                ),
+            ]
+        else:
+            glyphs[glyph_name], variations[glyph_name] = _simple_icon(i, points, opsz)
+        ligatures.append((name, glyph_name))
+        if alias_every and i % alias_every == alias_every - 1:
+            ligatures.append(("alias_" + name, glyph_name))
+    _check_ligatures_fit(ligatures)
+
+    fb = FontBuilder(_UPEM, isTTF=True)
+    fb.setupGlyphOrder(list(glyphs))
+    fb.setupCharacterMap({ord(c): n for c, n in letter_glyphs.items()})
+    fb.setupGlyf(glyphs)
+    glyf = fb.font["glyf"]
+    fb.setupHorizontalMetrics({n: (_UPEM, getattr(glyf[n], "xMin", 0)) for n in glyphs})
+    fb.setupHorizontalHeader(ascent=_UPEM, descent=0)
+    fb.setupNameTable({"familyName": "Synthetic Icons", "styleName": "Regular"})
+    fb.setupOS2(usWeightClass=wght[1])
+    fb.setupPost()
+    axes = [("wght", *wght, "Weight")]
+    if opsz:
+        axes.append(("opsz", 18, 24, 48, "Optical Size"))
+    fb.setupFvar(axes, [])
+    fb.setupGvar(variations)
+
+    rules = "\n".join(
+        f"  sub {' '.join(letter_glyphs[c] for c in name)} by {glyph_name};"
+        for name, glyph_name in ligatures
+    )
+    fb.addOpenTypeFeatures(
+        f"languagesystem DFLT dflt;\nfeature liga {{\n{rules}\n}} liga;\n"
+    )
+    return fb.font
+
+
+def _ring_path(ring):
+    # As _draw_ring, in 24 unit SVG space
+    def xy(pt):
+        return f"{pt[0] * 24 / _UPEM:.2f},{24 - pt[1] * 24 / _UPEM:.2f}"
+
+    d = f"M{xy(ring[0])}"
+    for i in range(1, len(ring) - 1, 2):
+        d += f" Q{xy(ring[i])} {xy(ring[i + 1])}"
+    return d + f" Q{xy(ring[-1])} {xy(ring[0])} Z"
+
+
+def _svg_icon(index, points):
+    phase = index / 7
+    outer = _ring(420, points, phase)
+    inner = _ring(220 + index % 80, points, phase)[::-1]
+    shape = f'<path fill-rule="evenodd" d="{_ring_path(outer)} {_ring_path(inner)}"/>'
+    if index % 3 == 1:
+        shape = (
+            f'<g transform="translate(12 12) scale(0.8) translate(-12 -12)">{shape}</g>'
+        )
+    if index % 5 == 2:
+        shape += '<circle cx="12" cy="12" r="3" fill="none" stroke="#000" stroke-width="1.5"/>'
+    if index % 7 == 3:
+        shape += '<rect x="2" y="18" width="20" height="2" rx="1"/>'
+    return (
+        '<svg xmlns="http://www.w3.org/2000/svg" width="24" height="24" '
+        f'viewBox="0 0 24 24">{shape}</svg>\n'
+    )
+
+
+def write_svgs(icon_count, svg_dir, points=24):
+    """Writes an SVG per icon to svg_dir, returns their paths.
+
+    Named as icon_names, drawn as the simple icons of build_font.
+    """
+    points += points % 2
+    os.makedirs(svg_dir, exist_ok=True)
+    svg_files = []
+    for i, name in enumerate(icon_names(icon_count)):
+        svg_file = os.path.join(svg_dir, name + ".svg")
+        with open(svg_file, "w") as f:
+            f.write(_svg_icon(i, points))
+        svg_files.append(svg_file)
+    return svg_files
+
+
+def parse_wght(arg):
+    wght = tuple(int(v) for v in arg.split(","))
+    if len(wght) != 3 or not wght[0] <= wght[1] <= wght[2]:
+        raise argparse.ArgumentTypeError("expected min,default,max")
+    return wght
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--icons", type=int, default=100)
+    parser.add_argument("--points", type=int, default=24)
+    parser.add_argument("--opsz", action="store_true", help="Add an opsz axis.")
+    parser.add_argument(
+        "--wght", type=parse_wght, default=(100, 400, 900), help="min,default,max"
+    )
+    parser.add_argument("--out", help="Where to write the font.")
+    parser.add_argument("--svg_dir", help="Where to write an SVG per icon.")
+    args = parser.parse_args()
+    if not args.out and not args.svg_dir:
+        parser.error("expected --out, --svg_dir or both")
+    if args.out:
+        build_font(args.icons, points=args.points, opsz=args.opsz, wght=args.wght).save(
+            args.out
+        )
+    if args.svg_dir:
+        write_svgs(args.icons, args.svg_dir, points=args.points)
+
+
+if __name__ == "__main__":
+    main()
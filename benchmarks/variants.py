@@ -0,0 +1,84 @@
+# Copyright 2021 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Times filling the S/M/L variants of every symbol weight.
+
+For fonts with and without opsz, compares the 9 M variants with all 27,
+planned by vf2symbols.variants so variants at the same location share an
+instance. Times the instance fonts the ninja build makes, as planned and one
+per variant, and rendering every symbol in process.
+
+Usage:
+python benchmarks/variants.py --icons 1000
+"""
+import argparse
+import io
+import re
+import time
+
+import synthetic
+from fontTools import ttLib
+from fontTools.varLib import instancer
+from vf2symbols import batch
+from vf2symbols import icon_font
+from vf2symbols import variants
+
+
+def _instance_fonts(font_data, locations):
+    start = time.perf_counter()
+    for location in locations:
+        ttfont = ttLib.TTFont(io.BytesIO(font_data))
+        axis_positions = {a.axisTag: None for a in ttfont["fvar"].axes}
+        axis_positions.update(location)
+        instancer.instantiateVariableFont(ttfont, axis_positions).save(io.BytesIO())
+    return time.perf_counter() - start
+
+
+def _render(font_data, instances, icon_names):
+    start = time.perf_counter()
+    ttfont = ttLib.TTFont(io.BytesIO(font_data))
+    loaded = batch.load_variable_instances(ttfont, variants.symbol_locations(instances))
+    for _ in batch.render_symbols(loaded, icon_names):
+        pass
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--icons", type=int, default=1000)
+    parser.add_argument("--points", type=int, default=24)
+    args = parser.parse_args()
+
+    for opsz in (False, True):
+        buf = io.BytesIO()
+        synthetic.build_font(args.icons, points=args.points, opsz=opsz).save(buf)
+        font_data = buf.getvalue()
+        ttfont = ttLib.TTFont(io.BytesIO(font_data))
+        icon_names = tuple(icon_font.index(ttfont).extract_icon_names(re.compile("")))
+        wght_range = icon_font.wght_range(ttfont)
+
+        print(f"{len(icon_names)} icons, {'with' if opsz else 'without'} opsz")
+        for scales in (("M",), variants.SYMBOL_SCALES):
+            instances = variants.plan(ttfont, wght_range, scales)
+            locations = variants.symbol_locations(instances)
+            planned = _instance_fonts(font_data, [i.location for i in instances])
+            per_variant = _instance_fonts(font_data, locations.values())
+            render = _render(font_data, instances, icon_names)
+            print(f"  {len(locations)} variants, {len(instances)} instances")
+            print(f"    instance fonts, planned      {planned:8.2f}s")
+            print(f"    instance fonts, per variant  {per_variant:8.2f}s")
+            print(f"    render in process            {render:8.2f}s")
+
+
+if __name__ == "__main__":
+    main()
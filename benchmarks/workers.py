@@ -0,0 +1,119 @@
+# Copyright 2021 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Memory of vf2symbols --engine=inprocess and its workers, Linux only.
+
+The peak RSS vf2symbols reports is that of its biggest process, and counts
+pages of font files every worker maps as each's own. This samples the whole
+process tree instead, reporting the peak sum of private memory, of PSS,
+which splits shared pages between the processes sharing them, and of RSS.
+
+Usage:
+python benchmarks/workers.py --icons 3000 --points 96 --jobs 16
+python benchmarks/workers.py --icons 3000 --points 256 --icon_filter ^ic_a
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import synthetic
+
+
+def _children(pid):
+    children = []
+    for task in os.listdir(f"/proc/{pid}/task"):
+        with open(f"/proc/{pid}/task/{task}/children") as f:
+            children.extend(int(c) for c in f.read().split())
+    return children
+
+
+def _tree(pid):
+    pids = [pid]
+    for pid in pids:
+        try:
+            pids.extend(_children(pid))
+        except OSError:
+            pass
+    return pids
+
+
+def _memory_kb(pid):
+    """Private, PSS and RSS of pid in kB."""
+    fields = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            name, _, value = line.partition(":")
+            if value.strip().endswith("kB"):
+                fields[name] = int(value.split()[0])
+    private = fields.get("Private_Clean", 0) + fields.get("Private_Dirty", 0)
+    return private, fields.get("Pss", 0), fields.get("Rss", 0)
+
+
+def _run(argv, interval):
+    """Seconds to run argv, and peak sums of private, PSS and RSS in MB."""
+    start = time.perf_counter()
+    process = subprocess.Popen(argv, stdout=subprocess.DEVNULL)
+    peaks = [0, 0, 0]
+    while process.poll() is None:
+        totals = [0, 0, 0]
+        for pid in _tree(process.pid):
+            try:
+                totals = [t + m for t, m in zip(totals, _memory_kb(pid))]
+            except OSError:
+                # Gone since listed
+                pass
+        peaks = [max(p, t) for p, t in zip(peaks, totals)]
+        time.sleep(interval)
+    if process.returncode:
+        sys.exit(f"{' '.join(argv)} failed")
+    return time.perf_counter() - start, [p / 1024 for p in peaks]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--icons", type=int, default=3000)
+    parser.add_argument("--points", type=int, default=96)
+    parser.add_argument("--jobs", type=int, default=16)
+    parser.add_argument("--icon_filter", default=".*", help="Icons to draw")
+    parser.add_argument("--interval", type=float, default=0.05)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        font_file = os.path.join(tmp, "Synthetic-VF.ttf")
+        synthetic.build_font(args.icons, points=args.points, opsz=True).save(font_file)
+        seconds, (private, pss, rss) = _run(
+            [
+                sys.executable,
+                "-m",
+                "vf2symbols.vf2symbols",
+                "--engine=inprocess",
+                "--nocache",
+                f"--jobs={args.jobs}",
+                f"--icon_filter={args.icon_filter}",
+                f"--build_dir={os.path.join(tmp, 'build')}",
+                font_file,
+            ],
+            args.interval,
+        )
+        print(
+            f"{args.icons} icons, {os.path.getsize(font_file) / 2**20:.1f}MB font, "
+            f"{args.jobs} jobs: {seconds:.1f}s, peak private {private:.0f}MB, "
+            f"PSS {pss:.0f}MB, RSS {rss:.0f}MB"
+        )
+
+
+if __name__ == "__main__":
+    main()
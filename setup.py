@@ -24,6 +24,8 @@ setup(
     entry_points={
         'console_scripts': [
             'vf2symbols=vf2symbols.vf2symbols:main',
+            'vf2symbols-daemon=vf2symbols.daemon:main',
+            'vf2symbols-client=vf2symbols.client:main',
         ],
     },
 
@@ -34,6 +36,7 @@ setup(
         "lxml>=4.0",
         "nanoemoji>=0.2.0",
         "ninja>=1.10.0.post1",
+        "numpy",
     ],
     python_requires=">=3.6",
 
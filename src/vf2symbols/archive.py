@@ -0,0 +1,154 @@
+# Copyright 2021 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Writes symbols into a single archive as they are generated.
+
+Either a zip of <name>.svg files or an Xcode asset catalog, a .xcassets dir
+holding a <name>.symbolset per symbol. Symbols are added one at a time so
+memory use doesn't grow with the number of symbols.
+
+Names may have a folder, e.g. Outlined/home. In an asset catalog the folder
+provides a namespace, so the symbol is named Outlined/home in Xcode too.
+"""
+import json
+import os
+import shutil
+import tempfile
+import zipfile
+
+from typing import Iterable, Tuple
+
+from vf2symbols import instrument
+
+_XCODE_INFO = {"author": "xcode", "version": 1}
+
+# 1980-01-01, the earliest zip timestamp, so archives are reproducible
+_ZIP_DATE_TIME = (1980, 1, 1, 0, 0, 0)
+
+
+def open_archive(path: str):
+    """A zip or xcassets archive, by the extension of path."""
+    ext = os.path.splitext(path.rstrip("/"))[1]
+    if ext == ".zip":
+        return ZipArchive(path)
+    if ext == ".xcassets":
+        return XcassetsArchive(path)
+    raise ValueError(f"{path} is not a .zip or .xcassets")
+
+
+def write_archive(path: str, symbols: Iterable[Tuple[str, str]]) -> int:
+    """Writes (name, svg) pairs to the archive at path, returns how many."""
+    count = 0
+    with open_archive(path) as archive:
+        for name, svg in symbols:
+            with instrument.stage("write"):
+                archive.add(name, svg)
+            instrument.count("bytes_written", len(svg))
+            count += 1
+    return count
+
+
+class _Archive:
+    def __init__(self, path: str):
+        self.path = path.rstrip("/")
+        self._names = set()
+
+    def add(self, name: str, svg: str):
+        if name in self._names:
+            raise ValueError(f"{name} added to {self.path} twice")
+        self._names.add(name)
+        self._add(name, svg)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close(complete=exc_type is None)
+
+
+class ZipArchive(_Archive):
+    """A zip of <name>.svg, written to a temp file then moved into place."""
+
+    def __init__(self, path: str):
+        super().__init__(path)
+        fd, self._temp_path = tempfile.mkstemp(
+            dir=os.path.dirname(os.path.abspath(self.path)), suffix=".tmp"
+        )
+        os.close(fd)
+        self._zip = zipfile.ZipFile(self._temp_path, "w", zipfile.ZIP_DEFLATED)
+
+    def _add(self, name, svg):
+        info = zipfile.ZipInfo(name + ".svg", date_time=_ZIP_DATE_TIME)
+        info.compress_type = zipfile.ZIP_DEFLATED
+        self._zip.writestr(info, svg)
+
+    def close(self, complete=True):
+        self._zip.close()
+        if complete:
+            os.replace(self._temp_path, self.path)
+        else:
+            os.remove(self._temp_path)
+
+
+def _write_contents(path, contents):
+    # Formatted the way Xcode writes Contents.json
+    with open(os.path.join(path, "Contents.json"), "w") as f:
+        f.write(json.dumps(contents, indent=2, separators=(",", " : ")) + "\n")
+
+
+class XcassetsArchive(_Archive):
+    """An asset catalog of <name>.symbolset dirs.
+
+    Symbolsets from an earlier run that weren't added again are removed when
+    the archive is closed.
+    """
+
+    def __init__(self, path: str):
+        super().__init__(path)
+        os.makedirs(self.path, exist_ok=True)
+        _write_contents(self.path, {"info": _XCODE_INFO})
+        self._folders = set()
+
+    def _add(self, name, svg):
+        folder, filename = os.path.split(name)
+        if folder and folder not in self._folders:
+            os.makedirs(os.path.join(self.path, folder), exist_ok=True)
+            _write_contents(
+                os.path.join(self.path, folder),
+                {"info": _XCODE_INFO, "properties": {"provides-namespace": True}},
+            )
+            self._folders.add(folder)
+        symbolset = os.path.join(self.path, name + ".symbolset")
+        os.makedirs(symbolset, exist_ok=True)
+        with open(os.path.join(symbolset, filename + ".svg"), "w") as f:
+            f.write(svg)
+        _write_contents(
+            symbolset,
+            {
+                "info": _XCODE_INFO,
+                "symbols": [{"filename": filename + ".svg", "idiom": "universal"}],
+            },
+        )
+
+    def close(self, complete=True):
+        if not complete:
+            return
+        for dirpath, dirnames, _ in os.walk(self.path):
+            for entry in tuple(dirnames):
+                name, ext = os.path.splitext(entry)
+                if ext != ".symbolset":
+                    continue  # a folder, look inside
+                dirnames.remove(entry)
+                name = os.path.relpath(os.path.join(dirpath, name), self.path)
+                if name.replace(os.sep, "/") not in self._names:
+                    shutil.rmtree(os.path.join(dirpath, entry))
@@ -0,0 +1,594 @@
+# Copyright 2021 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Writes many Apple custom symbols from a single process.
+
+The ninja build runs write_symbol_from_fonts once per icon, paying interpreter
+startup and a parse of every instance font each time. Here each instance is
+loaded once and its glyph set stays resident while every icon is written.
+
+render_* functions yield serialized symbols, write_* functions write them to
+files; see vf2symbols.archive to stream them into a single archive instead.
+
+With jobs > 1, render_family_symbols and render_svg_symbols shard icons
+across a process pool. Workers load their instances once, return serialized
+symbols and the parent yields them in input order, so output does not depend
+on the number of workers. render_family_symbols draws icons of several
+fonts, e.g. the styles of an icon family, in one pool so workers stay busy
+across fonts.
+
+Icon fonts often have several ligatures for one glyph. group_aliases finds
+them so each glyph is drawn once, write_files then copies or links its symbol
+for the aliases. write_files hands files to a vf2symbols.output.FileWriter,
+which writes them from a few threads while symbols are drawn and leaves
+files already holding their symbol alone.
+
+Every function drawing symbols takes path_precision, to write compact path
+data with coordinates rounded to that many decimal places, see
+Symbol.
+"""
+import collections
+import itertools
+import math
+import os
+import time
+
+from absl import logging
+from concurrent.futures import ProcessPoolExecutor
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    Mapping,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Tuple,
+)
+
+from fontTools import ttLib
+from vf2symbols import cache
+from vf2symbols import icon_font
+from vf2symbols import instrument
+from vf2symbols import outlines
+from vf2symbols import output
+from vf2symbols import svg_icon
+from vf2symbols.symbol import Symbol
+
+
+class FontInstance(NamedTuple):
+    ttfont: ttLib.TTFont
+    glyph_set: Mapping[str, object]
+    font_index: icon_font.IconFontIndex
+
+
+def load_instances(
+    ttfonts: Mapping[str, ttLib.TTFont], font_index: icon_font.IconFontIndex = None
+) -> Mapping[str, FontInstance]:
+    """Pairs each font, keyed by symbol wght name, with its glyph set.
+
+    Instances share the ligatures of their variable font so pass its
+    font_index to avoid indexing each instance.
+    """
+    return {
+        symbol_wght_name: FontInstance(
+            ttfont, ttfont.getGlyphSet(), font_index or icon_font.index(ttfont)
+        )
+        for symbol_wght_name, ttfont in ttfonts.items()
+    }
+
+
+def load_variable_instances(
+    ttfont: ttLib.TTFont,
+    locations: Mapping[str, Mapping[str, float]],
+    font_index: icon_font.IconFontIndex = None,
+    max_outline_bytes: int = None,
+) -> Mapping[str, FontInstance]:
+    """Instances of a variable font at locations, keyed by symbol wght name.
+
+    Outlines come straight from gvar, see vf2symbols.outlines, so no instance
+    fonts are made; check outlines.is_supported(ttfont) first. Names at the
+    same location share a glyph set. max_outline_bytes bounds the decoded
+    outlines kept in memory.
+    """
+    keys = {
+        name: tuple(sorted(outlines.normalize_location(ttfont, location).items()))
+        for name, location in locations.items()
+    }
+    distinct = {}
+    for name, key in keys.items():
+        distinct.setdefault(key, locations[name])
+    glyph_sets = outlines.GlyphOutlines(
+        ttfont, tuple(distinct.values()), max_outline_bytes
+    ).glyph_sets()
+    glyph_sets = dict(zip(distinct, glyph_sets))
+    font_index = font_index or icon_font.index(ttfont)
+    return {
+        name: FontInstance(ttfont, glyph_sets[key], font_index)
+        for name, key in keys.items()
+    }
+
+
+def parse_font_args(args: Iterable[str]) -> Dict[str, str]:
+    """Symbol wght name => font file for name=font, or bare font, args.
+
+    A bare font is named font.<symbol wght name>.ttf.
+    """
+    font_files = {}
+    for arg in args:
+        symbol_wght_name, sep, font_filename = arg.partition("=")
+        if not sep:
+            font_filename = arg
+            symbol_wght_name = font_filename.split(".")[-2]
+        font_files[symbol_wght_name] = font_filename
+    return font_files
+
+
+def out_files_by_icon(outs: Iterable[str]) -> Dict[str, str]:
+    """Icon name => output file, for output files named after their icon."""
+    return {os.path.splitext(os.path.basename(out))[0]: out for out in outs}
+
+
+def group_aliases(
+    font_indices: Iterable[icon_font.IconFontIndex], icon_names: Iterable[str]
+) -> Dict[str, Tuple[str, ...]]:
+    """Icon name => later icon names resolving to the same glyphs, in order.
+
+    Keys are the icons to draw, in the order of icon_names. Their aliases draw
+    the same outlines so have the same symbol. Glyphs are resolved in each of
+    font_indices, e.g. those of every instance.
+    """
+    # Instances usually share an index
+    font_indices = list({id(i): i for i in font_indices}.values())
+    groups = {}
+    for icon_name in icon_names:
+        glyph_names = tuple(i.resolve_ligature(icon_name) for i in font_indices)
+        groups.setdefault(glyph_names, []).append(icon_name)
+    return {names[0]: tuple(names[1:]) for names in groups.values()}
+
+
+def create_symbol(
+    instances: Mapping[str, FontInstance],
+    icon_name: str,
+    path_precision: Optional[int] = None,
+) -> Symbol:
+    symbol = Symbol(path_precision=path_precision)
+    for symbol_wght_name, instance in instances.items():
+        icon_font.update_symbol(
+            symbol,
+            instance.ttfont,
+            icon_name,
+            symbol_wght_name,
+            glyph_set=instance.glyph_set,
+            font_index=instance.font_index,
+        )
+    symbol.drop_empty_icons()
+    return symbol
+
+
+def render_symbol(
+    instances: Mapping[str, FontInstance],
+    icon_name: str,
+    symbol_cache: cache.SymbolCache = None,
+    path_precision: Optional[int] = None,
+) -> str:
+    """The serialized symbol for icon_name, from symbol_cache if it has it."""
+    instrument.count("icons")
+    with instrument.stage("symbol"):
+        return _render_symbol(instances, icon_name, symbol_cache, path_precision)
+
+
+def _cache_key(path_precision):
+    key = cache.CacheKey()
+    # Symbols with the default path data keep the keys they always had
+    if path_precision is not None:
+        key.update("path_precision", path_precision)
+    return key
+
+
+def _render_symbol(instances, icon_name, symbol_cache, path_precision):
+    if symbol_cache is None:
+        return create_symbol(instances, icon_name, path_precision).tostring()
+    key = _cache_key(path_precision)
+    for symbol_wght_name, instance in instances.items():
+        icon_font.update_cache_key(
+            key,
+            instance.ttfont,
+            icon_name,
+            symbol_wght_name,
+            glyph_set=instance.glyph_set,
+            font_index=instance.font_index,
+        )
+    svg = symbol_cache.get(key)
+    if svg is None:
+        svg = create_symbol(instances, icon_name, path_precision).tostring()
+        symbol_cache.put(key, svg)
+    return svg
+
+
+def render_symbols(
+    instances: Mapping[str, FontInstance],
+    icon_names: Iterable[str],
+    symbol_cache: cache.SymbolCache = None,
+    path_precision: Optional[int] = None,
+) -> Iterator[Tuple[str, str]]:
+    """Yields (icon_name, serialized symbol) for each icon, in order."""
+    for icon_name in icon_names:
+        yield icon_name, render_symbol(
+            instances, icon_name, symbol_cache, path_precision
+        )
+
+
+def render_family_symbols(
+    load_instances_fns: Mapping[str, Callable[[], Mapping[str, FontInstance]]],
+    icons: Iterable[Tuple[str, str]],
+    jobs: int = 1,
+    symbol_cache: cache.SymbolCache = None,
+    path_precision: Optional[int] = None,
+) -> Iterator[Tuple[Tuple[str, str], str]]:
+    """Yields ((font, icon_name), serialized symbol) for each icon, in order.
+
+    Instances of each font are loaded by its load_instances_fns entry. List
+    icons font by font: each font is loaded once, by each worker drawing its
+    icons with jobs > 1, and dropped when the next font is loaded.
+    """
+    if jobs > 1:
+        yield from _render_parallel(
+            _render_worker_family_symbol,
+            tuple(icons),
+            jobs,
+            symbol_cache,
+            load_instances_fns,
+            path_precision=path_precision,
+        )
+        return
+    for font, font_icons in itertools.groupby(icons, key=lambda icon: icon[0]):
+        instances = load_instances_fns[font]()
+        for key in font_icons:
+            yield key, render_symbol(instances, key[1], symbol_cache, path_precision)
+
+
+def write_symbols(
+    instances: Mapping[str, FontInstance],
+    icon_names: Iterable[str],
+    symbol_dir: str,
+    symbol_cache: cache.SymbolCache = None,
+    path_precision: Optional[int] = None,
+) -> int:
+    """Writes symbol_dir/icon_name.svg for each icon, returns how many."""
+    return write_files(
+        render_symbols(instances, icon_names, symbol_cache, path_precision),
+        lambda icon_name: os.path.join(symbol_dir, icon_name + ".svg"),
+    )
+
+
+def create_layered_svg_symbol(
+    layers: Iterable[Tuple[str, str]],
+    pico_cache: cache.PicoCache = None,
+    path_precision: Optional[int] = None,
+) -> Symbol:
+    """A symbol drawing each (symbol name, svg file) layer in its variant."""
+    symbol = Symbol(path_precision=path_precision)
+    for symbol_name, svg_file in layers:
+        svg_icon.update_symbol(symbol, symbol_name, svg_file, pico_cache)
+    symbol.drop_empty_icons()
+    return symbol
+
+
+def render_layered_svg_symbol(
+    layers: Sequence[Tuple[str, str]],
+    symbol_cache: cache.SymbolCache = None,
+    pico_cache: cache.PicoCache = None,
+    path_precision: Optional[int] = None,
+) -> str:
+    """The serialized symbol for layers, from symbol_cache if it has it.
+
+    Otherwise drawn from SVGs normalized by picosvg, from pico_cache if it has
+    them.
+    """
+    instrument.count("icons")
+    with instrument.stage("symbol"):
+        return _render_layered_svg_symbol(
+            layers, symbol_cache, pico_cache, path_precision
+        )
+
+
+def _render_layered_svg_symbol(layers, symbol_cache, pico_cache, path_precision):
+    if symbol_cache is None:
+        return create_layered_svg_symbol(layers, pico_cache, path_precision).tostring()
+    key = _cache_key(path_precision)
+    for symbol_name, svg_file in layers:
+        svg_icon.update_cache_key(key, symbol_name, svg_file)
+    svg = symbol_cache.get(key)
+    if svg is None:
+        svg = create_layered_svg_symbol(layers, pico_cache, path_precision).tostring()
+        symbol_cache.put(key, svg)
+    return svg
+
+
+def create_svg_symbol(svg_file: str, path_precision: Optional[int] = None) -> Symbol:
+    return create_layered_svg_symbol(
+        [(svg_icon.REQUIRED_SYMBOL, svg_file)], path_precision=path_precision
+    )
+
+
+def render_svg_symbol(
+    svg_file: str,
+    symbol_cache: cache.SymbolCache = None,
+    pico_cache: cache.PicoCache = None,
+    path_precision: Optional[int] = None,
+) -> str:
+    """The serialized symbol for svg_file, from symbol_cache if it has it."""
+    return render_layered_svg_symbol(
+        [(svg_icon.REQUIRED_SYMBOL, svg_file)], symbol_cache, pico_cache, path_precision
+    )
+
+
+def render_svg_symbols(
+    svg_files: Iterable[str],
+    jobs: int = 1,
+    symbol_cache: cache.SymbolCache = None,
+    pico_cache: cache.PicoCache = None,
+    path_precision: Optional[int] = None,
+) -> Iterator[Tuple[str, str]]:
+    """Yields (svg_file, serialized symbol) for each svg file, in order."""
+    if jobs > 1:
+        yield from _render_parallel(
+            _render_worker_svg_symbol,
+            tuple(svg_files),
+            jobs,
+            symbol_cache,
+            pico_cache=pico_cache,
+            path_precision=path_precision,
+        )
+        return
+    for svg_file in svg_files:
+        yield svg_file, render_svg_symbol(
+            svg_file, symbol_cache, pico_cache, path_precision
+        )
+
+
+def write_svg_symbols(
+    symbol_files: Mapping[str, str],
+    jobs: int = 1,
+    symbol_cache: cache.SymbolCache = None,
+    pico_cache: cache.PicoCache = None,
+    path_precision: Optional[int] = None,
+    writer: output.FileWriter = None,
+) -> int:
+    """Writes a symbol for each svg file key to the file it maps to."""
+    return write_files(
+        render_svg_symbols(
+            symbol_files, jobs, symbol_cache, pico_cache, path_precision
+        ),
+        symbol_files.get,
+        writer=writer,
+    )
+
+
+def write_files(
+    symbols: Iterable[Tuple[Any, str]],
+    symbol_file_fn: Callable[[Any], str],
+    aliases: Mapping[Any, Sequence[Any]] = None,
+    alias_files: str = "copy",
+    writer: output.FileWriter = None,
+) -> int:
+    """Writes each (key, svg) to symbol_file_fn(key), returns how many.
+
+    The files of any aliases of a key, see group_aliases, are written too, as
+    alias_files says: a copy, a hard link or a symlink of the key's file.
+    Files already holding their symbol are left alone, see output.FileWriter;
+    writes go to writer if given, else to one closed before returning.
+    """
+    if alias_files not in output.ALIAS_FILES:
+        raise ValueError(f"alias_files must be one of {', '.join(output.ALIAS_FILES)}")
+    if writer is None:
+        with output.FileWriter() as writer:
+            return write_files(symbols, symbol_file_fn, aliases, alias_files, writer)
+    count = 0
+    for key, svg in symbols:
+        alias_keys = aliases.get(key, ()) if aliases else ()
+        writer.write(
+            symbol_file_fn(key),
+            svg.encode("utf-8"),
+            [symbol_file_fn(alias) for alias in alias_keys],
+            alias_files,
+        )
+        if alias_keys:
+            instrument.count("aliases", len(alias_keys))
+        count += 1 + len(alias_keys)
+    return count
+
+
+def expand_aliases(
+    symbols: Iterable[Tuple[Any, str]], aliases: Mapping[Any, Sequence[Any]]
+) -> Iterator[Tuple[Any, str]]:
+    """Yields each (key, svg), then (alias, svg) for each alias of key."""
+    for key, svg in symbols:
+        yield key, svg
+        for alias in aliases.get(key, ()):
+            yield alias, svg
+
+
+def write_icon_files(
+    instances: Mapping[str, FontInstance],
+    out_files: Mapping[str, str],
+    symbol_cache: cache.SymbolCache = None,
+    alias_files: str = "copy",
+    path_precision: Optional[int] = None,
+    writer: output.FileWriter = None,
+) -> int:
+    """Writes a symbol for each icon name key to the file it maps to.
+
+    Aliases are drawn once, see group_aliases and write_files.
+    """
+    aliases = group_aliases((i.font_index for i in instances.values()), out_files)
+    return write_files(
+        render_symbols(instances, aliases, symbol_cache, path_precision),
+        out_files.get,
+        aliases,
+        alias_files,
+        writer,
+    )
+
+
+# Set once per worker process by _init_worker
+_worker_load_instances_fns = None
+_worker_cache = None
+_worker_pico_cache = None
+_worker_path_precision = None
+# font => instances, of the font the worker last drew
+_worker_instances = {}
+
+
+def _init_worker(
+    symbol_cache, pico_cache, load_instances_fns, path_precision, instrument_trace
+):
+    global _worker_load_instances_fns, _worker_cache, _worker_pico_cache
+    global _worker_path_precision
+    _worker_cache = symbol_cache
+    _worker_pico_cache = pico_cache
+    _worker_path_precision = path_precision
+    _worker_load_instances_fns = load_instances_fns
+    # None if the parent isn't recording
+    if instrument_trace is not None:
+        instrument.enable(instrument_trace)
+
+
+def _worker_font_instances(font):
+    instances = _worker_instances.get(font)
+    if instances is None:
+        # Shards reach each worker in order, so it's done with the last font
+        _worker_instances.clear()
+        instances = _worker_load_instances_fns[font]()
+        _worker_instances[font] = instances
+    return instances
+
+
+def _render_worker_family_symbol(icon):
+    font, icon_name = icon
+    return render_symbol(
+        _worker_font_instances(font), icon_name, _worker_cache, _worker_path_precision
+    )
+
+
+def _render_worker_svg_symbol(svg_file):
+    return render_svg_symbol(
+        svg_file, _worker_cache, _worker_pico_cache, _worker_path_precision
+    )
+
+
+class _ShardResult(NamedTuple):
+    pid: int
+    seconds: float
+    svgs: Tuple[str, ...]
+    # hits, misses and evictions of the worker's symbol and picosvg caches
+    # for this shard
+    cache_counts: Tuple[Tuple[int, int, int], Tuple[int, int, int]]
+    # what vf2symbols.instrument recorded, if enabled
+    recorded: Optional[Mapping[str, Any]]
+
+
+def _cache_counts():
+    return tuple(
+        (0, 0, 0) if c is None else (c.hits, c.misses, c.evictions)
+        for c in (_worker_cache, _worker_pico_cache)
+    )
+
+
+def _render_shard(render_fn, keys):
+    start = time.perf_counter()
+    counts_before = _cache_counts()
+    svgs = tuple(render_fn(key) for key in keys)
+    cache_counts = tuple(
+        tuple(a - b for b, a in zip(before, after))
+        for before, after in zip(counts_before, _cache_counts())
+    )
+    recorded = instrument.collect() if instrument.enabled() else None
+    return _ShardResult(
+        os.getpid(), time.perf_counter() - start, svgs, cache_counts, recorded
+    )
+
+
+def _shards(keys: Sequence[Any], jobs: int):
+    # Several shards per worker keeps them all busy to the end when some
+    # icons are much more expensive than others
+    size = max(1, math.ceil(len(keys) / (jobs * 4)))
+    return [keys[i : i + size] for i in range(0, len(keys), size)]
+
+
+def _render_parallel(
+    render_fn: Callable[[Any], str],
+    keys: Sequence[Any],
+    jobs: int,
+    symbol_cache: cache.SymbolCache = None,
+    load_instances_fns=None,
+    pico_cache: cache.PicoCache = None,
+    path_precision: Optional[int] = None,
+) -> Iterator[Tuple[Any, str]]:
+    start = time.perf_counter()
+    shards = _shards(keys, jobs)
+    worker_stats = collections.defaultdict(lambda: [0, 0.0])
+    instrument_trace = instrument.tracing() if instrument.enabled() else None
+    with ProcessPoolExecutor(
+        jobs,
+        initializer=_init_worker,
+        initargs=(
+            symbol_cache,
+            pico_cache,
+            load_instances_fns,
+            path_precision,
+            instrument_trace,
+        ),
+    ) as executor:
+        # Results come back in submission order, keeping output deterministic.
+        # Only a few shards are in flight so a slow consumer doesn't leave
+        # every rendered symbol waiting in memory.
+        pending = collections.deque()
+        shard_iter = iter(shards)
+        for shard in itertools.islice(shard_iter, jobs * 2):
+            pending.append((shard, executor.submit(_render_shard, render_fn, shard)))
+        while pending:
+            shard, future = pending.popleft()
+            result = future.result()
+            for next_shard in itertools.islice(shard_iter, 1):
+                pending.append(
+                    (next_shard, executor.submit(_render_shard, render_fn, next_shard))
+                )
+            yield from zip(shard, result.svgs)
+            worker_stats[result.pid][0] += len(shard)
+            worker_stats[result.pid][1] += result.seconds
+            for c, counts in zip((symbol_cache, pico_cache), result.cache_counts):
+                if c is not None:
+                    c.add_counts(*counts)
+            if result.recorded is not None:
+                instrument.merge(result.recorded)
+
+    for pid, (count, seconds) in sorted(worker_stats.items()):
+        logging.info(
+            "Worker %d: %d symbols in %.2fs (%.1f/s)",
+            pid,
+            count,
+            seconds,
+            count / seconds if seconds else 0,
+        )
+    elapsed = time.perf_counter() - start
+    logging.info(
+        "%d workers: %d symbols in %.2fs (%.1f/s)",
+        len(worker_stats),
+        len(keys),
+        elapsed,
+        len(keys) / elapsed if elapsed else 0,
+    )
@@ -0,0 +1,191 @@
+# Copyright 2021 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Records what a build.ninja was generated from, to skip regenerating it.
+
+The manifest, JSON next to build.ninja, holds a digest of the inputs, the
+icons, rule commands and outputs of the build and a digest of build.ninja
+itself, and of any files the generator wrote for it that no edge builds.
+When the inputs are unchanged and build.ninja and those files are as
+written, the generator can stop before loading the font. Otherwise build.ninja is only
+rewritten if its content changed, so ninja doesn't see a new mtime, and
+outputs of the last build that are no longer built are removed.
+"""
+import hashlib
+import io
+import json
+import os
+
+from absl import logging
+from typing import Iterable, Mapping, NamedTuple, Optional, Sequence
+
+from ninja import ninja_syntax
+
+# Bump if the manifest format changes
+_VERSION = 2
+
+
+class Manifest(NamedTuple):
+    inputs: str
+    icons: Sequence[str]
+    rules: Mapping[str, str]
+    outputs: Sequence[str]
+    build_digest: str
+    # Files the generator wrote, relative to the build dir => their digest
+    generated: Mapping[str, str]
+
+
+def _sha256(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def _file_sha256(filename):
+    with open(filename, "rb") as f:
+        return _sha256(f.read())
+
+
+def inputs_digest(filenames: Iterable[str], settings: Mapping[str, object]) -> str:
+    """Digest of the content of filenames and the generator settings."""
+    digest = hashlib.sha256(repr((_VERSION, sorted(settings.items()))).encode())
+    for filename in filenames:
+        with open(filename, "rb") as f:
+            digest.update(hashlib.sha256(f.read()).digest())
+    return digest.hexdigest()
+
+
+def manifest_file(build_file: str) -> str:
+    return build_file + ".manifest.json"
+
+
+def load(build_file: str) -> Optional[Manifest]:
+    """The manifest of build_file, None if there isn't a readable one."""
+    try:
+        with open(manifest_file(build_file)) as f:
+            version, fields = json.load(f)
+        if version != _VERSION:
+            return None
+        return Manifest(**fields)
+    except (OSError, ValueError, TypeError):
+        return None
+
+
+def is_current(build_file: str, inputs: str) -> bool:
+    """Whether build_file was generated from inputs and is unmodified.
+
+    So must the files generated alongside it be, no edge would remake them.
+    """
+    manifest = load(build_file)
+    if manifest is None or manifest.inputs != inputs:
+        return False
+    build_dir = os.path.dirname(build_file)
+    try:
+        if _file_sha256(build_file) != manifest.build_digest:
+            return False
+        return all(
+            _file_sha256(os.path.join(build_dir, filename)) == digest
+            for filename, digest in manifest.generated.items()
+        )
+    except OSError:
+        return False
+
+
+class RecordingWriter(ninja_syntax.Writer):
+    """A ninja writer into memory that records rules and build outputs."""
+
+    def __init__(self):
+        super().__init__(io.StringIO())
+        self.rules = {}
+        self.outputs = []
+
+    def rule(self, name, command, *args, **kwargs):
+        self.rules[name] = command
+        super().rule(name, command, *args, **kwargs)
+
+    def build(self, outputs, rule, *args, **kwargs):
+        self.outputs.extend(ninja_syntax.as_list(outputs))
+        return super().build(outputs, rule, *args, **kwargs)
+
+    def getvalue(self) -> str:
+        return self.output.getvalue()
+
+
+def _write_if_changed(filename, content):
+    if os.path.isfile(filename):
+        with open(filename, "rb") as f:
+            if f.read() == content:
+                return False
+    with open(filename, "wb") as f:
+        f.write(content)
+    return True
+
+
+def update(
+    build_file: str,
+    inputs: str,
+    icons: Sequence[str],
+    nw: RecordingWriter,
+    generated: Iterable[str] = (),
+) -> Sequence[str]:
+    """Writes what nw recorded to build_file, if changed, and its manifest.
+
+    generated are files the generator wrote that no edge of nw builds, e.g.
+    inputs of its edges; the manifest records their digests. Outputs of the
+    previous manifest that nw doesn't build are removed, returns them
+    relative to the build dir.
+    """
+    build_dir = os.path.dirname(build_file)
+    content = nw.getvalue().encode("utf-8")
+    previous = load(build_file)
+    if _write_if_changed(build_file, content):
+        if previous is not None:
+            added = len(set(icons) - set(previous.icons))
+            removed = len(set(previous.icons) - set(icons))
+            rules = sorted(
+                r
+                for r in nw.rules.keys() | previous.rules.keys()
+                if nw.rules.get(r) != previous.rules.get(r)
+            )
+            logging.info(
+                "Rewrote %s, %d icons added, %d removed, rules changed: %s",
+                os.path.relpath(build_file),
+                added,
+                removed,
+                " ".join(rules) or "none",
+            )
+    else:
+        logging.info("%s is unchanged", os.path.relpath(build_file))
+
+    stale = []
+    if previous is not None:
+        outputs = set(nw.outputs)
+        stale = [o for o in previous.outputs if o not in outputs]
+        for output in stale:
+            try:
+                os.remove(os.path.join(build_dir, output))
+            except FileNotFoundError:
+                pass
+
+    manifest = Manifest(
+        inputs,
+        tuple(icons),
+        nw.rules,
+        tuple(nw.outputs),
+        _sha256(content),
+        {
+            os.path.relpath(filename, build_dir or os.curdir): _file_sha256(filename)
+            for filename in generated
+        },
+    )
+    with open(manifest_file(build_file), "w") as f:
+        json.dump((_VERSION, manifest._asdict()), f)
+    return stale
@@ -0,0 +1,178 @@
+# Copyright 2021 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Content addressed cache of generated symbols.
+
+Symbols are keyed by what they are drawn from, e.g. the instanced outline of
+each glyph, plus everything in vf2symbols that affects how they are drawn.
+A font change touching a few glyphs then only redraws the symbols using them.
+
+Entries are files under the cache dir; least recently used entries are
+evicted once the cache grows past its size budget. Several processes may
+share a cache dir, writes are atomic.
+
+PicoCache keeps SVGs normalized by picosvg the same way, in a subdir of the
+symbol cache, so redrawing symbols, e.g. after the template changed, skips
+the most expensive step of drawing from an SVG.
+"""
+import hashlib
+import os
+import tempfile
+import time
+
+from typing import Optional
+
+DEFAULT_MAX_BYTES = 256 * 2**20
+
+_PICO_SUBDIR = "pico"
+
+_TEMP_SUFFIX = ".tmp"
+# Temp files older than this were left by a put that was interrupted,
+# younger ones may be a put in progress in another process
+_STALE_TEMP_SECONDS = 3600
+
+
+class CacheKey:
+    """Accumulates the inputs of a symbol into a cache key.
+
+    Seeded with salt, by default everything that changes how symbols are drawn.
+    """
+
+    def __init__(self, salt: Optional[bytes] = None):
+        if salt is None:
+            # Imported here so flag defaults can come from this module cheaply
+            from vf2symbols import symbol
+
+            salt = symbol.cache_salt()
+        self._hash = hashlib.sha256(salt)
+
+    def update(self, *parts) -> "CacheKey":
+        for part in parts:
+            if not isinstance(part, bytes):
+                part = repr(part).encode("utf-8")
+            # length prefix so ("ab", "c") and ("a", "bc") differ
+            self._hash.update(len(part).to_bytes(8, "big"))
+            self._hash.update(part)
+        return self
+
+    def hexdigest(self) -> str:
+        return self._hash.hexdigest()
+
+
+class SymbolCache:
+    """Serialized symbols on disk, keyed by CacheKey."""
+
+    name = "cache"
+    suffix = ".svg"
+
+    def __init__(self, cache_dir: str, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._size = None
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], key + self.suffix)
+
+    def get(self, key: CacheKey) -> Optional[str]:
+        path = self._path(key.hexdigest())
+        try:
+            with open(path) as f:
+                svg = f.read()
+            # Bump mtime, eviction goes oldest first
+            os.utime(path)
+        except OSError:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return svg
+
+    def put(self, key: CacheKey, svg: str):
+        path = self._path(key.hexdigest())
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=_TEMP_SUFFIX)
+        with os.fdopen(fd, "w") as f:
+            f.write(svg)
+        try:
+            replaced = os.path.getsize(path)
+        except FileNotFoundError:
+            replaced = 0
+        os.replace(temp_path, path)
+
+        if self._size is None:
+            self._size = sum(st.st_size for _, st in self._entries())
+        else:
+            self._size += os.path.getsize(path) - replaced
+        if self._size > self.max_bytes:
+            self._evict()
+
+    def _entries(self):
+        """Each entry and its stat, removing stale temp files on the way."""
+        stale = time.time() - _STALE_TEMP_SECONDS
+        for dirpath, _, filenames in os.walk(self.cache_dir):
+            for filename in filenames:
+                path = os.path.join(dirpath, filename)
+                try:
+                    st = os.stat(path)
+                    if filename.endswith(_TEMP_SUFFIX) and st.st_mtime < stale:
+                        os.remove(path)
+                except FileNotFoundError:
+                    continue  # another process evicted or renamed it
+                if filename.endswith(self.suffix):
+                    yield path, st
+
+    def _evict(self):
+        # Drop to 90% of the budget so we don't evict on every put
+        entries = sorted(self._entries(), key=lambda e: e[1].st_mtime)
+        size = sum(st.st_size for _, st in entries)
+        target = self.max_bytes * 0.9
+        for path, st in entries:
+            if size <= target:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue  # another process got there first
+            size -= st.st_size
+            self.evictions += 1
+        self._size = size
+
+    def add_counts(self, hits: int, misses: int, evictions: int):
+        """Folds in the counts of a copy of this cache, e.g. in a worker."""
+        self.hits += hits
+        self.misses += misses
+        self.evictions += evictions
+        self._size = None  # the copy may have added entries
+
+    def stats(self) -> str:
+        lookups = self.hits + self.misses
+        return (
+            f"{self.hits}/{lookups} {self.name} hits, {self.misses} misses, "
+            f"{self.evictions} evicted"
+        )
+
+
+class PicoCache(SymbolCache):
+    """SVGs normalized by picosvg on disk, see svg_icon.normalize."""
+
+    name = "picosvg cache"
+    suffix = ".pico"
+
+    @classmethod
+    def beside(cls, symbol_cache: SymbolCache) -> "PicoCache":
+        """The PicoCache in symbol_cache's dir, with the same size budget."""
+        return cls(
+            os.path.join(symbol_cache.cache_dir, _PICO_SUBDIR), symbol_cache.max_bytes
+        )
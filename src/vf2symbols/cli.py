@@ -0,0 +1,48 @@
+# Copyright 2021 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Flags shared by the entry points, and the ninja arguments passing them on.
+
+Importing this defines them; it imports nothing heavy, for flag modules.
+The generators define their own --cache and --cache_max_mb, whose help
+differs, and build the arguments passing them on here.
+"""
+from absl import flags
+
+FLAGS = flags.FLAGS
+
+# Where the generators keep their caches, relative to build_dir
+CACHE_DIR = ".cache"
+
+flags.DEFINE_integer(
+    "path_precision",
+    None,
+    "Write path data compactly, coordinates rounded to this many decimal "
+    "places, relative where shorter and without repeated commands or needless "
+    "separators. None writes it as fontTools' SVGPathPen does.",
+    lower_bound=0,
+)
+
+
+def path_precision_args() -> str:
+    """--path_precision for ninja edges, if given."""
+    if FLAGS.path_precision is None:
+        return ""
+    return f"--path_precision {FLAGS.path_precision} "
+
+
+def cache_args() -> str:
+    """--cache_dir and --cache_max_mb for ninja edges, unless --nocache."""
+    if not FLAGS.cache:
+        return ""
+    return f"--cache_dir {CACHE_DIR} --cache_max_mb {FLAGS.cache_max_mb} "
@@ -0,0 +1,84 @@
+# Copyright 2021 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Runs a write_symbol_from_* command on a warm vf2symbols.daemon.
+
+Takes the command and then the arguments it takes on the command line. If no
+daemon is listening the command is run as usual, in a new process. Imports
+nothing heavy so it starts fast.
+
+Usage:
+python -m vf2symbols.client write_symbol_from_svgs --out a.svg Regular-M=a.svg
+python -m vf2symbols.client stats
+"""
+import json
+import os
+import socket
+import sys
+import tempfile
+
+from typing import Any, Dict, Sequence
+
+COMMANDS = (
+    "write_symbol_from_fonts",
+    "write_symbol_from_svg",
+    "write_symbol_from_svgs",
+)
+
+
+def default_socket_path() -> str:
+    runtime_dir = os.environ.get("XDG_RUNTIME_DIR") or tempfile.gettempdir()
+    return os.path.join(runtime_dir, f"vf2symbols-{os.getuid()}.sock")
+
+
+def request(
+    command: str, args: Sequence[str], socket_path: str = None
+) -> Dict[str, Any]:
+    """Sends a command to the daemon, returns its response.
+
+    Raises OSError if no daemon is listening on socket_path.
+    """
+    message = {"command": command, "args": list(args), "cwd": os.getcwd()}
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.connect(socket_path or default_socket_path())
+        with sock.makefile("rwb") as f:
+            f.write(json.dumps(message).encode("utf-8") + b"\n")
+            f.flush()
+            line = f.readline()
+    if not line:
+        raise ConnectionError("daemon closed the connection")
+    return json.loads(line)
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv or argv[0] not in COMMANDS + ("stats",):
+        sys.exit(f"Expected one of {', '.join(COMMANDS)} or stats")
+    command, args = argv[0], argv[1:]
+    socket_path = os.environ.get("VF2SYMBOLS_SOCKET")
+    try:
+        response = request(command, args, socket_path)
+    except OSError:
+        if command == "stats":
+            sys.exit("No vf2symbols daemon is running")
+        os.execv(sys.executable, [sys.executable, "-m", f"vf2symbols.{command}", *args])
+
+    if command == "stats":
+        print(json.dumps(response["stats"], indent=2))
+    if not response["ok"]:
+        sys.exit(response["error"])
+    sys.stdout.write(response.get("stdout", ""))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,341 @@
+# Copyright 2021 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Serves write_symbol_from_* commands from a warm process.
+
+Each command line tool pays for importing fontTools, picosvg and lxml, and
+parsing the symbol template, before drawing a symbol. The daemon does that
+once and keeps recently used fonts open, so a request costs about what
+drawing the symbol does. See vf2symbols.client to send requests.
+
+The protocol is JSON lines over a Unix socket. A request is
+{"command": ..., "args": [...], "cwd": ...}, args as the command takes them
+on the command line. A response is {"ok": true, "stdout": ...} or
+{"ok": false, "error": ...}. The "stats" command responds with latency stats
+per command. Requests are served concurrently, one thread per connection.
+
+Usage:
+python -m vf2symbols.daemon [--socket path]
+"""
+import collections
+import json
+import os
+import signal
+import socketserver
+import threading
+import time
+
+from absl import app
+from absl import flags
+from absl import logging
+from typing import Dict, List, Mapping, Sequence, Tuple
+
+from fontTools import ttLib
+from vf2symbols import batch
+from vf2symbols import cache
+from vf2symbols import client
+from vf2symbols import fonts
+from vf2symbols import output
+from vf2symbols import svg_icon
+from vf2symbols.symbol import Symbol
+
+FLAGS = flags.FLAGS
+
+flags.DEFINE_string(
+    "socket", None, "Unix socket to listen on, None for the client's default."
+)
+flags.DEFINE_integer("max_fonts", 32, "How many fonts to keep open.", lower_bound=1)
+
+# Flags of the write_symbol_from_* commands that take a value
+_VALUE_FLAGS = ("out", "cache_dir", "cache_max_mb", "alias_files", "path_precision")
+
+# Latencies kept per command for stats
+_LATENCY_WINDOW = 1000
+
+
+def _parse_args(args: Sequence[str]) -> Tuple[Dict[str, List[str]], List[str]]:
+    """Splits command line args into flag values and positional args."""
+    values = collections.defaultdict(list)
+    positional = []
+    args = iter(args)
+    for arg in args:
+        if arg == "--":
+            positional.extend(args)
+            break
+        if not arg.startswith("--"):
+            positional.append(arg)
+            continue
+        name, sep, value = arg[2:].partition("=")
+        if name not in _VALUE_FLAGS:
+            raise ValueError(f"--{name} isn't supported by the daemon")
+        if not sep:
+            value = next(args, None)
+            if value is None:
+                raise ValueError(f"--{name} needs a value")
+        values[name].append(value)
+    return values, positional
+
+
+class _Fonts:
+    """Most recently used fonts, reopened if their file changes.
+
+    TTFont loads tables lazily, so a font is only used under its lock.
+    """
+
+    def __init__(self, max_fonts: int):
+        self._max_fonts = max_fonts
+        self._fonts = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, font_filename: str) -> Tuple[ttLib.TTFont, threading.Lock]:
+        st = os.stat(font_filename)
+        version = (st.st_mtime_ns, st.st_size)
+        with self._lock:
+            entry = self._fonts.get(font_filename)
+            if entry is None or entry[0] != version:
+                # Read, not mapped, as it may well be saved over while open
+                with open(font_filename, "rb") as f:
+                    entry = (version, fonts.open_font(f.read()), threading.Lock())
+                self._fonts[font_filename] = entry
+            self._fonts.move_to_end(font_filename)
+            while len(self._fonts) > self._max_fonts:
+                self._fonts.popitem(last=False)
+        return entry[1], entry[2]
+
+
+class _SharedCache(cache.SymbolCache):
+    """A SymbolCache safe to use from several threads."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            return super().get(key)
+
+    def put(self, key, svg):
+        with self._lock:
+            super().put(key, svg)
+
+
+class _SharedPicoCache(_SharedCache, cache.PicoCache):
+    """A PicoCache safe to use from several threads."""
+
+
+class _Latencies:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._seconds = collections.defaultdict(
+            lambda: collections.deque(maxlen=_LATENCY_WINDOW)
+        )
+        self._counts = collections.Counter()
+        self._errors = collections.Counter()
+
+    def add(self, command: str, seconds: float, ok: bool):
+        with self._lock:
+            self._seconds[command].append(seconds)
+            self._counts[command] += 1
+            if not ok:
+                self._errors[command] += 1
+
+    def stats(self) -> Mapping[str, Mapping[str, float]]:
+        """Request count, errors and latency percentiles in ms, per command."""
+        with self._lock:
+            stats = {}
+            for command, seconds in self._seconds.items():
+                ms = sorted(s * 1000 for s in seconds)
+                stats[command] = {
+                    "requests": self._counts[command],
+                    "errors": self._errors[command],
+                    "p50_ms": round(ms[len(ms) // 2], 2),
+                    "p95_ms": round(ms[min(len(ms) - 1, len(ms) * 95 // 100)], 2),
+                    "max_ms": round(ms[-1], 2),
+                }
+            return stats
+
+
+class Daemon:
+    """Runs write_symbol_from_* commands, keeping fonts and caches warm."""
+
+    def __init__(self, max_fonts: int = 32):
+        self._fonts = _Fonts(max_fonts)
+        self._open_caches = {}
+        self._caches_lock = threading.Lock()
+        self.latencies = _Latencies()
+        # Parse the symbol template now rather than on the first request
+        Symbol()
+
+    def _caches(self, values, cwd):
+        """The symbol and picosvg caches in --cache_dir, Nones without one."""
+        if not values.get("cache_dir"):
+            return None, None
+        cache_dir = os.path.join(cwd, values["cache_dir"][-1])
+        max_bytes = cache.DEFAULT_MAX_BYTES
+        if values.get("cache_max_mb"):
+            max_bytes = int(values["cache_max_mb"][-1]) * 2**20
+        with self._caches_lock:
+            caches = self._open_caches.get((cache_dir, max_bytes))
+            if caches is None:
+                symbol_cache = _SharedCache(cache_dir, max_bytes)
+                caches = (symbol_cache, _SharedPicoCache.beside(symbol_cache))
+                self._open_caches[(cache_dir, max_bytes)] = caches
+            return caches
+
+    def _path_precision(self, values):
+        if not values.get("path_precision"):
+            return None
+        path_precision = int(values["path_precision"][-1])
+        if path_precision < 0:
+            raise ValueError("--path_precision must be at least 0")
+        return path_precision
+
+    def _write_symbol_from_fonts(self, values, args, cwd):
+        if not values.get("out"):
+            raise ValueError("Expected at least 1 --out")
+        ttfonts = {}
+        locks = {}
+        for symbol_wght_name, font_filename in batch.parse_font_args(args).items():
+            font_filename = os.path.join(cwd, font_filename)
+            ttfonts[symbol_wght_name], locks[font_filename] = self._fonts.get(
+                font_filename
+            )
+        out_files = batch.out_files_by_icon(os.path.join(cwd, o) for o in values["out"])
+        symbol_cache, _ = self._caches(values, cwd)
+
+        # In a consistent order so concurrent requests can't deadlock
+        held = [locks[f] for f in sorted(locks)]
+        for lock in held:
+            lock.acquire()
+        try:
+            batch.write_icon_files(
+                batch.load_instances(ttfonts),
+                out_files,
+                symbol_cache,
+                values.get("alias_files", ["copy"])[-1],
+                self._path_precision(values),
+            )
+        finally:
+            for lock in reversed(held):
+                lock.release()
+        return ""
+
+    def _write_svgs(self, values, layers, cwd):
+        layers = [(name, os.path.join(cwd, path)) for name, path in layers]
+        svg = batch.render_layered_svg_symbol(
+            layers, *self._caches(values, cwd), self._path_precision(values)
+        )
+        if not values.get("out"):
+            return svg + "\n"
+        output.write_if_changed(
+            os.path.join(cwd, values["out"][0]), svg.encode("utf-8")
+        )
+        return ""
+
+    def _write_symbol_from_svgs(self, values, args, cwd):
+        if not args:
+            raise ValueError("Expected at least 1 layer name and svg path pair")
+        if len(values.get("out", ())) > 1:
+            raise ValueError("Expected at most 1 --out")
+        return self._write_svgs(values, [arg.split("=") for arg in args], cwd)
+
+    def _write_symbol_from_svg(self, values, args, cwd):
+        if not args:
+            raise ValueError("Expected 1 or more SVG files")
+        outs = values.get("out") or [None]
+        if len(outs) != len(args):
+            raise ValueError(f"Expected an --out per SVG, got {len(outs)}")
+        stdout = ""
+        for svg_file, out in zip(args, outs):
+            svg_values = dict(values, out=[out] if out else [])
+            stdout += self._write_svgs(
+                svg_values, [(svg_icon.REQUIRED_SYMBOL, svg_file)], cwd
+            )
+        return stdout
+
+    def handle(self, message: Mapping) -> Mapping:
+        """The response to a request message."""
+        command = message.get("command")
+        if command == "stats":
+            return {"ok": True, "stats": self.latencies.stats()}
+        if command not in client.COMMANDS:
+            return {"ok": False, "error": f"Unknown command {command!r}"}
+
+        start = time.perf_counter()
+        try:
+            values, args = _parse_args(message.get("args", ()))
+            run = getattr(self, "_" + command)
+            response = {"ok": True, "stdout": run(values, args, message["cwd"])}
+        except Exception as e:
+            response = {"ok": False, "error": f"{type(e).__name__}: {e}"}
+        seconds = time.perf_counter() - start
+        self.latencies.add(command, seconds, response["ok"])
+        logging.debug("%s in %.1fms", command, seconds * 1000)
+        return response
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    def handle(self):
+        for line in self.rfile:
+            try:
+                message = json.loads(line)
+            except ValueError as e:
+                response = {"ok": False, "error": f"Bad request: {e}"}
+            else:
+                response = self.server.daemon.handle(message)
+            self.wfile.write(json.dumps(response).encode("utf-8") + b"\n")
+            self.wfile.flush()
+
+
+class _Server(socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+
+
+def serve(socket_path: str, daemon: Daemon) -> _Server:
+    """Listens on socket_path; call serve_forever() on the result."""
+    if os.path.exists(socket_path):
+        # Left behind by a daemon that didn't shut down cleanly?
+        try:
+            client.request("stats", (), socket_path)
+        except OSError:
+            os.remove(socket_path)
+        else:
+            raise RuntimeError(f"A daemon is already listening on {socket_path}")
+    server = _Server(socket_path, _Handler)
+    server.daemon = daemon
+    return server
+
+
+def _run(argv):
+    socket_path = FLAGS.socket or client.default_socket_path()
+    daemon = Daemon(FLAGS.max_fonts)
+    server = serve(socket_path, daemon)
+    # Stop on SIGTERM as on Ctrl+C, removing the socket
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
+    print(f"Listening on {socket_path}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        os.remove(socket_path)
+        logging.info("Latencies: %s", json.dumps(daemon.latencies.stats()))
+
+
+def main():
+    app.run(_run)
+
+
+if __name__ == "__main__":
+    app.run(_run)
@@ -0,0 +1,125 @@
+# Copyright 2021 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Opens fonts from files or memory without copying their outlines.
+
+ttLib.TTFont(path) reads the whole file into a buffer of its own, and each
+table it decompiles copies its data out of that buffer again; glyf then
+copies each glyph's data out of the table. Each worker drawing symbols held
+its own copies of the biggest tables of every font it drew.
+
+open_font maps font files read-only instead, so processes opening the same
+font share its pages in the page cache, and also takes fonts as bytes, for
+callers that don't have them on disk. Tables are loaded as they are first
+used, glyf and gvar as views of the mapped, or passed, data: their glyphs
+are never copied, only decoded when drawn.
+"""
+import io
+import mmap
+import os
+
+from typing import BinaryIO, Union
+
+from fontTools import ttLib
+
+# Tables whose data is handed out as memoryviews. fontTools reads them
+# with struct and array.frombytes, which take any buffer; others may not.
+_VIEW_TABLES = frozenset(("glyf", "gvar"))
+
+FontSource = Union[str, os.PathLike, bytes, bytearray, memoryview, mmap.mmap, BinaryIO]
+
+
+class _FontBuffer:
+    """A read-only seekable file over a buffer, as SFNTReader reads it.
+
+    Reads of the tables in _VIEW_TABLES return memoryviews of the buffer,
+    every other read a copy, as a file would.
+    """
+
+    def __init__(self, buffer):
+        self._view = memoryview(buffer).cast("B")
+        self._pos = 0
+        # (offset, length) of each table read as a view
+        self.views = frozenset()
+
+    def seekable(self):
+        return True
+
+    def seek(self, pos, whence=os.SEEK_SET):
+        if whence == os.SEEK_CUR:
+            pos += self._pos
+        elif whence == os.SEEK_END:
+            pos += len(self._view)
+        self._pos = max(0, pos)
+        return self._pos
+
+    def tell(self):
+        return self._pos
+
+    def read(self, size=-1):
+        start = self._pos
+        end = len(self._view) if size is None or size < 0 else start + size
+        data = self._view[start:end]
+        self._pos = start + len(data)
+        if (start, size) in self.views:
+            return data
+        return data.tobytes()
+
+    def close(self):
+        # Tables keep views of the buffer, it goes when the last of them does
+        pass
+
+
+def _map(f) -> Union[bytes, mmap.mmap]:
+    if os.fstat(f.fileno()).st_size == 0:
+        # Can't map nothing, let TTFont say it isn't a font
+        return b""
+    return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def open_font(source: FontSource, views: bool = True, **kwargs) -> ttLib.TTFont:
+    """A lazily loaded TTFont of a font file, or its bytes, sharing its data.
+
+    source is a path, mapped read-only, bytes or another buffer, used as is,
+    or a binary file, mapped if it has a file descriptor and read otherwise.
+    A mapped file must not be truncated while the font is in use, e.g. by
+    saving a font over it; read it and pass the bytes if it may be.
+
+    views=False copies the data instead, for fonts to be deep copied, e.g. by
+    the instancer, which memoryviews can't be. kwargs go to ttLib.TTFont.
+    """
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, "rb") as f:
+            buffer = _map(f)
+    elif isinstance(source, (bytes, bytearray, memoryview, mmap.mmap)):
+        buffer = source
+    else:
+        try:
+            buffer = _map(source)
+        except (AttributeError, OSError, ValueError):
+            # Not a real file, e.g. BytesIO
+            source.seek(0)
+            buffer = source.read()
+    if not views:
+        # fontTools knows to copy these
+        return ttLib.TTFont(io.BytesIO(buffer), lazy=True, **kwargs)
+    file = _FontBuffer(buffer)
+    ttfont = ttLib.TTFont(file, lazy=True, **kwargs)
+    # Compressed tables, in WOFF, are decoded from bytes
+    if ttfont.flavor is None:
+        file.views = frozenset(
+            (entry.offset, entry.length)
+            for tag, entry in ttfont.reader.tables.items()
+            if tag in _VIEW_TABLES
+        )
+    return ttfont
@@ -13,7 +13,24 @@
 # limitations under the License.
 """Helpers for  icon fonts."""
 
+import collections
 import functools
+import hashlib
+import io
+import os
+import pickle
+import tempfile
+import weakref
+
+from typing import Iterable, Iterator, Mapping, Sequence, Set, Tuple
+
+from fontTools import subset
+from fontTools import ttLib
+from fontTools.pens.recordingPen import DecomposingRecordingPen
+from fontTools.pens.svgPathPen import SVGPathPen
+from picosvg.geometric_types import Rect
+from vf2symbols import fonts
+from vf2symbols import instrument
 
 
 def wght_range(ttfont):
@@ -44,23 +61,198 @@ def _ligature_roots(ttfont):
     return lookup.SubTable[0].ligatures
 
 
+class IconFontIndex:
+    """Maps between icon names and ligature glyphs, built from one GSUB walk.
+
+    Instancing leaves cmap and GSUB alone so one index serves a variable font
+    and all of its instances. Indices pickle, see load_or_build.
+    """
+
+    def __init__(self, cmap: Mapping[int, str], ligatures: Mapping[Sequence, str]):
+        self._cmap = dict(cmap)
+        # tuple of glyph names => ligature glyph name
+        self._ligatures = dict(ligatures)
+
+        rev_cmap = {v: k for k, v in self._cmap.items()}
+        self._glyph_names = {}
+        self._icon_names = collections.defaultdict(list)
+        for glyph_names, lig_glyph in self._ligatures.items():
+            icon_name = "".join(chr(rev_cmap[n]) for n in glyph_names)
+            self._glyph_names[icon_name] = lig_glyph
+            self._icon_names[lig_glyph].append(icon_name)
+
+    @classmethod
+    def build(cls, ttfont: ttLib.TTFont) -> "IconFontIndex":
+        ligatures = {}
+        for first_glyph_name, ligature_set in _ligature_roots(ttfont).items():
+            for ligature in ligature_set:
+                glyph_names = (first_glyph_name,) + tuple(ligature.Component)
+                ligatures[glyph_names] = ligature.LigGlyph
+        return cls(_cmap(ttfont), ligatures)
+
+    @classmethod
+    def load_or_build(cls, font_filename: str, index_filename: str) -> "IconFontIndex":
+        """Loads the index pickled at index_filename if it matches the font.
+
+        Otherwise builds it and pickles it to index_filename for next time.
+        """
+        with open(font_filename, "rb") as f:
+            font_data = f.read()
+        font_digest = hashlib.sha256(font_data).hexdigest()
+        try:
+            with open(index_filename, "rb") as f:
+                version, digest, index = pickle.load(f)
+            if (version, digest) == (_INDEX_VERSION, font_digest):
+                return index
+        except (OSError, pickle.UnpicklingError, EOFError, ValueError):
+            pass
+
+        index = cls.build(fonts.open_font(font_data))
+        # Written beside it then renamed over it, so processes loading it
+        # concurrently never see part of one
+        fd, temp_path = tempfile.mkstemp(
+            dir=os.path.dirname(index_filename) or os.curdir, suffix=".tmp"
+        )
+        try:
+            with os.fdopen(fd, "wb") as f:
+                pickle.dump((_INDEX_VERSION, font_digest, index), f)
+            os.replace(temp_path, index_filename)
+        except BaseException:
+            os.remove(temp_path)
+            raise
+        return index
+
+    def resolve_ligature(self, icon_name: str) -> str:
+        glyph_name = self._glyph_names.get(icon_name)
+        if glyph_name is None:
+            # Spelled with codepoints that share a glyph with those in the index
+            glyph_name = self._ligatures[tuple(self._cmap[ord(c)] for c in icon_name)]
+        return glyph_name
+
+    def icon_names(self, glyph_name: str) -> Tuple[str, ...]:
+        """Every icon name whose ligature produces glyph_name."""
+        return tuple(self._icon_names.get(glyph_name, ()))
+
+    def extract_icon_names(self, name_filter) -> Iterator[str]:
+        return (n for n in self._glyph_names if name_filter.search(n))
+
+    def __len__(self):
+        return len(self._glyph_names)
+
+
+# Bump if the pickled form of IconFontIndex changes
+_INDEX_VERSION = 1
+
+# Per TTFont indices for the module level helpers
+_indices = weakref.WeakKeyDictionary()
+
+
+def index(ttfont: ttLib.TTFont) -> IconFontIndex:
+    """Returns the IconFontIndex for ttfont, building it on first use."""
+    font_index = _indices.get(ttfont)
+    if font_index is None:
+        font_index = _indices[ttfont] = IconFontIndex.build(ttfont)
+    return font_index
+
+
 def resolve_ligature(ttfont, icon_name):
-    cmap = _cmap(ttfont)
-    rev_cmap = {v: k for k, v in _cmap(ttfont).items()}
-    first_glyph_name = cmap[ord(icon_name[0])]
-    rest_of_glyph_names = [cmap[ord(c)] for c in icon_name[1:]]
-    ligatures = _ligature_roots(ttfont)[first_glyph_name]
-    return next(
-        filter(lambda l: l.Component == rest_of_glyph_names, ligatures)
-    ).LigGlyph
+    return index(ttfont).resolve_ligature(icon_name)
 
 
 def extract_icon_names(ttfont, name_filter):
-    rev_cmap = {v: k for k, v in _cmap(ttfont).items()}
+    return index(ttfont).extract_icon_names(name_filter)
 
-    for first_glyph_name, ligatures in _ligature_roots(ttfont).items():
-        for ligature in ligatures:
-            glyph_names = (first_glyph_name,) + tuple(ligature.Component)
-            icon_name = "".join(chr(rev_cmap[n]) for n in glyph_names)
-            if name_filter.search(icon_name):
-                yield icon_name
+
+def glyph_closure(ttfont: ttLib.TTFont, glyph_names: Iterable[str]) -> Set[str]:
+    """glyph_names plus the glyphs they use as components, recursively."""
+    closure = set()
+    pending = list(glyph_names)
+    glyf = ttfont["glyf"] if "glyf" in ttfont else None
+    while pending:
+        glyph_name = pending.pop()
+        if glyph_name in closure:
+            continue
+        closure.add(glyph_name)
+        if glyf is not None and glyf[glyph_name].isComposite():
+            pending.extend(c.glyphName for c in glyf[glyph_name].components)
+    return closure
+
+
+def subset_icons(
+    ttfont: ttLib.TTFont, icon_names: Iterable[str], font_index: IconFontIndex = None
+) -> ttLib.TTFont:
+    """A copy of ttfont keeping only what is needed to draw icon_names.
+
+    That is the icons' ligature glyphs and their components, plus the cmap
+    and GSUB entries to resolve the icon names. Variations are kept.
+    """
+    if font_index is None:
+        font_index = index(ttfont)
+    icon_names = tuple(icon_names)
+
+    # Saving bumps the timestamp, keep it so the subset is deterministic
+    modified = ttfont["head"].modified
+    buf = io.BytesIO()
+    ttfont.save(buf)
+    ttfont["head"].modified = modified
+    buf.seek(0)
+    subset_font = ttLib.TTFont(buf, recalcTimestamp=False)
+    subset_font["head"].modified = modified
+
+    options = subset.Options()
+    options.glyph_names = True
+    options.name_IDs = ["*"]
+    options.notdef_outline = True
+    options.layout_features = ["*"]
+    # Don't pull in every ligature reachable from the letters we keep
+    options.layout_closure = False
+    subsetter = subset.Subsetter(options)
+    subsetter.populate(
+        glyphs=glyph_closure(
+            ttfont, (font_index.resolve_ligature(n) for n in icon_names)
+        ),
+        unicodes={ord(c) for n in icon_names for c in n},
+    )
+    subsetter.subset(subset_font)
+    return subset_font
+
+
+def update_symbol(
+    symbol, ttfont, icon_name, symbol_wght_name, glyph_set=None, font_index=None
+):
+    """Draws the glyph for icon_name into the symbol_wght_name variant.
+
+    Pass glyph_set and font_index to reuse them across calls for the same font.
+    """
+    if font_index is None:
+        font_index = index(ttfont)
+    with instrument.stage("resolve_ligature"):
+        glyph_name = font_index.resolve_ligature(icon_name)
+    upem = ttfont["head"].unitsPerEm
+    if glyph_set is None:
+        glyph_set = ttfont.getGlyphSet()
+    # For Icon fonts, the Glyphs are Y shifted by upem and the Y axis is flipped.
+    symbol.write_icon(
+        symbol_wght_name,
+        glyph_set[glyph_name],
+        SVGPathPen(glyph_set),
+        Rect(0, upem, upem, -upem),
+    )
+
+
+def update_cache_key(
+    key, ttfont, icon_name, symbol_wght_name, glyph_set=None, font_index=None
+):
+    """Adds what update_symbol would draw to a cache.CacheKey.
+
+    That is the decomposed outline, so an edit to a component changes the
+    key of every icon that uses it.
+    """
+    if font_index is None:
+        font_index = index(ttfont)
+    if glyph_set is None:
+        glyph_set = ttfont.getGlyphSet()
+    with instrument.stage("cache_key"):
+        pen = DecomposingRecordingPen(glyph_set)
+        glyph_set[font_index.resolve_ligature(icon_name)].draw(pen)
+        key.update(symbol_wght_name, ttfont["head"].unitsPerEm, pen.value)
@@ -0,0 +1,224 @@
+# Copyright 2021 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Optional timings per stage of drawing a symbol, and counters.
+
+Off unless enable() is called: stage() then returns a shared no-op context
+manager and count() returns at once, so instrumented code pays a function
+call. Once enabled, each stage records its calls and inclusive time, and
+with trace=True a Chrome trace event per call, for chrome://tracing or
+https://ui.perfetto.dev.
+
+Recording is per process and not thread safe. Worker processes send theirs
+to the parent with collect() and merge(). Timestamps are perf_counter,
+system wide on Linux and macOS, so traces of several processes line up.
+"""
+import collections
+import json
+import os
+import threading
+import time
+
+from typing import Any, Dict, Mapping, Optional
+
+_recorder = None
+
+
+def _perf_counter_ns():
+    # time.perf_counter_ns is 3.7+
+    return int(time.perf_counter() * 1e9)
+
+
+class _NoOp:
+    """Returned by stage() when off; contextlib.nullcontext is 3.7+."""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        pass
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        pass
+
+
+_NO_OP = _NoOp()
+
+
+class _Recorder:
+    def __init__(self, trace: bool):
+        self.trace = trace
+        self.start_ns = _perf_counter_ns()
+        # stage name => [calls, ns]
+        self.stages = collections.defaultdict(lambda: [0, 0])
+        self.counters = collections.Counter()
+        self.events = []
+
+
+class _Stage:
+    __slots__ = ("_recorder", "_name", "_start_ns")
+
+    def __init__(self, recorder, name):
+        self._recorder = recorder
+        self._name = name
+
+    def __enter__(self):
+        self._start_ns = _perf_counter_ns()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        ns = _perf_counter_ns() - self._start_ns
+        stage = self._recorder.stages[self._name]
+        stage[0] += 1
+        stage[1] += ns
+        if self._recorder.trace:
+            self._recorder.events.append(
+                {
+                    "name": self._name,
+                    "ph": "X",
+                    "ts": self._start_ns / 1000,
+                    "dur": ns / 1000,
+                    "pid": os.getpid(),
+                    "tid": threading.get_ident(),
+                }
+            )
+
+
+def enable(trace: bool = False):
+    """Starts recording, discarding anything recorded so far."""
+    global _recorder
+    _recorder = _Recorder(trace)
+
+
+def disable():
+    global _recorder
+    _recorder = None
+
+
+def enabled() -> bool:
+    return _recorder is not None
+
+
+def tracing() -> bool:
+    return _recorder is not None and _recorder.trace
+
+
+def stage(name: str):
+    """A context manager timing a call of the stage name."""
+    if _recorder is None:
+        return _NO_OP
+    return _Stage(_recorder, name)
+
+
+def count(name: str, n: int = 1):
+    """Adds n to the counter name."""
+    if _recorder is not None:
+        _recorder.counters[name] += n
+
+
+def _stages(stages):
+    return {
+        name: {"calls": calls, "seconds": round(ns / 1e9, 6)}
+        for name, (calls, ns) in stages
+    }
+
+
+def collect() -> Dict[str, Any]:
+    """What was recorded since enable() or the last collect(), to merge().
+
+    Recording carries on from empty.
+    """
+    recorder = _recorder
+    enable(recorder.trace)
+    return {
+        "stages": _stages(recorder.stages.items()),
+        "counters": dict(recorder.counters),
+        "events": recorder.events,
+    }
+
+
+def merge(recorded: Mapping[str, Any]):
+    """Adds what another process recorded, per collect() or report().
+
+    Trace events are added if recorded has them.
+    """
+    for name, stage in recorded["stages"].items():
+        totals = _recorder.stages[name]
+        totals[0] += stage["calls"]
+        totals[1] += round(stage["seconds"] * 1e9)
+    _recorder.counters.update(recorded["counters"])
+    if _recorder.trace:
+        _recorder.events.extend(recorded.get("events", ()))
+
+
+def report() -> Dict[str, Any]:
+    """Wall time, then calls and seconds per stage, slowest first, and counters.
+
+    Stage times are inclusive, summed over every process merged in.
+    """
+    stages = sorted(_recorder.stages.items(), key=lambda s: s[1][1], reverse=True)
+    return {
+        "wall_seconds": round((_perf_counter_ns() - _recorder.start_ns) / 1e9, 6),
+        "stages": _stages(stages),
+        "counters": dict(sorted(_recorder.counters.items())),
+    }
+
+
+def start(report_path: Optional[str], trace_path: Optional[str]):
+    """Enables recording if either path is given, see finish()."""
+    if report_path or trace_path:
+        enable(trace=bool(trace_path))
+
+
+def finish(report_path: Optional[str], trace_path: Optional[str]):
+    """Writes the report and trace to the paths given."""
+    if report_path:
+        with open(report_path, "w") as f:
+            json.dump(report(), f, indent=2)
+            f.write("\n")
+    if trace_path:
+        with open(trace_path, "w") as f:
+            json.dump(
+                {
+                    "traceEvents": _recorder.events,
+                    "displayTimeUnit": "ms",
+                    "otherData": dict(_recorder.counters),
+                },
+                f,
+            )
+
+
+def ninja_args(profile_dir: str, name: str) -> str:
+    """--profile, and --profile_trace if tracing, for the ninja edge name.
+
+    Edges write to profile_dir, see merge_dir().
+    """
+    path = os.path.join(profile_dir, name)
+    if _recorder.trace:
+        return f" --profile {path}.json --profile_trace {path}.trace.json"
+    return f" --profile {path}.json"
+
+
+def merge_dir(profile_dir: str) -> int:
+    """Merges what the edges writing to profile_dir recorded, returns how many."""
+    merged = 0
+    for entry in sorted(os.listdir(profile_dir)):
+        if not entry.endswith(".json") or entry.endswith(".trace.json"):
+            continue
+        with open(os.path.join(profile_dir, entry)) as f:
+            recorded = json.load(f)
+        trace_file = os.path.join(profile_dir, entry[: -len(".json")] + ".trace.json")
+        if os.path.isfile(trace_file):
+            with open(trace_file) as f:
+                recorded["events"] = json.load(f)["traceEvents"]
+        merge(recorded)
+        merged += 1
+    return merged
@@ -0,0 +1,242 @@
+# Copyright 2021 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Glyph outlines at several design space locations, straight from gvar.
+
+Making an instance font per location re-processes and re-serializes every
+glyph in the font for each one. We only need outlines, so a glyph's deltas
+are decoded once, on first use, and applied at all locations in one NumPy
+operation. Coordinates are rounded as they are in a saved instance font.
+
+For fonts too big to hold every decoded glyph, pass max_bytes: least
+recently used glyphs beyond it are dropped, along with the glyf and gvar data
+fontTools decompiled for them, and decoded again if drawn again.
+"""
+import collections
+import copy
+
+from typing import Dict, List, Mapping, Sequence
+
+import numpy as np
+from fontTools import ttLib
+from fontTools.misc.fixedTools import floatToFixedToFloat
+from fontTools.misc.lazyTools import LazyDict
+from fontTools.ttLib.tables._g_l_y_f import (
+    Glyph,
+    GlyphCoordinates,
+    flagCubic,
+    flagOnCurve,
+)
+from fontTools.varLib.iup import iup_delta
+from fontTools.varLib.models import normalizeValue, piecewiseLinearMap, supportScalar
+
+
+def is_supported(ttfont: ttLib.TTFont) -> bool:
+    """Whether outlines for ttfont can be computed here.
+
+    CFF2 and avar2 fonts need a full instancer.
+    """
+    if "fvar" not in ttfont or "glyf" not in ttfont:
+        return False
+    return "avar" not in ttfont or getattr(ttfont["avar"], "majorVersion", 1) < 2
+
+
+def normalize_location(
+    ttfont: ttLib.TTFont, location: Mapping[str, float]
+) -> Dict[str, float]:
+    """Normalizes location the way fontTools instancer does.
+
+    Axes missing from location are at their default.
+    """
+    avar_segments = ttfont["avar"].segments if "avar" in ttfont else {}
+    normalized = {}
+    for axis in ttfont["fvar"].axes:
+        value = normalizeValue(
+            location.get(axis.axisTag, axis.defaultValue),
+            (axis.minValue, axis.defaultValue, axis.maxValue),
+        )
+        if avar_segments.get(axis.axisTag):
+            value = piecewiseLinearMap(value, avar_segments[axis.axisTag])
+        normalized[axis.axisTag] = floatToFixedToFloat(value, 14)
+    return normalized
+
+
+class GlyphOutlines:
+    """Outlines of the glyphs in ttfont at each of locations.
+
+    max_bytes, if given, bounds the decoded coordinates kept, roughly
+    bounding memory whatever the number of glyphs drawn.
+    """
+
+    def __init__(
+        self,
+        ttfont: ttLib.TTFont,
+        locations: Sequence[Mapping[str, float]],
+        max_bytes: int = None,
+    ):
+        self.glyf = ttfont["glyf"]
+        self._variations = ttfont["gvar"].variations if "gvar" in ttfont else {}
+        self._locations = [normalize_location(ttfont, loc) for loc in locations]
+        self._max_bytes = max_bytes
+        self._coordinates = collections.OrderedDict()
+        self._bytes = 0
+        # glyph name => (compact glyf data, gvar loader) to drop what
+        # fontTools decompiled for an evicted glyph
+        self._compact = {}
+        self.evictions = 0
+
+    def glyph_sets(self) -> List["OutlineGlyphSet"]:
+        """A glyph set per location, in the order locations were given."""
+        return [OutlineGlyphSet(self, i) for i in range(len(self._locations))]
+
+    def coordinates(self, glyph_name: str) -> np.ndarray:
+        """Points, or component offsets, at each location: (locations, n, 2)."""
+        coordinates = self._coordinates.get(glyph_name)
+        if coordinates is not None:
+            if self._max_bytes is not None:
+                self._coordinates.move_to_end(glyph_name)
+            return coordinates
+        if self._max_bytes is not None:
+            self._compact[glyph_name] = self._compact_data(glyph_name)
+        coordinates = self._coordinates[glyph_name] = self._instantiate(glyph_name)
+        self._bytes += coordinates.nbytes
+        if self._max_bytes is not None:
+            # Never evict the glyph just decoded, it's about to be drawn
+            while self._bytes > self._max_bytes and len(self._coordinates) > 1:
+                self._evict()
+        return coordinates
+
+    def _compact_data(self, glyph_name):
+        glyph = self.glyf.glyphs.get(glyph_name)
+        data = getattr(glyph, "data", None)
+        loader = None
+        if isinstance(self._variations, LazyDict):
+            loader = self._variations.data.get(glyph_name)
+        return data, loader if callable(loader) else None
+
+    def _evict(self):
+        glyph_name, coordinates = self._coordinates.popitem(last=False)
+        self._bytes -= coordinates.nbytes
+        self.evictions += 1
+        # Put back what fontTools had before decompiling the glyph; the
+        # glyph may have been decompiled before we saw it, then keep it
+        data, loader = self._compact.pop(glyph_name)
+        if data is not None:
+            self.glyf.glyphs[glyph_name] = Glyph(data)
+        if loader is not None:
+            self._variations.data[glyph_name] = loader
+
+    def _instantiate(self, glyph_name):
+        glyph = self.glyf[glyph_name]
+        if glyph.isComposite():
+            points = [
+                (getattr(c, "x", 0), getattr(c, "y", 0)) for c in glyph.components
+            ]
+            end_pts = list(range(len(points)))
+        elif glyph.numberOfContours > 0:
+            glyph_coords, end_pts, _ = glyph.getCoordinates(self.glyf)
+            points = list(glyph_coords)
+        else:
+            points, end_pts = [], []
+
+        coords = np.array(points, dtype=np.float64).reshape(-1, 2)
+        variations = self._variations.get(glyph_name)
+        if not points or not variations:
+            return np.broadcast_to(coords, (len(self._locations),) + coords.shape)
+
+        # Phantom points only carry metrics, zeros stand in so IUP is happy
+        orig_coords = points + [(0, 0)] * 4
+        deltas = np.array(
+            [
+                iup_delta(var.coordinates, orig_coords, end_pts)
+                if None in var.coordinates
+                else var.coordinates
+                for var in variations
+            ],
+            dtype=np.float64,
+        )[:, : len(points)]
+        scalars = np.array(
+            [
+                [supportScalar(loc, var.axes) for var in variations]
+                for loc in self._locations
+            ]
+        )
+        # (locations, variations) x (variations, points, 2), then otRound
+        return np.floor(coords + np.einsum("lv,vpd->lpd", scalars, deltas) + 0.5)
+
+    def glyph(self, glyph_name: str, location_index: int):
+        """A copy of the glyf glyph moved to the location at location_index."""
+        # Coordinates first, the glyph may be decoded anew
+        coords = self.coordinates(glyph_name)[location_index].tolist()
+        glyph = self.glyf[glyph_name]
+        instance = copy.copy(glyph)
+        if glyph.isComposite():
+            instance.components = [copy.copy(c) for c in glyph.components]
+            for component, (x, y) in zip(instance.components, coords):
+                if hasattr(component, "x"):
+                    component.x, component.y = int(x), int(y)
+        elif coords:
+            instance.coordinates = GlyphCoordinates(coords)
+        return instance
+
+
+class OutlineGlyphSet(collections.abc.Mapping):
+    """Glyph set drawing glyphs at one of the locations of a GlyphOutlines."""
+
+    def __init__(self, outlines: GlyphOutlines, location_index: int):
+        self._outlines = outlines
+        self._location_index = location_index
+
+    def __getitem__(self, glyph_name):
+        if glyph_name not in self._outlines.glyf:
+            raise KeyError(glyph_name)
+        return _OutlineGlyph(self._outlines, glyph_name, self._location_index)
+
+    def __iter__(self):
+        return iter(self._outlines.glyf.keys())
+
+    def __len__(self):
+        return len(self._outlines.glyf.keys())
+
+
+class _OutlineGlyph:
+    def __init__(self, outlines, glyph_name, location_index):
+        self._outlines = outlines
+        self._glyph_name = glyph_name
+        self._location_index = location_index
+
+    def glyf_contours(self):
+        """(coordinates, end points, on-curve flags), None if not simple.
+
+        Lets vf2symbols.path_data read a simple quadratic glyph as arrays
+        rather than through the pen protocol. Composites and glyphs with
+        cubic points are drawn.
+        """
+        coordinates = self._outlines.coordinates(self._glyph_name)
+        glyph = self._outlines.glyf[self._glyph_name]
+        if glyph.isComposite() or glyph.numberOfContours <= 0:
+            return None
+        flags = np.frombuffer(bytes(glyph.flags), dtype=np.uint8)
+        if (flags & flagCubic).any():
+            return None
+        return (
+            coordinates[self._location_index],
+            glyph.endPtsOfContours,
+            (flags & flagOnCurve).tolist(),
+        )
+
+    def draw(self, pen):
+        # Components are resolved through the pen's glyph set, pass
+        # the OutlineGlyphSet for the same location
+        glyph = self._outlines.glyph(self._glyph_name, self._location_index)
+        glyph.draw(pen, self._outlines.glyf)
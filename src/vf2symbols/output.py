@@ -0,0 +1,215 @@
+# Copyright 2021 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Writes symbol files, leaving those that already hold the same bytes.
+
+Rewriting an unchanged symbol bumps its mtime, so Xcode recompiles the asset
+catalogs using it. Each file is compared with what is on disk, size first
+then content, and only changed files are written: to a temporary file beside
+them, renamed over them, so readers never see a partial symbol and a file an
+earlier run made a link is replaced rather than written through.
+
+On network volumes a write is mostly waiting, so FileWriter writes from a
+few threads, holding a bounded number of pending writes.
+"""
+import os
+import secrets
+import stat
+import threading
+import time
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable
+
+from vf2symbols import instrument
+
+DEFAULT_THREADS = 8
+
+# How the files of aliases are made from the file they are an alias of
+ALIAS_FILES = ("copy", "hardlink", "symlink")
+
+
+def is_unchanged(path: str, data: bytes) -> bool:
+    """Whether path is a regular file holding data, not a link to one."""
+    try:
+        st = os.lstat(path)
+    except FileNotFoundError:
+        return False
+    if not stat.S_ISREG(st.st_mode) or st.st_size != len(data):
+        return False
+    with open(path, "rb") as f:
+        return f.read() == data
+
+
+def _replace(path, make_temp):
+    """Makes path by make_temp(temp path) beside it, then renames it over path.
+
+    make_temp must fail with FileExistsError if the temp path exists. Temp
+    names are random, as mkstemp's are, so writers of the same path never
+    touch each other's; unlike mkstemp, files get the usual permissions.
+    """
+    directory, name = os.path.split(path)
+    while True:
+        temp_path = os.path.join(directory, f".{name}.{secrets.token_hex(4)}.tmp")
+        try:
+            make_temp(temp_path)
+            break
+        except FileExistsError:
+            continue
+    try:
+        os.replace(temp_path, path)
+    except BaseException:
+        os.remove(temp_path)
+        raise
+
+
+def _write_temp(data):
+    def write(temp_path):
+        with open(temp_path, "xb") as f:
+            try:
+                f.write(data)
+            except BaseException:
+                os.remove(temp_path)
+                raise
+
+    return write
+
+
+def write_if_changed(path: str, data: bytes) -> bool:
+    """Writes data to path, atomically, unless it holds it. Returns if written."""
+    if is_unchanged(path, data):
+        return False
+    _replace(path, _write_temp(data))
+    return True
+
+
+def _link_if_changed(path, alias_path, alias_files):
+    if alias_files == "hardlink":
+        try:
+            if os.path.samefile(path, alias_path) and not os.path.islink(alias_path):
+                return False
+        except FileNotFoundError:
+            pass
+        _replace(alias_path, lambda temp_path: os.link(path, temp_path))
+        return True
+    target = os.path.relpath(path, os.path.dirname(alias_path) or os.curdir)
+    if os.path.islink(alias_path) and os.readlink(alias_path) == target:
+        return False
+    _replace(alias_path, lambda temp_path: os.symlink(target, temp_path))
+    return True
+
+
+class FileWriter:
+    """Writes files if changed, from a pool of threads, until close().
+
+    Errors are raised by write() once noticed, or close().
+    """
+
+    def __init__(self, threads: int = DEFAULT_THREADS):
+        self.threads = threads
+        self.written = 0
+        self.unchanged = 0
+        self.bytes_written = 0
+        self.seconds = 0.0
+        self._executor = ThreadPoolExecutor(
+            threads, thread_name_prefix="vf2symbols-write"
+        )
+        # Bounds the writes waiting, and the data they hold
+        self._slots = threading.BoundedSemaphore(threads * 4)
+        self._lock = threading.Lock()
+        # Writes not done yet, to cancel on an error
+        self._pending = set()
+        self._error = None
+        self._start = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def write(
+        self,
+        path: str,
+        data: bytes,
+        aliases: Iterable[str] = (),
+        alias_files: str = "copy",
+    ):
+        """Writes data to path unless it holds it, then makes its aliases.
+
+        Each alias is a copy, hard link or symlink of path, as alias_files
+        says. Links are made once path is written, in the same thread.
+        """
+        if alias_files not in ALIAS_FILES:
+            raise ValueError(f"alias_files must be one of {', '.join(ALIAS_FILES)}")
+        self._raise_error()
+        if self._start is None:
+            self._start = time.perf_counter()
+        with instrument.stage("write"):
+            self._slots.acquire()
+        future = self._executor.submit(
+            self._write, path, data, tuple(aliases), alias_files
+        )
+        with self._lock:
+            self._pending.add(future)
+        future.add_done_callback(self._done)
+
+    def _write(self, path, data, aliases, alias_files):
+        written = [write_if_changed(path, data)]
+        for alias in aliases:
+            if alias_files == "copy":
+                written.append(write_if_changed(alias, data))
+            else:
+                written.append(_link_if_changed(path, alias, alias_files))
+        copies = 1 + (len(aliases) if alias_files == "copy" else 0)
+        with self._lock:
+            self.written += sum(written)
+            self.unchanged += len(written) - sum(written)
+            self.bytes_written += len(data) * sum(written[:copies])
+
+    def _done(self, future):
+        self._slots.release()
+        error = None if future.cancelled() else future.exception()
+        with self._lock:
+            self._pending.discard(future)
+            if error is not None:
+                self._error = self._error or error
+
+    def _raise_error(self):
+        if self._error is not None:
+            with self._lock:
+                pending = list(self._pending)
+            for future in pending:
+                future.cancel()
+            self._executor.shutdown(wait=True)
+            raise self._error
+
+    def close(self):
+        """Waits for pending writes, raising the first error of any."""
+        with instrument.stage("write"):
+            self._executor.shutdown(wait=True)
+        if self._start is not None:
+            self.seconds = time.perf_counter() - self._start
+        instrument.count("bytes_written", self.bytes_written)
+        instrument.count("files_written", self.written)
+        instrument.count("files_unchanged", self.unchanged)
+        self._raise_error()
+
+    def stats(self) -> str:
+        files = self.written + self.unchanged
+        return (
+            f"{self.written} of {files} files written, {self.unchanged} unchanged, "
+            f"{self.bytes_written / 2**20:.1f}MB in {self.seconds:.2f}s "
+            f"({files / self.seconds if self.seconds else 0:.0f} files/s, "
+            f"{self.threads} threads)"
+        )
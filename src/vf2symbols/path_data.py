@@ -0,0 +1,551 @@
+# Copyright 2021 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""SVG path data for a drawing under an affine transform, in bulk.
+
+Drawing through TransformPen into SVGPathPen costs a few Python calls and
+string formats per point. Here the drawing is recorded once, every point is
+transformed in one NumPy operation, as are the implied on-curve points of
+quadratic curves, and coordinates are formatted in one pass. Commands are
+then emitted by the same rules as SVGPathPen, so the output is identical,
+including H/V lines, dropped duplicate points and implicit lineto after M.
+
+With a precision, path data is encoded compactly instead: coordinates are
+rounded in the same NumPy pass, then each command is written absolute or
+relative, whichever is shorter, omitting repeated command letters and any
+separator the SVG path grammar doesn't need. Relative coordinates are
+differences of rounded points, so every point stays within half a unit in
+the last decimal place of where the drawing put it.
+"""
+import functools
+import itertools
+import math
+import re
+
+from typing import Callable, Optional
+
+import numpy as np
+from fontTools.misc.transform import Identity, Transform
+from fontTools.pens.basePen import BasePen
+from vf2symbols import instrument
+
+
+class _Unsupported(Exception):
+    """The drawing needs a pen feature not emulated here."""
+
+
+class _Recorder:
+    """Records a drawing as ops over point indices, decomposing components.
+
+    Components are drawn under the product of their transform and the
+    transform they are placed under, as TransformPen and DecomposingPen do.
+    They are drawn while the parent is drawing so glyph sets apply the same
+    offsets they would for the pens.
+
+    Glyphs that offer glyf_contours() are read as arrays rather than drawn,
+    giving the ops Glyph.draw would.
+    """
+
+    def __init__(self, glyph_set, transform):
+        self.glyph_set = glyph_set
+        # (points, transform index), points a list of tuples or an array
+        self.pieces = []
+        self.point_count = 0
+        self.transforms = [transform]
+        # Pairs of point indices whose midpoint is an implied on-curve point
+        self.midpoints = []
+        self.ops = []
+        self._transform_id = 0
+        self._loose_points = None
+
+    def draw(self, glyph):
+        glyf_contours = getattr(glyph, "glyf_contours", None)
+        contours = glyf_contours() if glyf_contours is not None else None
+        if contours is None:
+            glyph.draw(self)
+        else:
+            self._add_glyf_contours(*contours)
+
+    def _add(self, pts):
+        if self._loose_points is None:
+            self._loose_points = []
+            self.pieces.append((self._loose_points, self._transform_id))
+        start = self.point_count
+        self._loose_points.extend(pts)
+        self.point_count += len(pts)
+        return start
+
+    def _add_array(self, coordinates):
+        self._loose_points = None
+        self.pieces.append((coordinates, self._transform_id))
+        start = self.point_count
+        self.point_count += len(coordinates)
+        return start
+
+    def moveTo(self, pt):
+        self.ops.append(("M", self._add((pt,))))
+
+    def lineTo(self, pt):
+        self.ops.append(("L", self._add((pt,))))
+
+    def curveTo(self, *points):
+        if len(points) == 3:
+            start = self._add(points)
+            self.ops.append(("C", start, start + 1, start + 2))
+        elif len(points) == 2:
+            self.qCurveTo(*points)
+        elif len(points) == 1:
+            self.lineTo(points[0])
+        else:
+            raise _Unsupported("super bezier")
+
+    def qCurveTo(self, *points):
+        implied_start = points[-1] is None
+        if implied_start:
+            points = points[:-1]
+        if not points:
+            raise _Unsupported("empty qCurveTo")
+        start = self._add(points)
+        if len(points) == 2 and not implied_start:
+            self.ops.append(("q", start, start + 1))
+        else:
+            self._add_quadratic(range(start, start + len(points)), implied_start)
+
+    def _add_quadratic(self, indices, implied_start):
+        first_midpoint = len(self.midpoints)
+        if implied_start:
+            # Between the last and first off-curve points
+            self.midpoints.append((indices[-1], indices[0]))
+        midpoints = len(indices) - (1 if implied_start else 2)
+        self.midpoints.extend(zip(indices[:midpoints], indices[1 : midpoints + 1]))
+        self.ops.append(("Q", indices, implied_start, first_midpoint))
+
+    def _add_glyf_contours(self, coordinates, end_pts, on_curve):
+        start = self._add_array(coordinates)
+        contour_start = 0
+        for end in end_pts:
+            end += 1
+            on = [i for i in range(contour_start, end) if on_curve[i]]
+            if not on:
+                self._add_quadratic(range(start + contour_start, start + end), True)
+                self.ops.append(("Z",))
+                contour_start = end
+                continue
+            # The contour starts, and ends, at its first on-curve point
+            first = on[0]
+            self.ops.append(("M", start + first))
+            prev = first
+            for i in on[1:] + [first]:
+                if i == prev + 1:
+                    if i != first:
+                        self.ops.append(("L", start + i))
+                elif i == prev + 2:
+                    self.ops.append(("q", start + prev + 1, start + i))
+                else:
+                    if i > prev:
+                        indices = range(start + prev + 1, start + i + 1)
+                    else:
+                        # Wraps around the end of the contour
+                        indices = [
+                            start + j
+                            for j in itertools.chain(
+                                range(prev + 1, end), range(contour_start, i + 1)
+                            )
+                        ]
+                    if len(indices) == 1:
+                        if i != first:
+                            self.ops.append(("L", indices[0]))
+                    else:
+                        self._add_quadratic(indices, False)
+                prev = i
+            self.ops.append(("Z",))
+            contour_start = end
+
+    def closePath(self):
+        self.ops.append(("Z",))
+
+    def endPath(self):
+        self.ops.append(("E",))
+
+    def addComponent(self, glyph_name, transformation):
+        transform = self.transforms[self._transform_id].transform(transformation)
+        if transform == Identity or glyph_name not in self.glyph_set:
+            raise _Unsupported(glyph_name)
+        parent_id = self._transform_id
+        self._transform_id = len(self.transforms)
+        self.transforms.append(transform)
+        self._loose_points = None
+        self.draw(self.glyph_set[glyph_name])
+        self._transform_id = parent_id
+        self._loose_points = None
+
+    def addVarComponent(self, glyph_name, transformation, location):
+        raise _Unsupported(glyph_name)
+
+
+def _is_float_offset(v):
+    # Adding a float offset makes every coordinate a float, as it is with
+    # NumPy. Unless the offset is -0.0 it also erases any difference in the
+    # sign of zero products, where Python multiplied ints and NumPy floats.
+    # An int offset could leave an int, which formats differently.
+    return isinstance(v, float) and (v != 0 or math.copysign(1, v) > 0)
+
+
+def svg_path_data(
+    drawable,
+    glyph_set,
+    transform,
+    ntos: Callable[[float], str] = str,
+    precision: Optional[int] = None,
+) -> Optional[str]:
+    """What drawable draws through TransformPen into SVGPathPen.
+
+    That is " ".join of the pen's commands. With precision, compact path data
+    with coordinates rounded to that many decimal places instead, ntos is
+    unused. Returns None for drawings that need pen features not emulated
+    here, draw those through the pens, or CompactPathPen.
+    """
+    if not hasattr(transform, "transformPoint"):
+        transform = Transform(*transform)
+    recorder = _Recorder(glyph_set, transform)
+    try:
+        recorder.draw(drawable)
+    except _Unsupported:
+        return None
+    if precision is None and not all(
+        _is_float_offset(t.dx) and _is_float_offset(t.dy) for t in recorder.transforms
+    ):
+        return None
+    instrument.count("points", recorder.point_count)
+    if not recorder.point_count:
+        if precision is not None:
+            return _emit_compact(recorder.ops, [], [], [], [], precision)
+        return _emit(recorder.ops, [], [], [], [], [], [], [], [])
+
+    points = np.concatenate(
+        [np.asarray(p, dtype=np.float64).reshape(-1, 2) for p, _ in recorder.pieces]
+    )
+    transform_ids = np.repeat(
+        [t for _, t in recorder.pieces], [len(p) for p, _ in recorder.pieces]
+    )
+    xx, xy, yx, yy, dx, dy = np.array(recorder.transforms, dtype=np.float64)[
+        transform_ids
+    ].T
+    # Same operation order as Transform.transformPoint
+    x = xx * points[:, 0] + yx * points[:, 1] + dx
+    y = xy * points[:, 0] + yy * points[:, 1] + dy
+    if recorder.midpoints:
+        pairs = np.array(recorder.midpoints)
+        mid_x = 0.5 * (x[pairs[:, 0]] + x[pairs[:, 1]])
+        mid_y = 0.5 * (y[pairs[:, 0]] + y[pairs[:, 1]])
+    else:
+        mid_x = mid_y = np.empty(0)
+
+    if precision is not None:
+        scale = 10.0**precision
+        return _emit_compact(
+            recorder.ops,
+            *(np.rint(v * scale).astype(np.int64).tolist() for v in (x, y)),
+            *(np.rint(v * scale).astype(np.int64).tolist() for v in (mid_x, mid_y)),
+            precision,
+        )
+
+    x, y, mid_x, mid_y = x.tolist(), y.tolist(), mid_x.tolist(), mid_y.tolist()
+    return _emit(
+        recorder.ops,
+        x,
+        y,
+        list(map(ntos, x)),
+        list(map(ntos, y)),
+        mid_x,
+        mid_y,
+        list(map(ntos, mid_x)),
+        list(map(ntos, mid_y)),
+    )
+
+
+def _emit(ops, x, y, str_x, str_y, mid_x, mid_y, str_mid_x, str_mid_y):
+    # Follows SVGPathPen, and BasePen's decomposition of quadratic curves
+    commands = []
+    last_command = last_x = last_y = None
+
+    def move_to(px, py, sx, sy):
+        nonlocal last_command, last_x, last_y
+        if last_command == "M":
+            commands.pop()
+        commands.append(f"M{sx} {sy}")
+        last_command = "M"
+        last_x, last_y = px, py
+
+    def line_to(px, py, sx, sy):
+        nonlocal last_command, last_x, last_y
+        if px == last_x and py == last_y:
+            return
+        if px == last_x:
+            commands.append("V" + sy)
+            last_command = "V"
+        elif py == last_y:
+            commands.append("H" + sx)
+            last_command = "H"
+        elif last_command == "M":
+            commands.append(f" {sx} {sy}")
+        else:
+            commands.append(f"L{sx} {sy}")
+            last_command = "L"
+        last_x, last_y = px, py
+
+    for op in ops:
+        kind = op[0]
+        if kind == "M":
+            i = op[1]
+            move_to(x[i], y[i], str_x[i], str_y[i])
+        elif kind == "L":
+            i = op[1]
+            line_to(x[i], y[i], str_x[i], str_y[i])
+        elif kind == "C":
+            _, i, j, k = op
+            commands.append(
+                f"C{str_x[i]} {str_y[i]} {str_x[j]} {str_y[j]} {str_x[k]} {str_y[k]}"
+            )
+            last_command = "C"
+            last_x, last_y = x[k], y[k]
+        elif kind == "q":
+            # The common quadratic, one off-curve point
+            _, i, j = op
+            commands.append(f"Q{str_x[i]} {str_y[i]} {str_x[j]} {str_y[j]}")
+            last_command = "Q"
+            last_x, last_y = x[j], y[j]
+        elif kind == "Q":
+            _, indices, implied_start, m = op
+            # (x, y, str x, str y) of each point
+            pts = [(x[i], y[i], str_x[i], str_y[i]) for i in indices]
+            if implied_start:
+                pts.append((mid_x[m], mid_y[m], str_mid_x[m], str_mid_y[m]))
+                move_to(*pts[-1])
+                m += 1
+            if len(pts) == 1:
+                line_to(*pts[0])
+                continue
+            for n, (_, _, sx, sy) in enumerate(pts[:-2]):
+                commands.append(f"Q{sx} {sy} {str_mid_x[m + n]} {str_mid_y[m + n]}")
+            off, on = pts[-2], pts[-1]
+            commands.append(f"Q{off[2]} {off[3]} {on[2]} {on[3]}")
+            last_command = "Q"
+            last_x, last_y = on[0], on[1]
+        elif kind == "Z":
+            commands.append("Z")
+            last_command = "Z"
+            last_x = last_y = None
+        else:
+            last_command = None
+            last_x = last_y = None
+    return " ".join(commands)
+
+
+def _emit_compact(ops, x, y, mid_x, mid_y, precision):
+    # The ops as _emit walks them, coordinates in units of 10**-precision
+    path = _CompactPath(precision)
+    for op in ops:
+        kind = op[0]
+        if kind == "M":
+            i = op[1]
+            path.move_to(x[i], y[i])
+        elif kind == "L":
+            i = op[1]
+            path.line_to(x[i], y[i])
+        elif kind == "C":
+            _, i, j, k = op
+            path.curve_to(x[i], y[i], x[j], y[j], x[k], y[k])
+        elif kind == "q":
+            _, i, j = op
+            path.q_curve_to(x[i], y[i], x[j], y[j])
+        elif kind == "Q":
+            _, indices, implied_start, m = op
+            pts = [(x[i], y[i]) for i in indices]
+            if implied_start:
+                pts.append((mid_x[m], mid_y[m]))
+                path.move_to(*pts[-1])
+                m += 1
+            if len(pts) == 1:
+                path.line_to(*pts[0])
+                continue
+            for n, (px, py) in enumerate(pts[:-2]):
+                path.q_curve_to(px, py, mid_x[m + n], mid_y[m + n])
+            path.q_curve_to(*pts[-2], *pts[-1])
+        elif kind == "Z":
+            path.close()
+        else:
+            path.end()
+    return path.tostring()
+
+
+# A space between a number with a point and one starting with a point
+_NEEDLESS_SPACE = re.compile(r"(\.\d+) (?=\.)")
+# What a bare number continues after a move
+_IMPLICIT = {"M": "L", "m": "l"}
+
+
+@functools.lru_cache(maxsize=2**16)
+def _format_number(n, precision):
+    """n units of 10**-precision, without needless zeros."""
+    if not precision:
+        return str(n)
+    whole, frac = divmod(abs(n), 10**precision)
+    if frac:
+        frac = f"{frac:0{precision}d}".rstrip("0")
+        s = f"{whole}.{frac}" if whole else f".{frac}"
+    else:
+        s = str(whole)
+    return "-" + s if n < 0 else s
+
+
+class _CompactPath:
+    """Path data in few characters, coordinates in units of 10**-precision.
+
+    Moves are held until something is drawn from them, so a move replaced by
+    another, or closed at once, draws nothing and isn't written. Lines to
+    the current point are dropped.
+    """
+
+    def __init__(self, precision: int):
+        self._precision = precision
+        self._parts = []
+        # The command a bare number continues, None where one can't
+        self._implicit = None
+        # Whether the last number written has a decimal point
+        self._last_dot = False
+        self._x = self._y = 0
+        self._start = (0, 0)
+        self._move = None
+
+    def _encode(self, command, numbers):
+        """command and numbers as written after what was written so far.
+
+        Also returns the last number.
+        """
+        strs = [_format_number(n, self._precision) for n in numbers]
+        # No separator before a sign, or a point after a number with one
+        encoded = " ".join(strs).replace(" -", "-")
+        if " ." in encoded:
+            encoded = _NEEDLESS_SPACE.sub(r"\1", encoded)
+        if command != self._implicit:
+            return command + encoded, strs[-1]
+        first = encoded[0]
+        if first != "-" and (first != "." or not self._last_dot):
+            return " " + encoded, strs[-1]
+        return encoded, strs[-1]
+
+    def _write(self, command, absolute, relative, x, y):
+        """Writes whichever of absolute and relative numbers is shorter."""
+        encoded, last = self._encode(command, absolute)
+        relative_encoded, relative_last = self._encode(command.lower(), relative)
+        if len(relative_encoded) < len(encoded):
+            command = command.lower()
+            encoded, last = relative_encoded, relative_last
+        self._parts.append(encoded)
+        self._last_dot = "." in last
+        self._implicit = _IMPLICIT.get(command, command)
+        self._x, self._y = x, y
+
+    def _draw(self):
+        if self._move is None:
+            return
+        x, y = self._move
+        self._move = None
+        self._write("M", (x, y), (x - self._x, y - self._y), x, y)
+        self._start = (x, y)
+
+    def move_to(self, x, y):
+        self._move = (x, y)
+
+    def line_to(self, x, y):
+        self._draw()
+        cx, cy = self._x, self._y
+        if x == cx and y == cy:
+            return
+        if y == cy:
+            self._write("H", (x,), (x - cx,), x, y)
+        elif x == cx:
+            self._write("V", (y,), (y - cy,), x, y)
+        else:
+            self._write("L", (x, y), (x - cx, y - cy), x, y)
+
+    def curve_to(self, x1, y1, x2, y2, x, y):
+        self._draw()
+        cx, cy = self._x, self._y
+        self._write(
+            "C",
+            (x1, y1, x2, y2, x, y),
+            (x1 - cx, y1 - cy, x2 - cx, y2 - cy, x - cx, y - cy),
+            x,
+            y,
+        )
+
+    def q_curve_to(self, x1, y1, x, y):
+        self._draw()
+        cx, cy = self._x, self._y
+        self._write("Q", (x1, y1, x, y), (x1 - cx, y1 - cy, x - cx, y - cy), x, y)
+
+    def close(self):
+        if self._move is not None:
+            self._move = None
+            return
+        if self._implicit is None:
+            return
+        self._parts.append("Z")
+        self._implicit = None
+        self._x, self._y = self._start
+
+    def end(self):
+        self._move = None
+        self._implicit = None
+
+    def tostring(self) -> str:
+        return "".join(self._parts)
+
+
+class CompactPathPen(BasePen):
+    """Draws compact path data, as svg_path_data does with a precision.
+
+    For drawings svg_path_data can't record. Points are rounded as they are
+    drawn.
+    """
+
+    def __init__(self, glyph_set, precision: int):
+        super().__init__(glyph_set)
+        self._path = _CompactPath(precision)
+        self._scale = 10.0**precision
+
+    def _round(self, pt):
+        return round(pt[0] * self._scale), round(pt[1] * self._scale)
+
+    def _moveTo(self, pt):
+        self._path.move_to(*self._round(pt))
+
+    def _lineTo(self, pt):
+        self._path.line_to(*self._round(pt))
+
+    def _curveToOne(self, pt1, pt2, pt3):
+        self._path.curve_to(*self._round(pt1), *self._round(pt2), *self._round(pt3))
+
+    def _qCurveToOne(self, pt1, pt2):
+        self._path.q_curve_to(*self._round(pt1), *self._round(pt2))
+
+    def _closePath(self):
+        self._path.close()
+
+    def _endPath(self):
+        self._path.end()
+
+    def getCommands(self) -> str:
+        return self._path.tostring()
@@ -17,6 +17,7 @@ Places the static SVG in the 'Regular-M' required variant of the iOS symbol.
 """
 import os
 import re
+import shutil
 import subprocess
 import sys
 
@@ -25,50 +26,201 @@ from absl import flags
 from absl import logging
 
 from ninja import ninja_syntax
+from vf2symbols import cache
+from vf2symbols import cli
+from vf2symbols import instrument
+from vf2symbols import output
 
 FLAGS = flags.FLAGS
+flags.adopt_module_key_flags(cli)
 
 # internal flags, typically client wouldn't change
 flags.DEFINE_string("build_dir", "build/", "Where build runs.")
 flags.DEFINE_bool("gen_ninja", True, "Whether to regenerate build.ninja")
 flags.DEFINE_bool("exec_ninja", True, "Whether to run ninja.")
+flags.DEFINE_enum(
+    "engine",
+    "ninja",
+    ["ninja", "inprocess"],
+    "ninja runs one process per SVG, inprocess writes every symbol from "
+    "this process.",
+)
+flags.DEFINE_integer(
+    "jobs",
+    1,
+    "With --engine=inprocess, how many worker processes render symbols.",
+    lower_bound=1,
+)
+flags.DEFINE_integer(
+    "svgs_per_edge",
+    16,
+    "With --engine=ninja, how many SVGs each write_symbol_from_svg process "
+    "writes symbols for.",
+    lower_bound=1,
+)
+flags.DEFINE_string(
+    "archive",
+    None,
+    "With --engine=inprocess, stream symbols into this .zip or .xcassets "
+    "instead of writing them next to each SVG.",
+)
+flags.DEFINE_bool(
+    "cache",
+    True,
+    "Reuse symbols in build_dir/.cache drawn from the same SVGs, and SVGs "
+    "normalized by picosvg, --nocache redraws every symbol from scratch.",
+)
+flags.DEFINE_integer(
+    "cache_max_mb",
+    cache.DEFAULT_MAX_BYTES // 2**20,
+    "Evict least recently used symbols, and normalized SVGs, beyond this size each.",
+    lower_bound=1,
+)
+flags.DEFINE_integer(
+    "write_threads",
+    output.DEFAULT_THREADS,
+    "With --engine=inprocess, how many threads write symbol files. Files "
+    "already holding their symbol are left alone.",
+    lower_bound=1,
+)
+flags.DEFINE_string(
+    "profile",
+    None,
+    "Write the time spent in each stage of drawing symbols, and counters, "
+    "to this JSON file. With --engine=ninja, covers the edges ninja runs.",
+)
+flags.DEFINE_string(
+    "profile_trace",
+    None,
+    "Write a Chrome trace of each stage of drawing symbols to this JSON file, "
+    "see chrome://tracing.",
+)
 
 
 def _write_svg_preamble(nw):
     def module_rule(mod_name, arg_pattern):
-        nw.rule(mod_name, f"{sys.executable} -m vf2symbols.{mod_name} {arg_pattern}")
+        # Outputs holding their symbol aren't rewritten, ninja must restat them
+        nw.rule(
+            mod_name,
+            f"{sys.executable} -m vf2symbols.{mod_name} {arg_pattern}",
+            restat=True,
+        )
 
     nw.comment("Generated by svg2symbols")
     nw.newline()
 
-    module_rule("write_symbol_from_svg", "--out $out $in")
+    module_rule(
+        "write_symbol_from_svg",
+        f"{cli.cache_args()}{cli.path_precision_args()}$out_args $in",
+    )
+
+
+def _symbol_file(svg):
+    return re.sub(r"([.]\w+)$", "_symbol\\1", svg)
 
 
 def _write_svg_symbol_builds(nw, svgs):
-    for svg in svgs:
-        output = re.sub(r"([.]\w+)$", "_symbol\\1", svg)
-        nw.build(output, "write_symbol_from_svg", svg)
+    for i in range(0, len(svgs), FLAGS.svgs_per_edge):
+        chunk = svgs[i : i + FLAGS.svgs_per_edge]
+        outputs = [_symbol_file(svg) for svg in chunk]
+        out_args = " ".join(f"--out {o}" for o in outputs)
+        if instrument.enabled():
+            out_args += instrument.ninja_args("profile", str(i // FLAGS.svgs_per_edge))
+        nw.build(
+            outputs,
+            "write_symbol_from_svg",
+            chunk,
+            variables={"out_args": out_args},
+        )
+
+
+def _run_inprocess(svgs):
+    from vf2symbols import archive
+    from vf2symbols import batch
+
+    # Paths are relative to the build dir, as they are in build.ninja
+    def resolve(path):
+        return os.path.join(FLAGS.build_dir, path)
+
+    symbol_cache = pico_cache = None
+    if FLAGS.cache:
+        symbol_cache = cache.SymbolCache(
+            resolve(cli.CACHE_DIR), FLAGS.cache_max_mb * 2**20
+        )
+        pico_cache = cache.PicoCache.beside(symbol_cache)
+    if FLAGS.archive:
+        symbols = batch.render_svg_symbols(
+            (resolve(svg) for svg in svgs),
+            FLAGS.jobs,
+            symbol_cache,
+            pico_cache,
+            FLAGS.path_precision,
+        )
+        # Name each symbol after its SVG
+        count = archive.write_archive(
+            FLAGS.archive,
+            (
+                (os.path.splitext(os.path.basename(svg_file))[0], svg)
+                for svg_file, svg in symbols
+            ),
+        )
+        print(f"Wrote {count} symbols to {FLAGS.archive}")
+    else:
+        with output.FileWriter(FLAGS.write_threads) as writer:
+            count = batch.write_svg_symbols(
+                {resolve(svg): resolve(_symbol_file(svg)) for svg in svgs},
+                FLAGS.jobs,
+                symbol_cache,
+                pico_cache,
+                FLAGS.path_precision,
+                writer,
+            )
+        print(f"Wrote {count} symbols")
+        print(writer.stats())
+    if symbol_cache is not None:
+        print(symbol_cache.stats())
+        print(pico_cache.stats())
 
 
 def _run(argv):
     if len(argv) < 2:
         sys.exit("Expected list of SVG filepath")
 
+    if FLAGS.archive and FLAGS.engine != "inprocess":
+        sys.exit("--archive requires --engine=inprocess")
+
     os.makedirs(FLAGS.build_dir, exist_ok=True)
+    instrument.start(FLAGS.profile, FLAGS.profile_trace)
+    if FLAGS.engine == "inprocess":
+        _run_inprocess(argv[1:])
+    else:
+        _run_ninja(argv[1:])
+    instrument.finish(FLAGS.profile, FLAGS.profile_trace)
+
+
+def _run_ninja(svgs):
     build_file = os.path.join(FLAGS.build_dir, "build.ninja")
     if FLAGS.gen_ninja:
         logging.info(f"Generating %s", os.path.relpath(build_file))
         with open(build_file, "w") as f:
             nw = ninja_syntax.Writer(f)
             _write_svg_preamble(nw)
-            _write_svg_symbol_builds(nw, argv[1:])
+            _write_svg_symbol_builds(nw, svgs)
 
     ninja_cmd = ["ninja", "-C", os.path.dirname(build_file)]
-    if FLAGS.exec_ninja:
-        print(" ".join(ninja_cmd))
-        subprocess.run(ninja_cmd, check=True)
-    else:
+    if not FLAGS.exec_ninja:
         print("To run:", " ".join(ninja_cmd))
+        return
+    # Only edges ninja runs this time write a profile
+    profile_dir = os.path.join(FLAGS.build_dir, "profile")
+    if instrument.enabled():
+        shutil.rmtree(profile_dir, ignore_errors=True)
+        os.makedirs(profile_dir)
+    print(" ".join(ninja_cmd))
+    with instrument.stage("ninja"):
+        subprocess.run(ninja_cmd, check=True)
+    if instrument.enabled():
+        logging.info("Merged profiles of %d edges", instrument.merge_dir(profile_dir))
 
 
 def main():
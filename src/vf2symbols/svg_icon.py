@@ -0,0 +1,127 @@
+# Copyright 2021 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Helpers for SVG icons."""
+import functools
+import re
+
+from typing import Sequence
+
+import picosvg
+import vf2symbols
+from fontTools.pens.svgPathPen import SVGPathPen
+from fontTools.svgLib.path.parser import parse_path
+from picosvg.geometric_types import Rect
+from picosvg.svg import SVG
+from vf2symbols import cache
+from vf2symbols import instrument
+
+# The variant a single SVG is placed in, the only one Apple requires.
+REQUIRED_SYMBOL = "Regular-M"
+
+_PATH_TAG = "{http://www.w3.org/2000/svg}path"
+
+
+def parse_float(string):
+    return float(re.compile(r"\d+([.]\d*)?").match(string).group(0))
+
+
+def view_box(main_svg):
+    if main_svg.get("viewBox"):
+        view = main_svg.get("viewBox").split(" ")
+        assert len(view) == 4
+        return Rect(*(parse_float(v) for v in view))
+    return Rect(
+        0, 0, parse_float(main_svg.get("width")), parse_float(main_svg.get("height"))
+    )
+
+
+class PicoPaths:
+    """Draws a picosvg as svgLib.SVGPath would draw its tostring().
+
+    topicosvg() leaves only absolute paths without transforms, so their path
+    data is all it takes to draw one, parsed into the pen in document order
+    with no serializing and reparsing of the XML. tostring() and fromstring()
+    keep it in a PicoCache.
+    """
+
+    def __init__(self, paths: Sequence[str], view_box: Rect):
+        self.paths = paths
+        self.view_box = view_box
+
+    @classmethod
+    def from_pico(cls, pico: SVG) -> "PicoPaths":
+        """From a picosvg with its tree up to date, as topicosvg() leaves it."""
+        return cls(
+            [el.get("d") for el in pico.svg_root.iter(_PATH_TAG)],
+            view_box(pico.svg_root),
+        )
+
+    @classmethod
+    def fromstring(cls, string: str) -> "PicoPaths":
+        view, *paths = string.split("\n")
+        return cls(paths, Rect(*(float(v) for v in view.split(" "))))
+
+    def tostring(self) -> str:
+        # picosvg writes path data without newlines
+        view = " ".join(repr(v) for v in self.view_box)
+        return "\n".join([view, *self.paths])
+
+    def draw(self, pen):
+        for path in self.paths:
+            parse_path(path, pen)
+
+
+@functools.lru_cache(maxsize=None)
+def _pico_cache_salt() -> bytes:
+    return repr(("topicosvg", picosvg.__version__, vf2symbols.__version__)).encode(
+        "utf-8"
+    )
+
+
+def normalize(svg_path: str, pico_cache: cache.PicoCache = None) -> PicoPaths:
+    """The SVG at svg_path after topicosvg(), from pico_cache if it has it.
+
+    Cached by the content of the SVG and the version of picosvg.
+    """
+    with instrument.stage("picosvg"):
+        if pico_cache is None:
+            return PicoPaths.from_pico(SVG.parse(svg_path).topicosvg(inplace=True))
+        with open(svg_path, "rb") as f:
+            raw_svg = f.read()
+        key = cache.CacheKey(_pico_cache_salt()).update(raw_svg)
+        cached = pico_cache.get(key)
+        if cached is not None:
+            return PicoPaths.fromstring(cached)
+        # As SVG.parse decodes files
+        pico = SVG.fromstring(raw_svg.decode("utf-8-sig")).topicosvg(inplace=True)
+        paths = PicoPaths.from_pico(pico)
+        pico_cache.put(key, paths.tostring())
+        return paths
+
+
+def update_symbol(symbol, symbol_name, svg_path, pico_cache=None):
+    """Draws the SVG at svg_path into the symbol_name variant."""
+    drawable = normalize(svg_path, pico_cache)
+    symbol.write_icon(
+        symbol_name,
+        drawable,
+        SVGPathPen(None, ntos=lambda pt: f"{pt:.3f}".rstrip("0").rstrip(".")),
+        drawable.view_box,
+    )
+
+
+def update_cache_key(key, symbol_name, svg_path):
+    """Adds what update_symbol would draw to a cache.CacheKey."""
+    with instrument.stage("cache_key"), open(svg_path, "rb") as f:
+        key.update(symbol_name, f.read())
@@ -11,30 +11,136 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
-"""Represents an Apple custom symbol."""
+"""Represents an Apple custom symbol.
+
+Symbols don't copy the template. It is serialized once, split around each of
+its groups, and a symbol is that text with the paths drawn into each group
+spliced in, dropping groups left empty if asked.
+"""
+import functools
 import os
+import re
+import sys
 
-from typing import Any
+from typing import Any, Mapping, NamedTuple, Optional, Tuple
 
 from fontTools.pens.svgPathPen import SVGPathPen
 from fontTools.pens.transformPen import TransformPen
 from lxml import etree  # pytype: disable=import-error
 from picosvg.geometric_types import Rect
 from picosvg.svg import SVG
+from picosvg.svg_meta import svgns
 from picosvg.svg_transform import Affine2D
+import vf2symbols
+from vf2symbols import instrument
+from vf2symbols import path_data
+from vf2symbols import variants
 
 _SYMBOL_SIZE = 120
-# https://developer.apple.com/documentation/uikit/uiimage/creating_custom_symbol_images_for_your_app#3369941
-_SYMBOL_SCALE = {"S": 0.789, "M": 1, "L": 1.29}
 # (Capline Y - Baseline Y ) / 2
 _CENTER_LINE = -35.23
 
 _SYMBOL_FILEPATH = os.path.join(os.path.dirname(__file__), "symbol_template.svg")
 
 
+@functools.lru_cache(maxsize=None)
+def cache_salt() -> bytes:
+    """Everything here that changes how a drawing lands in a symbol.
+
+    Seeds cache keys so cached symbols are dropped when any of it changes.
+    """
+    with open(_SYMBOL_FILEPATH, "rb") as f:
+        template = f.read()
+    constants = repr(
+        (_SYMBOL_SIZE, variants.SYMBOL_SCALES, _CENTER_LINE, vf2symbols.__version__)
+    )
+    return template + constants.encode("utf-8")
+
+
+# Stand in for the paths of a group, and of a group empty in the template,
+# while splitting the template
+_PATHS_MARKER = "vf2symbols-paths"
+_EMPTY_MARKER = "vf2symbols-empty"
+
+# As lxml escapes attribute values
+_ATTRIBUTE_ESCAPES = str.maketrans(
+    {
+        "&": "&amp;",
+        "<": "&lt;",
+        ">": "&gt;",
+        '"': "&quot;",
+        "\t": "&#9;",
+        "\n": "&#10;",
+        "\r": "&#13;",
+    }
+)
+
+
+class _Group(NamedTuple):
+    # If the group is empty in the template, so dropped if nothing is drawn
+    # into it, its start tag and the empty element; else Nones, and paths go
+    # after its children
+    start_tag: Optional[str]
+    empty_element: Optional[str]
+
+
+class _Skeleton(NamedTuple):
+    # The serialized template around its groups, one more than groups
+    texts: Tuple[str, ...]
+    groups: Tuple[_Group, ...]
+    # id => index in groups
+    index: Mapping[str, int]
+
+
+@functools.lru_cache(maxsize=None)
+def _skeleton(symbol_filepath):
+    root = SVG.parse(symbol_filepath).toetree()
+    for group in list(root.iter(f"{{{svgns()}}}g")):
+        etree.SubElement(
+            group, _EMPTY_MARKER if not group.xpath("*") else _PATHS_MARKER
+        )
+    markers = list(root.iter(_PATHS_MARKER, _EMPTY_MARKER))
+    chunks = re.split(
+        f"<(?:{_PATHS_MARKER}|{_EMPTY_MARKER})/>",
+        etree.tostring(root).decode("utf-8"),
+    )
+    assert len(chunks) == len(markers) + 1, "Markers in the template"
+
+    texts = [chunks[0]]
+    groups = []
+    index = {}
+    for marker, chunk in zip(markers, chunks[1:]):
+        group = _Group(None, None)
+        if marker.tag == _EMPTY_MARKER:
+            # The group is its start tag, the marker and its end tag
+            start = texts[-1].rindex("<g")
+            start_tag = texts[-1][start:]
+            texts[-1] = texts[-1][:start]
+            chunk = chunk[len("</g>") :]
+            group = _Group(start_tag, start_tag[:-1] + "/>")
+        index[marker.getparent().get("id")] = len(groups)
+        groups.append(group)
+        texts.append(chunk)
+    return _Skeleton(tuple(texts), tuple(groups), index)
+
+
 class Symbol:
-    def __init__(self, symbol_filepath=_SYMBOL_FILEPATH):
-        self.symbol = SVG.parse(symbol_filepath)
+    def __init__(
+        self, symbol_filepath=_SYMBOL_FILEPATH, path_precision: Optional[int] = None
+    ):
+        # With path_precision, path data is written compactly, coordinates
+        # rounded to that many decimal places, see path_data
+        self.path_precision = path_precision
+        self._skeleton = _skeleton(symbol_filepath)
+        # group index => serialized paths drawn into it
+        self._paths = {}
+        # Indices of groups drop_empty_icons dropped
+        self._dropped = frozenset()
+
+    @property
+    def symbol(self) -> SVG:
+        """The symbol as it is now, parsed. Changes to it aren't kept."""
+        return SVG.fromstring(self.tostring())
 
     def write_icon(
         self, symbol_name: str, drawable_path: Any, svg_pen: SVGPathPen, rect: Rect
@@ -52,13 +158,28 @@ class Symbol:
             example, in the icon fonts where the Y-axis is flipped, the height
             is expected to be -ve.
         """
-        parent = self.symbol.xpath_one(f'//svg:g[@id="{symbol_name}"]')
-        path = etree.SubElement(parent, "path")
-        path.attrib["d"] = self._draw_svg_path(
-            drawable_path, svg_pen, self._build_transformation(symbol_name, rect)
+        group = self._skeleton.index.get(symbol_name)
+        if group is None:
+            raise ValueError(f"No {symbol_name} group in the symbol template")
+        with instrument.stage("draw"):
+            path = self._draw_svg_path(
+                drawable_path, svg_pen, self._build_transformation(symbol_name, rect)
+            )
+        self._paths.setdefault(group, []).append(
+            f'<path d="{path.translate(_ATTRIBUTE_ESCAPES)}"/>'
         )
 
     def _draw_svg_path(self, svg_path, svg_pen, transform):
+        path = path_data.svg_path_data(
+            svg_path, svg_pen.glyphSet, transform, svg_pen._ntos, self.path_precision
+        )
+        if path is not None:
+            return path
+        instrument.count("paths_drawn_by_pen")
+        if self.path_precision is not None:
+            svg_pen = path_data.CompactPathPen(svg_pen.glyphSet, self.path_precision)
+            svg_path.draw(TransformPen(svg_pen, transform))
+            return svg_pen.getCommands()
         svg_path.draw(TransformPen(svg_pen, transform))
         return " ".join(svg_pen._commands)
 
@@ -69,15 +190,43 @@ class Symbol:
         )
 
     def _symbol_size(self, symbol):
-        return _SYMBOL_SCALE[symbol[-1]] * _SYMBOL_SIZE
+        return variants.SYMBOL_SCALES[symbol[-1]] * _SYMBOL_SIZE
 
     def drop_empty_icons(self):
-        for empty_icon in self.symbol.xpath(f"//svg:g[not(*)]"):
-            empty_icon.getparent().remove(empty_icon)
+        """Drops the groups, empty in the template, nothing was drawn into."""
+        self._dropped = frozenset(
+            i
+            for i, group in enumerate(self._skeleton.groups)
+            if group.start_tag is not None and i not in self._paths
+        )
+
+    def tostring(self) -> str:
+        with instrument.stage("serialize"):
+            texts = self._skeleton.texts
+            parts = [texts[0]]
+            for i, group in enumerate(self._skeleton.groups):
+                paths = self._paths.get(i)
+                if group.start_tag is None:
+                    if paths:
+                        parts.extend(paths)
+                elif i in self._dropped:
+                    pass
+                elif paths:
+                    parts.append(group.start_tag)
+                    parts.extend(paths)
+                    parts.append("</g>")
+                else:
+                    parts.append(group.empty_element)
+                parts.append(texts[i + 1])
+            return "".join(parts)
+
+    def tobytes(self) -> bytes:
+        return self.tostring().encode("utf-8")
 
     def write_to(self, filename):
         if filename:
-            with open(filename, "w") as f:
-                f.write(self.symbol.tostring())
+            with open(filename, "wb") as f:
+                f.write(self.tobytes())
         else:
-            print(self.symbol.tostring())
+            sys.stdout.buffer.write(self.tobytes() + b"\n")
+            sys.stdout.flush()
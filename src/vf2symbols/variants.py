@@ -0,0 +1,103 @@
+# Copyright 2021 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Plans the font instances behind the weight x scale symbol variants.
+
+A symbol has a variant per weight and scale, e.g. Bold-S. Weights map to
+wght. Scales map to opsz, if the font has it, at the default opsz times the
+scale; a small symbol is drawn at a smaller optical size. Variants whose
+locations normalize to the same point, e.g. every scale of a font without
+opsz, share one instance.
+"""
+from typing import TYPE_CHECKING, Dict, Iterable, Mapping, NamedTuple, Tuple
+
+if TYPE_CHECKING:
+    from fontTools import ttLib
+
+SYMBOL_WEIGHTS = (
+    ("Ultralight", 100),
+    ("Thin", 200),
+    ("Light", 300),
+    ("Regular", 400),
+    ("Medium", 500),
+    ("Semibold", 600),
+    ("Bold", 700),
+    ("Heavy", 800),
+    ("Black", 900),
+)
+
+# Scale of each symbol scale relative to M
+# https://developer.apple.com/documentation/uikit/uiimage/creating_custom_symbol_images_for_your_app#3369941
+SYMBOL_SCALES = {"S": 0.789, "M": 1, "L": 1.29}
+
+
+class Instance(NamedTuple):
+    """A design space location and the symbol variants drawn from it."""
+
+    # The M variant if it is one of symbol_names, else the first; names files
+    name: str
+    # User space, axes not given are at their default; a static font has
+    # just its wght
+    location: Mapping[str, float]
+    symbol_names: Tuple[str, ...]
+
+
+def _opsz(ttfont, scale):
+    axes = {a.axisTag: a for a in ttfont["fvar"].axes} if "fvar" in ttfont else {}
+    if "opsz" not in axes:
+        return None
+    return round(axes["opsz"].defaultValue * SYMBOL_SCALES[scale], 2)
+
+
+def plan(
+    ttfont: "ttLib.TTFont", wght_range: range, scales: Iterable[str] = SYMBOL_SCALES
+) -> Tuple[Instance, ...]:
+    """The distinct instances needed for the variants in wght_range."""
+    from vf2symbols import outlines
+
+    # M first, so it names any instance it shares
+    ordered_scales = sorted(scales, key=lambda s: s != "M")
+    groups: Dict[Tuple, Tuple[Dict[str, float], list]] = {}
+    for weight_name, wght in SYMBOL_WEIGHTS:
+        if wght not in wght_range:
+            continue
+        for scale in ordered_scales:
+            location = {"wght": wght}
+            if "fvar" in ttfont:
+                opsz = _opsz(ttfont, scale)
+                if opsz is not None:
+                    location["opsz"] = opsz
+                key = tuple(
+                    sorted(outlines.normalize_location(ttfont, location).items())
+                )
+            else:
+                key = (wght,)
+            groups.setdefault(key, (location, []))[1].append(f"{weight_name}-{scale}")
+
+    # Variants in weight then scale order, as in the symbol template
+    order = {
+        f"{w}-{s}": i
+        for i, (w, s) in enumerate(
+            (w, s) for w, _ in SYMBOL_WEIGHTS for s in SYMBOL_SCALES
+        )
+    }
+    instances = [
+        Instance(names[0], location, tuple(sorted(names, key=order.get)))
+        for location, names in groups.values()
+    ]
+    return tuple(sorted(instances, key=lambda i: order[i.symbol_names[0]]))
+
+
+def symbol_locations(instances: Iterable[Instance]) -> Dict[str, Mapping[str, float]]:
+    """Location of each symbol variant, variants of an instance share it."""
+    return {n: i.location for i in instances for n in i.symbol_names}
@@ -15,26 +15,46 @@
 
 Instantiates along wght to populate weight if a wght axis exists.
 
+Takes several fonts, e.g. the styles of an icon family, to build them in one
+ninja graph or worker pool. The symbols of each then go in a folder named
+after the font.
+
 Assumes a ligature exists for each symbol and infers the name from it.
+Icons whose ligatures resolve to the same glyph are drawn once, the symbol
+files of the aliases are copies or links, see --alias_files.
 Requires a very simple GSUB ligature layout for the time being. There is no
 good reason for this beyond making proof of concept tool setup easier.
 """
+import functools
+import io
 import os
 import re
-import regex
+import resource
+import shutil
 import subprocess
 import sys
+import time
 
 from absl import app
 from absl import flags
 from absl import logging
+from typing import NamedTuple, Optional, Sequence, TYPE_CHECKING
+
+import vf2symbols
+from vf2symbols import build_manifest
+from vf2symbols import cache
+from vf2symbols import cli
+from vf2symbols import instrument
+from vf2symbols import output
+from vf2symbols import variants
 
-from fontTools import ttLib
-from fontTools.varLib import instancer
-from ninja import ninja_syntax
-from vf2symbols import icon_font
+# fontTools, regex and the modules drawing symbols are imported where used,
+# so --help and a no-op ninja run don't pay for them
+if TYPE_CHECKING:
+    from fontTools import ttLib
 
 FLAGS = flags.FLAGS
+flags.adopt_module_key_flags(cli)
 
 # internal flags, typically client wouldn't change
 flags.DEFINE_string("build_dir", "build/", "Where build runs.")
@@ -43,19 +63,91 @@ flags.DEFINE_bool("exec_ninja", True, "Whether to run ninja.")
 flags.DEFINE_string(
     "icon_filter", ".*", "Discard icon names that don't contain this regex."
 )
-
-
-# TODO(rsheeter) support opsz to populate S/M/L
-_SYMBOL_NAME_FONT_WEIGHTS = (
-    ("Ultralight-M", 100),
-    ("Thin-M", 200),
-    ("Light-M", 300),
-    ("Regular-M", 400),
-    ("Medium-M", 500),
-    ("Semibold-M", 600),
-    ("Bold-M", 700),
-    ("Heavy-M", 800),
-    ("Black-M", 900),
+flags.DEFINE_enum(
+    "engine",
+    "ninja",
+    ["ninja", "inprocess"],
+    "ninja runs one process per icon, inprocess writes every symbol from "
+    "this process, loading each instance font once.",
+)
+flags.DEFINE_integer(
+    "jobs",
+    1,
+    "With --engine=inprocess, how many worker processes render symbols.",
+    lower_bound=1,
+)
+flags.DEFINE_integer(
+    "icons_per_edge",
+    32,
+    "With --engine=ninja, how many icons each write_symbol_from_fonts "
+    "process writes. Fewer rebuild less when an icon changes, more pay "
+    "process startup and font loading less often.",
+    lower_bound=1,
+)
+flags.DEFINE_integer(
+    "max_memory_mb",
+    256,
+    "With --engine=inprocess, how much decoded glyph data each process "
+    "keeps. Glyphs least recently drawn beyond it are dropped, and decoded "
+    "again if another icon uses them, so memory doesn't grow with the "
+    "number of icons.",
+    lower_bound=1,
+)
+flags.DEFINE_string(
+    "archive",
+    None,
+    "With --engine=inprocess, stream symbols into this .zip or .xcassets "
+    "instead of writing build_dir/symbols.",
+)
+flags.DEFINE_bool(
+    "cache",
+    True,
+    "Reuse symbols in build_dir/.cache drawn from the same outlines, "
+    "--nocache redraws every symbol.",
+)
+flags.DEFINE_integer(
+    "cache_max_mb",
+    cache.DEFAULT_MAX_BYTES // 2**20,
+    "Evict least recently used symbols beyond this size.",
+    lower_bound=1,
+)
+flags.DEFINE_enum(
+    "alias_files",
+    "copy",
+    ["copy", "hardlink", "symlink"],
+    "How to write the symbol of an icon whose ligature resolves to the same "
+    "glyph as another's: a copy, a hard link or a symlink of its file. "
+    "Archives always hold copies.",
+)
+flags.DEFINE_integer(
+    "write_threads",
+    output.DEFAULT_THREADS,
+    "With --engine=inprocess, how many threads write symbol files. Files "
+    "already holding their symbol are left alone.",
+    lower_bound=1,
+)
+flags.DEFINE_list(
+    "symbol_scales",
+    list(variants.SYMBOL_SCALES),
+    "Scales of the weight variants to fill, from S, M and L. opsz, if the "
+    "font has it, follows the scale.",
+)
+flags.DEFINE_string(
+    "profile",
+    None,
+    "Write the time spent in each stage of drawing symbols, and counters, "
+    "to this JSON file. With --engine=ninja, covers the edges ninja runs.",
+)
+flags.DEFINE_string(
+    "profile_trace",
+    None,
+    "Write a Chrome trace of each stage of drawing symbols to this JSON file, "
+    "see chrome://tracing.",
+)
+flags.register_validator(
+    "symbol_scales",
+    lambda scales: scales and set(scales) <= set(variants.SYMBOL_SCALES),
+    "--symbol_scales takes one or more of S, M and L",
 )
 
 
@@ -71,103 +163,419 @@ def _resolve_rel_build(path):
     return os.path.abspath(os.path.join(_build_dir(), path))
 
 
-def _symbol_wght_names(wght_range):
-    return tuple(n for n, v in _SYMBOL_NAME_FONT_WEIGHTS if v in wght_range)
+class _Font(NamedTuple):
+    filename: str
+    # The folder its symbols go in, None when it is the only font
+    name: Optional[str]
+
+
+def _fonts(font_filenames: Sequence[str]) -> Sequence[_Font]:
+    font_filenames = [os.path.abspath(f) for f in font_filenames]
+    if len(font_filenames) == 1:
+        return [_Font(font_filenames[0], None)]
+    fonts = [_Font(f, os.path.splitext(os.path.basename(f))[0]) for f in font_filenames]
+    names = [font.name for font in fonts]
+    if len(set(names)) != len(names):
+        sys.exit(f"Expected fonts with distinct file names, got {' '.join(names)}")
+    rule_names = {_rule_name(name) for name in names}
+    if len(rule_names) != len(names):
+        sys.exit(
+            "Expected fonts with file names distinct in [a-zA-Z0-9_.-], others "
+            f"are _ in ninja rule names, got {' '.join(names)}"
+        )
+    return fonts
+
+
+def _symbol_name(font: _Font, icon_name: str) -> str:
+    """What icon_name of font is called in an archive, and the build manifest."""
+    if font.name is None:
+        return icon_name
+    return f"{font.name}/{icon_name}"
+
 
+def _symbol_dir(font: _Font) -> str:
+    """Where the symbols of font go, relative to build_dir."""
+    if font.name is None:
+        return "symbols"
+    return os.path.join("symbols", font.name)
+
+
+def _symbol_file(font: _Font, icon_name: str) -> str:
+    return os.path.join(_symbol_dir(font), icon_name + ".svg")
+
+
+def _symbol_cache():
+    if not FLAGS.cache:
+        return None
+    return cache.SymbolCache(
+        _resolve_rel_build(cli.CACHE_DIR), FLAGS.cache_max_mb * 2**20
+    )
+
+
+def _create_font_for_instance(
+    ttfont: "ttLib.TTFont", instance: variants.Instance
+) -> "ttLib.TTFont":
+    from fontTools import ttLib
+    from fontTools.varLib import instancer
 
-def _create_font_for_symbol_wght_name(
-    ttfont: ttLib.TTFont, symbol_wght_name: str
-) -> ttLib.TTFont:
-    wght_pos = next(v for n, v in _SYMBOL_NAME_FONT_WEIGHTS if n == symbol_wght_name)
     if "fvar" not in ttfont:
-        assert ttfont["OS/2"].usWeightClass == wght_pos
+        assert ttfont["OS/2"].usWeightClass == instance.location["wght"]
         return ttfont
 
     # None: drop axis, leaving font at default position
     axis_positions = {a.axisTag: None for a in ttfont["fvar"].axes}
-    axis_positions["wght"] = wght_pos
+    axis_positions.update(instance.location)
 
     logging.debug("Generating instances at %s", axis_positions)
 
-    return instancer.instantiateVariableFont(ttfont, axis_positions)
+    # Round trip through bytes so coordinates are rounded exactly as they
+    # are in the instance fonts the ninja build writes to disk
+    with instrument.stage("instancing"):
+        buf = io.BytesIO()
+        instancer.instantiateVariableFont(ttfont, axis_positions).save(buf)
+        buf.seek(0)
+        return ttLib.TTFont(buf)
+
 
+def _rule_name(name):
+    # Rule names are limited to [a-zA-Z0-9_.-]
+    return re.sub(r"[^a-zA-Z0-9_.-]", "_", name)
 
-def _write_instance_rule(nw, ttfont, symbol_wght_name):
+
+def _instance_rule(font, instance):
+    if font.name is None:
+        return f"Gen_{instance.name}"
+    # _fonts checks font names stay distinct
+    return f"Gen_{_rule_name(font.name)}_{instance.name}"
+
+
+def _write_instance_rule(nw, ttfont, font, instance):
     axis_positions = {a.axisTag: "drop" for a in ttfont["fvar"].axes}
-    wght_pos = next(v for n, v in _SYMBOL_NAME_FONT_WEIGHTS if n == symbol_wght_name)
-    axis_positions["wght"] = str(wght_pos)
+    axis_positions.update({k: f"{v:g}" for k, v in instance.location.items()})
 
     pos_str = " ".join(f"{k}={v}" for k, v in axis_positions.items())
     nw.rule(
-        f"Gen_{symbol_wght_name}", f"fonttools varLib.instancer -o $out $in {pos_str}"
+        _instance_rule(font, instance),
+        f"fonttools varLib.instancer -o $out $in {pos_str}",
     )
 
 
-def _write_preamble(nw, font_filename, ttfont, wght_range):
+def _write_preamble(nw):
     def module_rule(mod_name, arg_pattern):
-        nw.rule(mod_name, f"{sys.executable} -m vf2symbols.{mod_name} {arg_pattern}")
+        # Outputs holding their symbol aren't rewritten, ninja must restat them
+        nw.rule(
+            mod_name,
+            f"{sys.executable} -m vf2symbols.{mod_name} {arg_pattern}",
+            restat=True,
+        )
 
     nw.comment("Generated by vf2symbols")
     nw.newline()
 
-    nw.variable("src_font", _rel_build(font_filename))
+    # Each edge sets $variants to the instance fonts of its font
+    module_rule(
+        "write_symbol_from_fonts",
+        f"{cli.cache_args()}{cli.path_precision_args()}--alias_files {FLAGS.alias_files} "
+        "$out_args $variants",
+    )
     nw.newline()
 
-    for symbol_name in _symbol_wght_names(wght_range):
-        _write_instance_rule(nw, ttfont, symbol_name)
-    nw.newline()
 
-    module_rule("write_symbol_from_fonts", "--out $out $in")
+def _font_file(font_filename, instance):
+    name, ext = os.path.splitext(os.path.basename(font_filename))
+    return f"{name}.{instance.name}{ext}"
+
+
+def _index_file(font_filename):
+    name = os.path.splitext(os.path.basename(font_filename))[0]
+    return f"{name}.ligatures.pickle"
 
 
-def _font_file(font_filename, symbol_wght_name):
+def _write_subset_font(ttfont, icon_names, font_index, font_filename):
+    """Writes ttfont cut down to icon_names, returns the file written.
+
+    Leaves the file alone if it already has the same content, so ninja
+    doesn't rebuild instances needlessly.
+    """
+    from vf2symbols import icon_font
+
     name, ext = os.path.splitext(os.path.basename(font_filename))
-    return f"{name}.{symbol_wght_name}{ext}"
+    subset_file = _resolve_rel_build(f"{name}.subset{ext}")
+    buf = io.BytesIO()
+    icon_font.subset_icons(ttfont, icon_names, font_index).save(buf)
+    if os.path.isfile(subset_file):
+        with open(subset_file, "rb") as f:
+            if f.read() == buf.getvalue():
+                return subset_file
+    with open(subset_file, "wb") as f:
+        f.write(buf.getvalue())
+    return subset_file
+
+
+def _write_font_builds(nw, src_font_filename, ttfont, font, instances, font_files):
+    nw.comment(f"Instances of {os.path.basename(font.filename)}")
+    for instance in instances:
+        _write_instance_rule(nw, ttfont, font, instance)
+    for instance, font_file in zip(instances, font_files):
+        nw.build(
+            font_file, _instance_rule(font, instance), _rel_build(src_font_filename)
+        )
+    nw.newline()
 
 
-def _write_font_builds(nw, font_filename, wght_range):
-    font_files = []
-    for symbol_wght_name in _symbol_wght_names(wght_range):
-        font_files.append(_font_file(font_filename, symbol_wght_name))
-        nw.build(font_files[-1], f"Gen_{symbol_wght_name}", "$src_font")
-    return font_files
+def _write_vf_symbol_builds(nw, font, icon_aliases, instances, font_files, edges):
+    """Writes edges drawing icons from font_files, see batch.group_aliases.
 
+    Aliases are written by the edge drawing the icon they alias.
 
-def _write_vf_symbol_builds(nw, ttfont, font_files):
-    for icon_name in icon_font.extract_icon_names(
-        ttfont, regex.compile(FLAGS.icon_filter)
-    ):
+    edges, the number written before, numbers their profiles. Returns the
+    number written including these.
+    """
+    # Variants sharing an instance share its font file
+    variants_arg = " ".join(
+        f"{symbol_name}={font_file}"
+        for instance, font_file in zip(instances, font_files)
+        for symbol_name in instance.symbol_names
+    )
+    icon_names = tuple(icon_aliases)
+    for i in range(0, len(icon_names), FLAGS.icons_per_edge):
+        outputs = [
+            _symbol_file(font, name)
+            for icon_name in icon_names[i : i + FLAGS.icons_per_edge]
+            for name in (icon_name, *icon_aliases[icon_name])
+        ]
+        out_args = " ".join(f"--out {o}" for o in outputs)
+        if instrument.enabled():
+            out_args += instrument.ninja_args("profile", str(edges))
         nw.build(
-            os.path.join("symbols", icon_name + ".svg"),
+            outputs,
             "write_symbol_from_fonts",
             font_files,
+            variables={"out_args": out_args, "variants": variants_arg},
+        )
+        edges += 1
+    return edges
+
+
+def _load_instances(font_filename, instances, font_index, icon_names=None):
+    """Loads a FontInstance per symbol variant of instances.
+
+    Outlines are only computed for glyphs that are drawn, and only
+    --max_memory_mb of them are kept. Where we have to make instance fonts,
+    pass icon_names to only instance glyphs they need.
+    """
+    from vf2symbols import batch
+    from vf2symbols import fonts
+    from vf2symbols import icon_font
+    from vf2symbols import outlines
+
+    with instrument.stage("load_instances"):
+        # Tables, and glyphs within glyf and gvar, are decompiled as drawn,
+        # from a mapping of the font file every worker shares
+        ttfont = fonts.open_font(font_filename)
+        if outlines.is_supported(ttfont):
+            return batch.load_variable_instances(
+                ttfont,
+                variants.symbol_locations(instances),
+                font_index,
+                FLAGS.max_memory_mb * 2**20,
+            )
+        # The instancer copies the font
+        ttfont = fonts.open_font(font_filename, views=False)
+        if icon_names is not None and "fvar" in ttfont:
+            ttfont = icon_font.subset_icons(ttfont, icon_names, font_index)
+        # Each location is instanced once, its variants share the font
+        ttfonts = {}
+        for instance in instances:
+            instance_font = _create_font_for_instance(ttfont, instance)
+            ttfonts.update((n, instance_font) for n in instance.symbol_names)
+        return batch.load_instances(ttfonts, font_index)
+
+
+def _run_inprocess(fonts):
+    from vf2symbols import archive
+    from vf2symbols import batch
+
+    start = time.perf_counter()
+    # Icons of every font share the workers, each loads a font's instances
+    # when it first draws one of its icons
+    load_instances_fns = {}
+    icons = []
+    # (font, icon name) => its aliases of font
+    aliases = {}
+    for font in fonts:
+        with instrument.stage("load_icons"):
+            _, instances, font_index, icon_names = _load_icons(font.filename)
+        filtered = len(icon_names) < len(font_index)
+        load_instances_fns[font] = functools.partial(
+            _load_instances,
+            font.filename,
+            instances,
+            font_index,
+            icon_names if filtered else None,
+        )
+        for icon_name, names in batch.group_aliases([font_index], icon_names).items():
+            icons.append((font, icon_name))
+            aliases[(font, icon_name)] = tuple((font, n) for n in names)
+    symbol_cache = _symbol_cache()
+    symbols = batch.render_family_symbols(
+        load_instances_fns, icons, FLAGS.jobs, symbol_cache, FLAGS.path_precision
+    )
+    if FLAGS.archive:
+        dest = FLAGS.archive
+        count = archive.write_archive(
+            dest,
+            (
+                (_symbol_name(*icon), svg)
+                for icon, svg in batch.expand_aliases(symbols, aliases)
+            ),
+        )
+    else:
+        dest = os.path.relpath(_resolve_rel_build("symbols"))
+        with output.FileWriter(FLAGS.write_threads) as writer:
+            count = batch.write_files(
+                symbols,
+                lambda icon: _resolve_rel_build(_symbol_file(*icon)),
+                aliases,
+                FLAGS.alias_files,
+                writer,
+            )
+        print(writer.stats())
+    print(
+        f"Wrote {count} symbols to {dest} in {time.perf_counter() - start:.1f}s, "
+        f"peak RSS {_peak_rss_mb():.0f}MB"
+    )
+    print(f"{count - len(icons)} of them aliases of another icon, not drawn again")
+    if symbol_cache is not None:
+        print(symbol_cache.stats())
+
+
+def _peak_rss_mb():
+    """Peak resident set size of this process or any worker, in MB."""
+    peak = max(
+        resource.getrusage(who).ru_maxrss
+        for who in (resource.RUSAGE_SELF, resource.RUSAGE_CHILDREN)
+    )
+    # kB on Linux, bytes on macOS
+    return peak / (2**20 if sys.platform == "darwin" else 2**10)
+
+
+def _load_icons(font_filename):
+    """The font, its instance plan, ligature index and filtered icon names."""
+    import regex
+    from vf2symbols import fonts
+    from vf2symbols import icon_font
+
+    root_font = fonts.open_font(font_filename)
+    instances = variants.plan(
+        root_font, icon_font.wght_range(root_font), FLAGS.symbol_scales
+    )
+    # Reuse the ligature index from the last run if the font is unchanged
+    font_index = icon_font.IconFontIndex.load_or_build(
+        font_filename, _resolve_rel_build(_index_file(font_filename))
+    )
+    icon_names = tuple(font_index.extract_icon_names(regex.compile(FLAGS.icon_filter)))
+    return root_font, instances, font_index, icon_names
+
+
+def _gen_ninja(fonts, build_file):
+    # Everything build.ninja is generated from, besides the fonts
+    settings = {
+        "fonts": tuple(fonts),
+        "build_dir": _build_dir(),
+        "icon_filter": FLAGS.icon_filter,
+        "symbol_scales": tuple(FLAGS.symbol_scales),
+        "icons_per_edge": FLAGS.icons_per_edge,
+        "cache_args": cli.cache_args(),
+        "alias_files": FLAGS.alias_files,
+        "path_precision": FLAGS.path_precision,
+        "profile": (instrument.enabled(), instrument.tracing()),
+        "python": sys.executable,
+        "version": vf2symbols.__version__,
+    }
+    inputs = build_manifest.inputs_digest([f.filename for f in fonts], settings)
+    if build_manifest.is_current(build_file, inputs):
+        logging.info("%s is up to date", os.path.relpath(build_file))
+        return
+
+    from vf2symbols import batch
+
+    logging.info(f"Generating %s", os.path.relpath(build_file))
+    nw = build_manifest.RecordingWriter()
+    _write_preamble(nw)
+    # One graph for every font, so ninja keeps all cores busy across them
+    symbol_names = []
+    # Inputs of edges that no edge builds
+    generated = []
+    edges = 0
+    for font in fonts:
+        root_font, instances, font_index, icon_names = _load_icons(font.filename)
+        src_font_filename = font.filename
+        # When iterating on a few icons don't instance glyphs we won't draw
+        if len(icon_names) < len(font_index) and "fvar" in root_font:
+            src_font_filename = _write_subset_font(
+                root_font, icon_names, font_index, font.filename
+            )
+            generated.append(src_font_filename)
+        font_files = [_font_file(font.filename, i) for i in instances]
+        _write_font_builds(
+            nw, src_font_filename, root_font, font, instances, font_files
+        )
+        icon_aliases = batch.group_aliases([font_index], icon_names)
+        logging.info(
+            "%s: %d icons, %d of them aliases drawn once",
+            os.path.basename(font.filename),
+            len(icon_names),
+            len(icon_names) - len(icon_aliases),
         )
+        edges = _write_vf_symbol_builds(
+            nw, font, icon_aliases, instances, font_files, edges
+        )
+        symbol_names.extend(_symbol_name(font, n) for n in icon_names)
+    stale = build_manifest.update(build_file, inputs, symbol_names, nw, generated)
+    if stale:
+        logging.info("Removed %d stale outputs", len(stale))
 
 
 def _run(argv):
-    if len(argv) != 2:
-        sys.exit("Expected 1 non-flag arguments")
-    font_filename = os.path.abspath(argv[1])
-    root_font = ttLib.TTFont(font_filename)
-    wght_range = icon_font.wght_range(root_font)
+    if len(argv) < 2:
+        sys.exit("Expected 1 or more fonts")
+    fonts = _fonts(argv[1:])
+
+    if FLAGS.archive and FLAGS.engine != "inprocess":
+        sys.exit("--archive requires --engine=inprocess")
 
     os.makedirs(_build_dir(), exist_ok=True)
-    os.makedirs(_resolve_rel_build("symbols"), exist_ok=True)
+    for font in fonts:
+        os.makedirs(_resolve_rel_build(_symbol_dir(font)), exist_ok=True)
+    instrument.start(FLAGS.profile, FLAGS.profile_trace)
+    if FLAGS.engine == "inprocess":
+        _run_inprocess(fonts)
+    else:
+        _run_ninja(fonts)
+    instrument.finish(FLAGS.profile, FLAGS.profile_trace)
+
+
+def _run_ninja(fonts):
     build_file = _resolve_rel_build("build.ninja")
     if FLAGS.gen_ninja:
-        logging.info(f"Generating %s", os.path.relpath(build_file))
-        with open(build_file, "w") as f:
-            nw = ninja_syntax.Writer(f)
-            _write_preamble(nw, font_filename, root_font, wght_range)
-            font_files = _write_font_builds(nw, font_filename, wght_range)
-            _write_vf_symbol_builds(nw, root_font, font_files)
+        with instrument.stage("gen_ninja"):
+            _gen_ninja(fonts, build_file)
 
     ninja_cmd = ["ninja", "-C", os.path.dirname(build_file)]
-    if FLAGS.exec_ninja:
-        print(" ".join(ninja_cmd))
-        subprocess.run(ninja_cmd, check=True)
-    else:
+    if not FLAGS.exec_ninja:
         print("To run:", " ".join(ninja_cmd))
+        return
+    # Only edges ninja runs this time write a profile
+    profile_dir = _resolve_rel_build("profile")
+    if instrument.enabled():
+        shutil.rmtree(profile_dir, ignore_errors=True)
+        os.makedirs(profile_dir)
+    print(" ".join(ninja_cmd))
+    with instrument.stage("ninja"):
+        subprocess.run(ninja_cmd, check=True)
+    if instrument.enabled():
+        logging.info("Merged profiles of %d edges", instrument.merge_dir(profile_dir))
 
 
 def main():
@@ -11,48 +11,100 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
-"""Generates an Apple custom symbol using one or more font instances."""
+"""Generates an Apple custom symbol using one or more font instances.
+
+Fonts are passed as symbol wght name=font, e.g. Bold-S=font.Bold-M.ttf, so
+variants can share an instance, or as a bare font.Bold-M.ttf. Each --out is
+a symbol for the icon it is named after; fonts are loaded once for them all.
+Icons whose ligatures resolve to the same glyph are drawn once.
+"""
 import contextlib
-import os
+import sys
 
 from absl import app
 from absl import flags
+from absl import logging
 
-from fontTools import ttLib
-from fontTools.pens.svgPathPen import SVGPathPen
-from picosvg.geometric_types import Rect
-from vf2symbols import icon_font
-from vf2symbols.symbol import Symbol
+from vf2symbols import cache
+from vf2symbols import cli
+from vf2symbols import instrument
+from vf2symbols import output
 
 FLAGS = flags.FLAGS
+flags.adopt_module_key_flags(cli)
 
 # internal flags, typically client wouldn't change
-flags.DEFINE_string("out", None, "Output file.")
-
-
-def update_symbol(symbol, ttfont, icon_name, symbol_wght_name):
-    glyph_name = icon_font.resolve_ligature(ttfont, icon_name)
-    upem = ttfont["head"].unitsPerEm
-    # For Icon fonts, the Glyphs are Y shifted by upem and the Y axis is flipped.
-    symbol.write_icon(
-        symbol_wght_name,
-        ttfont.getGlyphSet()[glyph_name],
-        SVGPathPen(ttfont.getGlyphSet()),
-        Rect(0, upem, upem, -upem),
-    )
+flags.DEFINE_multi_string(
+    "out", None, "Output file, named for its icon. Repeat to write many symbols."
+)
+flags.DEFINE_string(
+    "cache_dir", None, "Reuse symbols drawn from the same outlines, None to not."
+)
+flags.DEFINE_integer(
+    "cache_max_mb",
+    cache.DEFAULT_MAX_BYTES // 2**20,
+    "Evict least recently used symbols beyond this size.",
+    lower_bound=1,
+)
+flags.DEFINE_enum(
+    "alias_files",
+    "copy",
+    ["copy", "hardlink", "symlink"],
+    "How to write the symbol of an icon whose ligature resolves to the same "
+    "glyph as an earlier --out: a copy, a hard link or a symlink of its file.",
+)
+flags.DEFINE_string(
+    "profile",
+    None,
+    "Write the time spent in each stage of drawing symbols, and counters, "
+    "to this JSON file.",
+)
+flags.DEFINE_string(
+    "profile_trace",
+    None,
+    "Write a Chrome trace of each stage of drawing symbols to this JSON file, "
+    "see chrome://tracing.",
+)
 
 
 def main(argv):
-    icon_name = os.path.splitext(os.path.basename(FLAGS.out))[0]
+    # Heavy, so not imported until flags have parsed
+    from vf2symbols import batch
+    from vf2symbols import fonts
+
+    if not FLAGS.out:
+        sys.exit("Expected at least 1 --out")
+    instrument.start(FLAGS.profile, FLAGS.profile_trace)
 
-    symbol = Symbol()
+    symbol_cache = None
+    if FLAGS.cache_dir:
+        symbol_cache = cache.SymbolCache(FLAGS.cache_dir, FLAGS.cache_max_mb * 2**20)
 
-    for font_filename in argv[1:]:
-        with contextlib.closing(ttLib.TTFont(font_filename)) as ttfont:
-            update_symbol(symbol, ttfont, icon_name, font_filename.split(".")[-2])
+    with contextlib.ExitStack() as stack:
+        writer = stack.enter_context(output.FileWriter())
+        # Variants sharing an instance share the font, mapped so edges run
+        # in parallel share its pages
+        opened = {}
+        ttfonts = {}
+        for symbol_wght_name, font_filename in batch.parse_font_args(argv[1:]).items():
+            if font_filename not in opened:
+                opened[font_filename] = stack.enter_context(
+                    contextlib.closing(fonts.open_font(font_filename))
+                )
+            ttfonts[symbol_wght_name] = opened[font_filename]
+        batch.write_icon_files(
+            batch.load_instances(ttfonts),
+            batch.out_files_by_icon(FLAGS.out),
+            symbol_cache,
+            FLAGS.alias_files,
+            FLAGS.path_precision,
+            writer,
+        )
 
-    symbol.drop_empty_icons()
-    symbol.write_to(FLAGS.out)
+    if symbol_cache is not None:
+        logging.debug(symbol_cache.stats())
+    logging.debug(writer.stats())
+    instrument.finish(FLAGS.profile, FLAGS.profile_trace)
 
 
 if __name__ == "__main__":
@@ -11,28 +11,47 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
-"""Generates an Apple custom symbol using an SVG by placing it in the required variant."""
-import re
+"""Generates an Apple custom symbol using an SVG by placing it in the required variant.
+
+Takes several SVGs, with an --out for each, to write many symbols in one run.
+"""
 import sys
 
 from absl import app
 from absl import flags
 
-from fontTools import svgLib
-from fontTools.pens.svgPathPen import SVGPathPen
-from picosvg.geometric_types import Rect
-from picosvg.svg import SVG
-from vf2symbols.symbol import Symbol
-from vf2symbols import write_symbol_from_svgs
+from vf2symbols import instrument
+from vf2symbols import output
 
-_REQUIRED_SYMBOL = "Regular-M"
+# For its flags and helpers, it imports nothing heavy
+from vf2symbols import write_symbol_from_svgs
 
+FLAGS = flags.FLAGS
 
 
 def main(argv):
-    if len(argv) > 2:
-        sys.exit("Expected Only 1 non-flag Argument.")
-    write_symbol_from_svgs.main([argv[0], f'{_REQUIRED_SYMBOL}={argv[1]}'])
+    svg_files = argv[1:]
+    if not svg_files:
+        sys.exit("Expected 1 or more SVG files.")
+    outs = FLAGS.out or [None]
+    if len(outs) != len(svg_files):
+        sys.exit(f"Expected an --out per SVG, got {len(outs)} for {len(svg_files)}.")
+    from vf2symbols import batch
+
+    instrument.start(FLAGS.profile, FLAGS.profile_trace)
+    symbol_cache, pico_cache = write_symbol_from_svgs.open_caches()
+    # Symbols are written while the next is drawn
+    with output.FileWriter() as writer:
+        for svg_file, out in zip(svg_files, outs):
+            write_symbol_from_svgs.write(
+                batch.render_svg_symbol(
+                    svg_file, symbol_cache, pico_cache, FLAGS.path_precision
+                ),
+                out,
+                writer,
+            )
+    write_symbol_from_svgs.log_stats(symbol_cache, pico_cache, writer)
+    instrument.finish(FLAGS.profile, FLAGS.profile_trace)
 
 
 if __name__ == "__main__":
@@ -24,26 +24,76 @@ write_symbol_from_svgs.py --out [output path] [symbol_layer_name=svg_path ....]
 Example:
 write_symbol_from_svgs.py --out apple_symbol.svg Regular-M=regular.svg Regular-L=large.svg
 """
-import re
 import sys
 
 from absl import app
 from absl import flags
+from absl import logging
 
-from fontTools import svgLib
-from fontTools.pens.svgPathPen import SVGPathPen
-from picosvg.geometric_types import Rect
-from picosvg.svg import SVG
-from vf2symbols.symbol import Symbol
+from vf2symbols import cache
+from vf2symbols import cli
+from vf2symbols import instrument
+from vf2symbols import output
 
 FLAGS = flags.FLAGS
-
-
-flags.DEFINE_string("out", None, "Output file, None will output to stdout.")
-
-
-def parse_float(string):
-    return float(re.compile("\d+([.]\d*)?").match(string).group(0))
+flags.adopt_module_key_flags(cli)
+
+
+flags.DEFINE_multi_string(
+    "out",
+    None,
+    "Output file, None will output to stdout. write_symbol_from_svg takes one "
+    "per SVG.",
+)
+flags.DEFINE_string(
+    "cache_dir",
+    None,
+    "Reuse symbols drawn from the same SVGs, and SVGs normalized by picosvg, "
+    "None to not.",
+)
+flags.DEFINE_integer(
+    "cache_max_mb",
+    cache.DEFAULT_MAX_BYTES // 2**20,
+    "Evict least recently used symbols, and normalized SVGs, beyond this size each.",
+    lower_bound=1,
+)
+flags.DEFINE_string(
+    "profile",
+    None,
+    "Write the time spent in each stage of drawing symbols, and counters, "
+    "to this JSON file.",
+)
+flags.DEFINE_string(
+    "profile_trace",
+    None,
+    "Write a Chrome trace of each stage of drawing symbols to this JSON file, "
+    "see chrome://tracing.",
+)
+
+
+def open_caches():
+    """The symbol and picosvg caches in --cache_dir, Nones without one."""
+    if not FLAGS.cache_dir:
+        return None, None
+    symbol_cache = cache.SymbolCache(FLAGS.cache_dir, FLAGS.cache_max_mb * 2**20)
+    return symbol_cache, cache.PicoCache.beside(symbol_cache)
+
+
+def log_stats(*stats):
+    """Logs the stats of each cache, or FileWriter, that isn't None."""
+    for s in stats:
+        if s is not None:
+            logging.debug(s.stats())
+
+
+def write(svg, out, writer):
+    """Writes svg to out with writer, or to stdout if out is None."""
+    if out:
+        writer.write(out, svg.encode("utf-8"))
+        return
+    with instrument.stage("write"):
+        print(svg)
+    instrument.count("bytes_written", len(svg))
 
 
 def main(argv):
@@ -51,27 +101,24 @@ def main(argv):
         sys.exit(
             "Expected at least 1 non-flag Argument of a symbol layer name and svg path pair."
         )
-    symbol = Symbol()
-    for arg in argv[1:]:
-        layer_name, svg_path = arg.split("=")
-        pico = SVG.parse(svg_path).topicosvg()
-        main_svg = pico.xpath_one("//svg:svg")
-        if main_svg.get('viewBox'):
-            view = main_svg.get('viewBox').split(' ')
-            assert len(view) == 4
-            rect = Rect(parse_float(view[0]), parse_float(view[1]), parse_float(view[2]),parse_float(view[3]))
-        else:
-            rect = Rect(0, 0, parse_float(main_svg.get('width')), parse_float(main_svg.get('height')))
-        symbol.write_icon(
-            layer_name,
-            svgLib.SVGPath.fromstring(pico.tostring()),
-            SVGPathPen(None, ntos=lambda pt: f'{pt:.3f}'.rstrip('0').rstrip('.')),
-            rect,
+    if FLAGS.out and len(FLAGS.out) > 1:
+        sys.exit("Expected at most 1 --out.")
+    from vf2symbols import batch
+
+    instrument.start(FLAGS.profile, FLAGS.profile_trace)
+    layers = [arg.split("=") for arg in argv[1:]]
+    symbol_cache, pico_cache = open_caches()
+    with output.FileWriter() as writer:
+        write(
+            batch.render_layered_svg_symbol(
+                layers, symbol_cache, pico_cache, FLAGS.path_precision
+            ),
+            FLAGS.out[0] if FLAGS.out else None,
+            writer,
         )
-    symbol.drop_empty_icons()
-    symbol.write_to(FLAGS.out)
+    log_stats(symbol_cache, pico_cache, writer)
+    instrument.finish(FLAGS.profile, FLAGS.profile_trace)
 
 
 if __name__ == "__main__":
     app.run(main)
-
@@ -0,0 +1,73 @@
+"""Tests for vf2symbols.archive"""
+import json
+import os
+import pytest
+import zipfile
+
+from vf2symbols import archive
+
+
+_SYMBOLS = [("ic_a", "<svg>a</svg>"), ("ic_b", "<svg>b</svg>")]
+
+
+def test_zip(tmpdir):
+    zip_file = str(tmpdir / "symbols.zip")
+
+    assert archive.write_archive(zip_file, iter(_SYMBOLS)) == 2
+
+    with zipfile.ZipFile(zip_file) as z:
+        assert z.namelist() == ["ic_a.svg", "ic_b.svg"]
+        assert z.read("ic_b.svg") == b"<svg>b</svg>"
+    assert os.listdir(tmpdir) == ["symbols.zip"]
+
+
+def test_zip_is_reproducible(tmpdir):
+    archive.write_archive(str(tmpdir / "1.zip"), _SYMBOLS)
+    archive.write_archive(str(tmpdir / "2.zip"), _SYMBOLS)
+
+    assert (tmpdir / "1.zip").read_binary() == (tmpdir / "2.zip").read_binary()
+
+
+def test_xcassets(tmpdir):
+    xcassets = tmpdir / "Symbols.xcassets"
+    archive.write_archive(str(xcassets), [("stale", "<svg/>")])
+
+    archive.write_archive(str(xcassets), _SYMBOLS)
+
+    assert sorted(os.listdir(xcassets)) == [
+        "Contents.json",
+        "ic_a.symbolset",
+        "ic_b.symbolset",
+    ]
+    assert (xcassets / "ic_a.symbolset" / "ic_a.svg").read() == "<svg>a</svg>"
+    contents = json.loads((xcassets / "ic_a.symbolset" / "Contents.json").read())
+    assert contents["symbols"] == [{"filename": "ic_a.svg", "idiom": "universal"}]
+
+
+def test_xcassets_folders(tmpdir):
+    xcassets = tmpdir / "Symbols.xcassets"
+    archive.write_archive(str(xcassets), [("Sharp/ic_a", "<svg/>")])
+
+    archive.write_archive(
+        str(xcassets), [("Outlined/ic_a", "<svg>a</svg>"), ("Rounded/ic_a", "")]
+    )
+
+    assert os.listdir(xcassets / "Sharp") == ["Contents.json"]
+    assert sorted(os.listdir(xcassets / "Outlined")) == [
+        "Contents.json",
+        "ic_a.symbolset",
+    ]
+    folder = json.loads((xcassets / "Outlined" / "Contents.json").read())
+    assert folder["properties"] == {"provides-namespace": True}
+    symbolset = xcassets / "Outlined" / "ic_a.symbolset"
+    assert (symbolset / "ic_a.svg").read() == "<svg>a</svg>"
+    contents = json.loads((symbolset / "Contents.json").read())
+    assert contents["symbols"] == [{"filename": "ic_a.svg", "idiom": "universal"}]
+
+
+def test_failed_write_leaves_no_zip(tmpdir):
+    zip_file = str(tmpdir / "symbols.zip")
+    with pytest.raises(ValueError):
+        archive.write_archive(zip_file, _SYMBOLS + _SYMBOLS)
+
+    assert os.listdir(tmpdir) == []
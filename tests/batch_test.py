@@ -0,0 +1,308 @@
+"""Tests for vf2symbols.batch"""
+from fontTools import ttLib
+from fontTools.varLib import instancer
+
+import functools
+import os
+import pytest
+import shutil
+import subprocess
+import sys
+
+from vf2symbols import batch
+
+_SAMPLE_FONT = "./tests/sample_icons_vf.ttf"
+
+
+def _write_instance(tmpdir, symbol_wght_name, wght):
+    instance_file = str(tmpdir / f"sample_icons.{symbol_wght_name}.ttf")
+    instancer.instantiateVariableFont(ttLib.TTFont(_SAMPLE_FONT), {"wght": wght}).save(
+        instance_file
+    )
+    return instance_file
+
+
+@pytest.mark.parametrize("icon_name", ["ic_a", "ic_g", "alias_ic_k"])
+def test_batch_matches_write_symbol_from_fonts(tmpdir, icon_name):
+    font_files = {
+        "Light-M": _write_instance(tmpdir, "Light-M", 300),
+        "Bold-M": _write_instance(tmpdir, "Bold-M", 700),
+    }
+
+    expected_file = tmpdir / "expected.svg"
+    subprocess.run(
+        [
+            sys.executable,
+            "-m",
+            "vf2symbols.write_symbol_from_fonts",
+            f"--out={tmpdir / icon_name}.svg",
+            *font_files.values(),
+        ],
+        check=True,
+    )
+    os.rename(tmpdir / f"{icon_name}.svg", expected_file)
+
+    instances = batch.load_instances(
+        {name: ttLib.TTFont(f) for name, f in font_files.items()}
+    )
+    assert batch.write_symbols(instances, [icon_name], str(tmpdir)) == 1
+
+    with open(tmpdir / f"{icon_name}.svg") as actual, open(expected_file) as expected:
+        assert actual.read() == expected.read()
+
+
+def test_write_symbol_from_fonts_many_outs(tmpdir):
+    font_file = _write_instance(tmpdir, "Regular-M", 400)
+    icon_names = ["ic_a", "ic_g", "alias_ic_k"]
+    out_dir = tmpdir.mkdir("out")
+
+    subprocess.run(
+        [
+            sys.executable,
+            "-m",
+            "vf2symbols.write_symbol_from_fonts",
+            *(f"--out={out_dir / n}.svg" for n in icon_names),
+            f"Regular-S={font_file}",
+            f"Regular-M={font_file}",
+        ],
+        check=True,
+    )
+
+    ttfont = ttLib.TTFont(font_file)
+    instances = batch.load_instances({"Regular-S": ttfont, "Regular-M": ttfont})
+    expected_dir = tmpdir.mkdir("expected")
+    batch.write_symbols(instances, icon_names, str(expected_dir))
+    assert _read_dir(out_dir) == _read_dir(expected_dir)
+
+
+def _read_dir(path):
+    return {f: open(os.path.join(path, f)).read() for f in sorted(os.listdir(path))}
+
+
+def _load_variable_instances():
+    return batch.load_variable_instances(
+        ttLib.TTFont(_SAMPLE_FONT),
+        {"Light-M": {"wght": 300}, "Bold-M": {"wght": 700}},
+    )
+
+
+def test_variable_instances_match_instance_fonts(tmpdir):
+    ttfonts = {
+        "Light-M": ttLib.TTFont(_write_instance(tmpdir, "Light-M", 300)),
+        "Bold-M": ttLib.TTFont(_write_instance(tmpdir, "Bold-M", 700)),
+    }
+    icon_names = ["ic_a", "ic_b", "ic_c", "ic_g", "ic_k", "alias_ic_k"]
+    instance_dir = tmpdir.mkdir("instance")
+    variable_dir = tmpdir.mkdir("variable")
+
+    batch.write_symbols(batch.load_instances(ttfonts), icon_names, str(instance_dir))
+    batch.write_symbols(_load_variable_instances(), icon_names, str(variable_dir))
+
+    assert _read_dir(variable_dir) == _read_dir(instance_dir)
+
+
+def test_bounded_outlines_match_unbounded(tmpdir):
+    icon_names = ["ic_a", "ic_b", "ic_c", "ic_g", "ic_k", "alias_ic_k"]
+    unbounded_dir = tmpdir.mkdir("unbounded")
+    bounded_dir = tmpdir.mkdir("bounded")
+
+    batch.write_symbols(_load_variable_instances(), icon_names, str(unbounded_dir))
+    ttfont = ttLib.TTFont(_SAMPLE_FONT, lazy=True)
+    # Keeps only the glyph last decoded
+    instances = batch.load_variable_instances(
+        ttfont, {"Light-M": {"wght": 300}, "Bold-M": {"wght": 700}}, None, 1
+    )
+    batch.write_symbols(instances, icon_names, str(bounded_dir))
+
+    assert _read_dir(bounded_dir) == _read_dir(unbounded_dir)
+    # Evicted glyphs went back to their undecoded form
+    decoded = [
+        name
+        for name, glyph in ttfont["glyf"].glyphs.items()
+        if not hasattr(glyph, "data") and glyph.numberOfContours
+    ]
+    assert len(decoded) <= 1
+    assert len(ttfont["gvar"].variations.data) == len(ttfont.getGlyphOrder())
+    assert sum(not callable(v) for v in ttfont["gvar"].variations.data.values()) <= 1
+
+
+def test_write_svg_symbols_parallel_matches_baseline(tmpdir):
+    svgs = ["sample.svg", "40px.svg", "20px_with_viewbox.svg"]
+    batch.write_svg_symbols(
+        {os.path.join("./tests", svg): str(tmpdir / svg) for svg in svgs}, jobs=2
+    )
+
+    with open(tmpdir / "sample.svg") as actual, open(
+        "./tests/sample_symbol_baseline.svg"
+    ) as expected:
+        assert actual.read() == expected.read()
+    for svg in svgs:
+        expected_file = tmpdir / ("serial_" + svg)
+        batch.create_svg_symbol(os.path.join("./tests", svg)).write_to(expected_file)
+        with open(tmpdir / svg) as actual, open(expected_file) as expected:
+            assert actual.read() == expected.read()
+
+
+def _load_instance_at(wght):
+    return batch.load_variable_instances(
+        ttLib.TTFont(_SAMPLE_FONT), {"Regular-M": {"wght": wght}}
+    )
+
+
+def test_family_symbols_match_each_font(tmpdir):
+    icon_names = ["ic_a", "ic_g", "alias_ic_k"]
+    load_fns = {
+        "Light": functools.partial(_load_instance_at, 300),
+        "Bold": functools.partial(_load_instance_at, 700),
+    }
+    icons = [(font, n) for font in load_fns for n in icon_names]
+    expected = [
+        (icon, batch.render_symbol(load_fns[icon[0]](), icon[1])) for icon in icons
+    ]
+
+    for jobs in (1, 2):
+        assert list(batch.render_family_symbols(load_fns, icons, jobs)) == expected
+
+
+@pytest.mark.parametrize("engine", ["ninja", "inprocess"])
+def test_vf2symbols_font_family(tmpdir, engine):
+    fonts = []
+    for name in ("Outlined", "Rounded"):
+        fonts.append(str(tmpdir / f"{name}.ttf"))
+        shutil.copy(_SAMPLE_FONT, fonts[-1])
+    subprocess.run(
+        [
+            sys.executable,
+            "-m",
+            "vf2symbols.vf2symbols",
+            f"--engine={engine}",
+            "--jobs=2",
+            f"--build_dir={tmpdir / 'family'}",
+            "--icon_filter=^ic_[ab]$",
+            *fonts,
+        ],
+        check=True,
+    )
+    subprocess.run(
+        [
+            sys.executable,
+            "-m",
+            "vf2symbols.vf2symbols",
+            "--engine=inprocess",
+            f"--build_dir={tmpdir / 'single'}",
+            "--icon_filter=^ic_[ab]$",
+            fonts[0],
+        ],
+        check=True,
+    )
+
+    expected = _read_dir(tmpdir / "single" / "symbols")
+    assert sorted(expected) == ["ic_a.svg", "ic_b.svg"]
+    for name in ("Outlined", "Rounded"):
+        assert _read_dir(tmpdir / "family" / "symbols" / name) == expected
+
+
+def test_vf2symbols_font_family_rule_names_collide(tmpdir):
+    fonts = []
+    # Both would have ninja rules named Gen_Icons_Sharp_<instance>
+    for name in ("Icons Sharp", "Icons_Sharp"):
+        fonts.append(str(tmpdir / f"{name}.ttf"))
+        shutil.copy(_SAMPLE_FONT, fonts[-1])
+    result = subprocess.run(
+        [
+            sys.executable,
+            "-m",
+            "vf2symbols.vf2symbols",
+            f"--build_dir={tmpdir / 'family'}",
+            *fonts,
+        ],
+        stderr=subprocess.PIPE,
+        universal_newlines=True,
+    )
+    assert result.returncode != 0
+    assert "distinct in [a-zA-Z0-9_.-]" in result.stderr
+
+
+def test_group_aliases():
+    font_index = _load_variable_instances()["Light-M"].font_index
+    assert batch.group_aliases(
+        [font_index, font_index], ["ic_a", "alias_ic_k", "ic_b", "ic_k"]
+    ) == {"ic_a": (), "alias_ic_k": ("ic_k",), "ic_b": ()}
+
+
+@pytest.mark.parametrize("alias_files", ["copy", "hardlink", "symlink"])
+def test_write_icon_files_aliases(tmpdir, alias_files):
+    instances = _load_variable_instances()
+    icon_names = ["ic_k", "ic_a", "alias_ic_k"]
+    out_files = {n: str(tmpdir / f"{n}.svg") for n in icon_names}
+    # Links of an earlier run are replaced, not written through
+    os.symlink(out_files["ic_a"], out_files["ic_k"])
+
+    assert batch.write_icon_files(instances, out_files, None, alias_files) == 3
+
+    for icon_name, out_file in out_files.items():
+        with open(out_file) as f:
+            assert f.read() == batch.create_symbol(instances, icon_name).tostring()
+    stat_a, stat_k = (os.lstat(out_files[n]) for n in ("ic_k", "alias_ic_k"))
+    assert os.path.samestat(stat_a, stat_k) == (alias_files == "hardlink")
+    assert os.path.islink(out_files["alias_ic_k"]) == (alias_files == "symlink")
+    assert not os.path.islink(out_files["ic_k"])
+
+
+def test_vf2symbols_path_precision(tmpdir):
+    def vf2symbols(engine, build_dir, *args):
+        subprocess.run(
+            [
+                sys.executable,
+                "-m",
+                "vf2symbols.vf2symbols",
+                f"--engine={engine}",
+                f"--build_dir={build_dir}",
+                "--icon_filter=^ic_[ab]$",
+                *args,
+                _SAMPLE_FONT,
+            ],
+            check=True,
+        )
+        return _read_dir(build_dir / "symbols")
+
+    default = vf2symbols("ninja", tmpdir / "ninja")
+    # Rebuilt, symbols cached with the default path data aren't reused
+    compact = vf2symbols("ninja", tmpdir / "ninja", "--path_precision=2")
+    assert sorted(compact) == sorted(default) == ["ic_a.svg", "ic_b.svg"]
+    for name, svg in compact.items():
+        assert len(svg) < len(default[name])
+    inprocess = tmpdir / "inprocess"
+    assert vf2symbols("inprocess", inprocess, "--path_precision=2") == compact
+
+
+def test_vf2symbols_ninja_leaves_unchanged_symbols(tmpdir):
+    font_file = str(tmpdir / "sample_icons_vf.ttf")
+    shutil.copy(_SAMPLE_FONT, font_file)
+    build_dir = tmpdir / "build"
+    argv = [
+        sys.executable,
+        "-m",
+        "vf2symbols.vf2symbols",
+        f"--build_dir={build_dir}",
+        "--icon_filter=^ic_[ab]$",
+        "--nocache",
+        font_file,
+    ]
+    subprocess.run(argv, check=True)
+    symbol_files = [str(build_dir / "symbols" / f"ic_{c}.svg") for c in "ab"]
+    for symbol_file in symbol_files:
+        os.utime(symbol_file, ns=(10**18, 10**18))
+
+    # Every edge reruns, redrawing the same symbols
+    os.utime(font_file)
+    subprocess.run(argv, check=True)
+    assert [os.stat(f).st_mtime_ns for f in symbol_files] == [10**18] * 2
+    # Restat, so nothing is dirty after
+    dry_run = subprocess.run(
+        ["ninja", "-C", str(build_dir), "-n"],
+        check=True,
+        capture_output=True,
+        text=True,
+    )
+    assert "no work to do" in dry_run.stdout
@@ -0,0 +1,120 @@
+"""Tests for vf2symbols.build_manifest"""
+import os
+import subprocess
+import sys
+
+from vf2symbols import build_manifest
+
+_SAMPLE_FONT = os.path.abspath("./tests/sample_icons_vf.ttf")
+
+
+def _gen_ninja(build_dir, *args):
+    subprocess.run(
+        [
+            sys.executable,
+            "-m",
+            "vf2symbols.vf2symbols",
+            f"--build_dir={build_dir}",
+            "--noexec_ninja",
+            *args,
+            _SAMPLE_FONT,
+        ],
+        check=True,
+    )
+    return os.path.join(build_dir, "build.ninja")
+
+
+def _writer(outputs, command="cmd $in $out"):
+    nw = build_manifest.RecordingWriter()
+    nw.rule("r", command)
+    for output in outputs:
+        nw.build(output, "r", "in")
+    return nw
+
+
+def test_unchanged_rerun_leaves_build_file_alone(tmpdir):
+    build_file = _gen_ninja(tmpdir)
+    os.utime(build_file, (0, 0))
+
+    assert _gen_ninja(tmpdir) == build_file
+    assert os.stat(build_file).st_mtime == 0
+
+    # A different icon set rewrites it
+    _gen_ninja(tmpdir, "--icon_filter=^ic_a$")
+    assert os.stat(build_file).st_mtime != 0
+
+
+def test_is_current(tmpdir):
+    build_file = str(tmpdir / "build.ninja")
+    assert not build_manifest.is_current(build_file, "inputs")
+
+    build_manifest.update(build_file, "inputs", ["a"], _writer(["a.svg"]))
+    assert build_manifest.is_current(build_file, "inputs")
+    assert not build_manifest.is_current(build_file, "other inputs")
+
+    with open(build_file, "a") as f:
+        f.write("# edited\n")
+    assert not build_manifest.is_current(build_file, "inputs")
+
+
+def test_is_current_needs_generated_files(tmpdir):
+    build_file = str(tmpdir / "build.ninja")
+    generated = tmpdir / "font.subset.ttf"
+    generated.write("subset")
+    build_manifest.update(
+        build_file, "inputs", ["a"], _writer(["a.svg"]), [str(generated)]
+    )
+    assert build_manifest.load(build_file).generated.keys() == {"font.subset.ttf"}
+    assert build_manifest.is_current(build_file, "inputs")
+
+    generated.write("other subset")
+    assert not build_manifest.is_current(build_file, "inputs")
+    os.remove(generated)
+    assert not build_manifest.is_current(build_file, "inputs")
+
+
+def test_missing_subset_font_regenerated(tmpdir):
+    args = ("--icon_filter=^ic_a", "--symbol_scales=M")
+    subprocess.run(
+        [
+            sys.executable,
+            "-m",
+            "vf2symbols.vf2symbols",
+            f"--build_dir={tmpdir}",
+            *args,
+            _SAMPLE_FONT,
+        ],
+        check=True,
+    )
+    subset_file = tmpdir / "sample_icons_vf.subset.ttf"
+    assert os.path.isfile(subset_file)
+    os.remove(subset_file)
+
+    # No edge makes the subset, the generator has to write it again
+    _gen_ninja(tmpdir, *args)
+    assert os.path.isfile(subset_file)
+    subprocess.run(["ninja", "-C", str(tmpdir)], check=True)
+
+
+def test_stale_outputs_removed(tmpdir):
+    build_file = str(tmpdir / "build.ninja")
+    build_manifest.update(build_file, "1", ["a", "b"], _writer(["a.svg", "b.svg"]))
+    for output in ("a.svg", "b.svg"):
+        (tmpdir / output).write("")
+
+    stale = build_manifest.update(build_file, "2", ["a"], _writer(["a.svg"]))
+
+    assert stale == ["b.svg"]
+    assert os.path.isfile(tmpdir / "a.svg")
+    assert not os.path.exists(tmpdir / "b.svg")
+    assert build_manifest.load(build_file).icons == ["a"]
+
+
+def test_rule_change_rewrites_build_file(tmpdir):
+    build_file = str(tmpdir / "build.ninja")
+    build_manifest.update(build_file, "1", ["a"], _writer(["a.svg"]))
+    build_manifest.update(build_file, "1", ["a"], _writer(["a.svg"], "new $in $out"))
+
+    assert build_manifest.load(build_file).rules == {"r": "new $in $out"}
+    with open(build_file) as f:
+        assert "command = new $in $out" in f.read()
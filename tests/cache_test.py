@@ -0,0 +1,151 @@
+"""Tests for vf2symbols.cache"""
+from fontTools import ttLib
+from picosvg.svg import SVG
+
+import os
+
+from vf2symbols import batch
+from vf2symbols import cache
+
+_SAMPLE_FONT = "./tests/sample_icons_vf.ttf"
+
+
+def _key(*parts):
+    return cache.CacheKey().update(*parts)
+
+
+def test_get_put(tmpdir):
+    symbol_cache = cache.SymbolCache(str(tmpdir))
+
+    assert symbol_cache.get(_key("a")) is None
+    symbol_cache.put(_key("a"), "<svg/>")
+
+    assert symbol_cache.get(_key("a")) == "<svg/>"
+    assert symbol_cache.get(_key("b")) is None
+    assert (symbol_cache.hits, symbol_cache.misses) == (1, 2)
+
+
+def test_key_parts_are_delimited():
+    assert _key("ab", "c").hexdigest() != _key("a", "bc").hexdigest()
+    assert _key(b"a").hexdigest() != _key("a").hexdigest()
+
+
+def test_evicts_least_recently_used(tmpdir):
+    symbol_cache = cache.SymbolCache(str(tmpdir), max_bytes=250)
+    for i, name in enumerate("abc"):
+        symbol_cache.put(_key(name), name * 100)
+        # mtime resolution can be coarse, spell out the access order
+        path = symbol_cache._path(_key(name).hexdigest())
+        os.utime(path, (i, i))
+
+    symbol_cache.put(_key("d"), "d" * 100)
+
+    assert symbol_cache.evictions == 2
+    assert symbol_cache.get(_key("a")) is None
+    assert symbol_cache.get(_key("b")) is None
+    assert symbol_cache.get(_key("c")) == "c" * 100
+    assert symbol_cache.get(_key("d")) == "d" * 100
+
+
+def test_put_replacing_entry_keeps_size(tmpdir):
+    symbol_cache = cache.SymbolCache(str(tmpdir), max_bytes=250)
+    symbol_cache.put(_key("a"), "a" * 120)
+    # Within the budget, but past the 90% eviction drops to
+    symbol_cache.put(_key("b"), "b" * 120)
+    symbol_cache.put(_key("b"), "b" * 120)
+
+    assert symbol_cache.evictions == 0
+    assert symbol_cache.get(_key("a")) == "a" * 120
+
+
+def test_evict_removes_stale_temp_files(tmpdir):
+    symbol_cache = cache.SymbolCache(str(tmpdir), max_bytes=250)
+    stale = tmpdir.join("ab", "stale.tmp")
+    stale.write("x" * 1000, ensure=True)
+    os.utime(stale, (0, 0))
+    in_progress = tmpdir.join("ab", "in_progress.tmp")
+    in_progress.write("x" * 1000)
+
+    symbol_cache.put(_key("a"), "a" * 100)
+    symbol_cache.put(_key("b"), "b" * 200)
+
+    assert not stale.exists()
+    assert in_progress.exists()
+    # Temp files don't count toward the budget
+    assert symbol_cache.evictions == 1
+
+
+def _load_variable_instances(wght=700):
+    return batch.load_variable_instances(
+        ttLib.TTFont(_SAMPLE_FONT),
+        {"Light-M": {"wght": 300}, "Bold-M": {"wght": wght}},
+    )
+
+
+def test_cached_symbols_match_drawn(tmpdir):
+    symbol_cache = cache.SymbolCache(str(tmpdir))
+    instances = _load_variable_instances()
+    icon_names = ["ic_a", "ic_g", "ic_k", "alias_ic_k"]
+
+    drawn = [batch.render_symbol(instances, n, symbol_cache) for n in icon_names]
+    cached = [batch.render_symbol(instances, n, symbol_cache) for n in icon_names]
+
+    assert cached == drawn
+    assert drawn == [batch.create_symbol(instances, n).tostring() for n in icon_names]
+    # alias_ic_k draws the same outlines as ic_k
+    assert (symbol_cache.hits, symbol_cache.misses) == (5, 3)
+
+
+def test_outline_change_misses(tmpdir):
+    symbol_cache = cache.SymbolCache(str(tmpdir))
+    batch.render_symbol(_load_variable_instances(), "ic_a", symbol_cache)
+
+    batch.render_symbol(_load_variable_instances(wght=900), "ic_a", symbol_cache)
+
+    assert (symbol_cache.hits, symbol_cache.misses) == (0, 2)
+
+
+def test_parallel_counts_worker_hits(tmpdir):
+    symbol_cache = cache.SymbolCache(str(tmpdir / "cache"))
+    icon_names = ["ic_a", "ic_b", "ic_c", "ic_d"]
+    icons = [(None, icon_name) for icon_name in icon_names]
+    for _ in range(2):
+        list(
+            batch.render_family_symbols(
+                {None: _load_variable_instances}, icons, 2, symbol_cache
+            )
+        )
+
+    assert (symbol_cache.hits, symbol_cache.misses) == (4, 4)
+
+
+def test_pico_cache_skips_picosvg(tmpdir, monkeypatch):
+    symbol_cache = cache.SymbolCache(str(tmpdir))
+    pico_cache = cache.PicoCache.beside(symbol_cache)
+    expected = batch.create_svg_symbol("./tests/sample.svg").tostring()
+    drawn = batch.render_svg_symbol("./tests/sample.svg", None, pico_cache)
+
+    # As when the template changed: every symbol is redrawn, none normalized
+    monkeypatch.setattr(SVG, "topicosvg", None)
+    cached = batch.render_svg_symbol("./tests/sample.svg", symbol_cache, pico_cache)
+
+    assert cached == drawn == expected
+    assert (pico_cache.hits, pico_cache.misses) == (1, 1)
+    # Kept apart from the symbols
+    assert (symbol_cache.hits, symbol_cache.misses) == (0, 1)
+    assert symbol_cache.get(cache.CacheKey().update("x")) is None
+
+
+def test_parallel_counts_worker_pico_hits(tmpdir):
+    symbol_cache = cache.SymbolCache(str(tmpdir / "cache"))
+    pico_cache = cache.PicoCache.beside(symbol_cache)
+    svg_files = [
+        "./tests/sample.svg",
+        "./tests/40px.svg",
+        "./tests/20px_with_viewbox.svg",
+    ]
+    for c in (None, symbol_cache):
+        list(batch.render_svg_symbols(svg_files, 2, c, pico_cache))
+
+    assert (pico_cache.hits, pico_cache.misses) == (3, 3)
+    assert (symbol_cache.hits, symbol_cache.misses) == (0, 3)
@@ -0,0 +1,117 @@
+"""Tests for vf2symbols.daemon"""
+from concurrent.futures import ThreadPoolExecutor
+from fontTools import ttLib
+from fontTools.varLib import instancer
+
+import os
+import pytest
+import threading
+
+from vf2symbols import batch
+from vf2symbols import client
+from vf2symbols import daemon
+
+
+@pytest.fixture
+def socket_path():
+    # Unix socket paths are short, keep it out of the deep pytest tmp dir
+    path = f"/tmp/vf2symbols-test-{os.getpid()}.sock"
+    server = daemon.serve(path, daemon.Daemon())
+    thread = threading.Thread(target=server.serve_forever)
+    thread.start()
+    yield path
+    server.shutdown()
+    server.server_close()
+    thread.join()
+    os.remove(path)
+
+
+def _read(path):
+    with open(path) as f:
+        return f.read()
+
+
+def test_svg_matches_baseline(tmpdir, socket_path):
+    out = str(tmpdir / "sample_symbol.svg")
+    response = client.request(
+        "write_symbol_from_svg", ["--out", out, "./tests/sample.svg"], socket_path
+    )
+
+    assert response == {"ok": True, "stdout": ""}
+    assert _read(out) == _read("./tests/sample_symbol_baseline.svg")
+
+
+def test_svg_path_precision(tmpdir, socket_path):
+    out = str(tmpdir / "sample_symbol.svg")
+    response = client.request(
+        "write_symbol_from_svg",
+        ["--path_precision=1", "--out", out, "./tests/sample.svg"],
+        socket_path,
+    )
+
+    assert response == {"ok": True, "stdout": ""}
+    assert _read(out) == batch.create_svg_symbol("./tests/sample.svg", 1).tostring()
+
+
+def test_svgs_to_stdout(socket_path):
+    response = client.request(
+        "write_symbol_from_svgs",
+        [
+            "Regular-S=./tests/20px_with_viewbox.svg",
+            "Regular-M=./tests/24px_invisible_bounding_box.svg",
+            "Regular-L=./tests/40px.svg",
+        ],
+        socket_path,
+    )
+
+    assert response["ok"]
+    assert response["stdout"] == _read("./tests/regular_sml_baseline.svg") + "\n"
+
+
+def test_fonts_match_batch(tmpdir, socket_path):
+    font_file = str(tmpdir / "sample_icons.Bold-M.ttf")
+    instancer.instantiateVariableFont(
+        ttLib.TTFont("./tests/sample_icons_vf.ttf"), {"wght": 700}
+    ).save(font_file)
+    icon_names = ["ic_a", "ic_g", "alias_ic_k"]
+    out_dir = tmpdir.mkdir("out")
+    args = [f"--out={out_dir / n}.svg" for n in icon_names] + [font_file]
+
+    # Concurrent requests share the font
+    with ThreadPoolExecutor(4) as executor:
+        responses = list(
+            executor.map(
+                lambda _: client.request("write_symbol_from_fonts", args, socket_path),
+                range(8),
+            )
+        )
+    assert all(r["ok"] for r in responses)
+
+    expected_dir = tmpdir.mkdir("expected")
+    batch.write_symbols(
+        batch.load_instances({"Bold-M": ttLib.TTFont(font_file)}),
+        icon_names,
+        str(expected_dir),
+    )
+    for icon_name in icon_names:
+        assert _read(out_dir / f"{icon_name}.svg") == _read(
+            expected_dir / f"{icon_name}.svg"
+        )
+
+    stats = client.request("stats", (), socket_path)["stats"]
+    assert stats["write_symbol_from_fonts"]["requests"] == 8
+    assert stats["write_symbol_from_fonts"]["errors"] == 0
+
+
+def test_errors(socket_path):
+    response = client.request(
+        "write_symbol_from_svg", ["--nope", "./tests/sample.svg"], socket_path
+    )
+    assert not response["ok"]
+    assert "--nope" in response["error"]
+
+    response = client.request("write_symbol_from_svg", ["missing.svg"], socket_path)
+    assert not response["ok"]
+
+    stats = client.request("stats", (), socket_path)["stats"]
+    assert stats["write_symbol_from_svg"]["errors"] == 2
@@ -0,0 +1,54 @@
+"""Tests for vf2symbols.fonts"""
+import copy
+import io
+
+import pytest
+from fontTools import ttLib
+from fontTools.varLib import instancer
+
+from vf2symbols import batch
+from vf2symbols import fonts
+
+_SAMPLE_FONT = "./tests/sample_icons_vf.ttf"
+
+
+def _sources():
+    with open(_SAMPLE_FONT, "rb") as f:
+        data = f.read()
+    return {
+        "path": lambda: _SAMPLE_FONT,
+        "bytes": lambda: data,
+        "bytesio": lambda: io.BytesIO(data),
+        "file": lambda: open(_SAMPLE_FONT, "rb"),
+    }
+
+
+def _symbols(ttfont):
+    instances = batch.load_variable_instances(
+        ttfont, {"Light-M": {"wght": 300}, "Bold-M": {"wght": 700}}
+    )
+    return list(batch.render_symbols(instances, ["ic_a", "ic_g", "alias_ic_k"]))
+
+
+@pytest.mark.parametrize("source", sorted(_sources()))
+def test_open_font_matches_ttfont(source):
+    ttfont = fonts.open_font(_sources()[source]())
+    # Glyphs are views of the font data until drawn, not copies
+    glyph_data = [g.data for g in ttfont["glyf"].glyphs.values() if g.data]
+    assert glyph_data
+    assert all(isinstance(data, memoryview) for data in glyph_data)
+    assert _symbols(ttfont) == _symbols(ttLib.TTFont(_SAMPLE_FONT))
+
+
+def test_open_font_tables_match_ttfont():
+    ttfont = fonts.open_font(_SAMPLE_FONT)
+    expected = ttLib.TTFont(_SAMPLE_FONT)
+    for tag in expected.reader.keys():
+        assert ttfont.getTableData(tag) == expected.getTableData(tag), tag
+
+
+def test_open_font_without_views_copies():
+    ttfont = fonts.open_font(_SAMPLE_FONT, views=False)
+    instance = instancer.instantiateVariableFont(ttfont, {"wght": 700})
+    assert "fvar" not in instance and "fvar" in ttfont
+    assert copy.deepcopy(ttfont)["glyf"].keys() == ttfont["glyf"].keys()
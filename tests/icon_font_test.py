@@ -0,0 +1,97 @@
+"""Tests for vf2symbols.icon_font"""
+from fontTools import ttLib
+
+import os
+import pickle
+import pytest
+import re
+
+from vf2symbols import icon_font
+
+
+_SAMPLE_FONT = "./tests/sample_icons_vf.ttf"
+
+
+def test_index_resolves_every_icon():
+    ttfont = ttLib.TTFont(_SAMPLE_FONT)
+    font_index = icon_font.IconFontIndex.build(ttfont)
+
+    icon_names = list(font_index.extract_icon_names(re.compile("")))
+    assert len(icon_names) == len(font_index) == 13
+    assert icon_names[:3] == ["alias_ic_k", "ic_a", "ic_b"]
+    assert font_index.resolve_ligature("ic_a") == "icon00000"
+    assert font_index.resolve_ligature("alias_ic_k") == "icon00010"
+    assert font_index.icon_names("icon00010") == ("alias_ic_k", "ic_k")
+    assert icon_font.resolve_ligature(ttfont, "ic_l") == "icon00011"
+
+
+def test_index_filters_icon_names():
+    ttfont = ttLib.TTFont(_SAMPLE_FONT)
+
+    assert list(icon_font.extract_icon_names(ttfont, re.compile("alias"))) == [
+        "alias_ic_k"
+    ]
+
+
+def test_unknown_icon_raises():
+    font_index = icon_font.IconFontIndex.build(ttLib.TTFont(_SAMPLE_FONT))
+
+    with pytest.raises(KeyError):
+        font_index.resolve_ligature("ic_zz")
+
+
+def test_load_or_build_reuses_pickled_index(tmpdir):
+    index_file = str(tmpdir / "sample.ligatures.pickle")
+    built = icon_font.IconFontIndex.load_or_build(_SAMPLE_FONT, index_file)
+    assert os.path.isfile(index_file)
+
+    loaded = icon_font.IconFontIndex.load_or_build(_SAMPLE_FONT, index_file)
+    assert loaded is not built
+    assert loaded.resolve_ligature("ic_g") == built.resolve_ligature("ic_g")
+
+    # a pickle for some other font is ignored and replaced
+    with open(index_file, "wb") as f:
+        pickle.dump((1, "not the font digest", None), f)
+    rebuilt = icon_font.IconFontIndex.load_or_build(_SAMPLE_FONT, index_file)
+    assert rebuilt.resolve_ligature("ic_g") == "icon00006"
+
+
+def test_load_or_build_replaces_index_atomically(tmpdir):
+    index_file = str(tmpdir / "sample.ligatures.pickle")
+    with open(index_file, "wb") as f:
+        pickle.dump((1, "not the font digest", None), f)
+
+    # A reader of the old index keeps reading all of it
+    with open(index_file, "rb") as reader:
+        icon_font.IconFontIndex.load_or_build(_SAMPLE_FONT, index_file)
+        assert pickle.load(reader) == (1, "not the font digest", None)
+    assert os.listdir(tmpdir) == ["sample.ligatures.pickle"]
+
+
+def test_glyph_closure_includes_components():
+    ttfont = ttLib.TTFont(_SAMPLE_FONT)
+
+    assert icon_font.glyph_closure(ttfont, ["icon00000"]) == {"icon00000"}
+    assert icon_font.glyph_closure(ttfont, ["icon00006", "icon00001"]) == {
+        "icon00006",
+        "icon00001",
+        "base",
+        "uni0061",
+    }
+
+
+def test_subset_icons_keeps_only_selected_icons():
+    ttfont = ttLib.TTFont(_SAMPLE_FONT)
+    modified = ttfont["head"].modified
+
+    subset_font = icon_font.subset_icons(ttfont, ["ic_b", "ic_g"])
+
+    assert ttfont["head"].modified == modified
+    assert {"icon00001", "icon00006", "base"} <= set(subset_font.getGlyphOrder())
+    assert "icon00002" not in subset_font.getGlyphOrder()
+    assert "gvar" in subset_font
+    assert list(icon_font.extract_icon_names(subset_font, re.compile(""))) == [
+        "ic_b",
+        "ic_g",
+    ]
+    assert icon_font.resolve_ligature(subset_font, "ic_g") == "icon00006"
@@ -0,0 +1,96 @@
+"""Tests for vf2symbols.instrument"""
+import json
+import pytest
+import subprocess
+import sys
+
+from vf2symbols import instrument
+
+
+@pytest.fixture
+def recording():
+    instrument.enable(trace=True)
+    yield
+    instrument.disable()
+
+
+def test_off_by_default():
+    assert not instrument.enabled()
+    with instrument.stage("draw"):
+        instrument.count("points", 3)
+    instrument.enable()
+    try:
+        assert instrument.report()["stages"] == {}
+    finally:
+        instrument.disable()
+
+
+def test_stages_and_counters(recording):
+    for _ in range(2):
+        with instrument.stage("draw"):
+            instrument.count("points", 3)
+    with instrument.stage("serialize"):
+        pass
+
+    report = instrument.report()
+    assert report["stages"]["draw"]["calls"] == 2
+    assert report["stages"]["serialize"]["calls"] == 1
+    assert report["counters"] == {"points": 6}
+    assert [e["name"] for e in instrument.collect()["events"]] == [
+        "draw",
+        "draw",
+        "serialize",
+    ]
+
+
+def test_collect_and_merge(recording):
+    with instrument.stage("draw"):
+        instrument.count("icons")
+    recorded = instrument.collect()
+    assert instrument.report()["stages"] == {}
+
+    instrument.merge(recorded)
+    instrument.merge(recorded)
+    report = instrument.report()
+    assert report["stages"]["draw"]["calls"] == 2
+    assert report["counters"] == {"icons": 2}
+    assert len(instrument.collect()["events"]) == 2
+
+
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_vf2symbols_profile(tmpdir, jobs):
+    report_file = tmpdir / "profile.json"
+    trace_file = tmpdir / "trace.json"
+    subprocess.run(
+        [
+            sys.executable,
+            "-m",
+            "vf2symbols.vf2symbols",
+            "--engine=inprocess",
+            f"--jobs={jobs}",
+            f"--build_dir={tmpdir}",
+            "--nocache",
+            "--icon_filter=^ic_[ab]$",
+            f"--profile={report_file}",
+            f"--profile_trace={trace_file}",
+            "./tests/sample_icons_vf.ttf",
+        ],
+        check=True,
+    )
+
+    with open(report_file) as f:
+        report = json.load(f)
+    assert report["counters"]["icons"] == 2
+    assert report["counters"]["points"] > 0
+    assert report["counters"]["bytes_written"] == sum(
+        (tmpdir / "symbols" / f"ic_{c}.svg").size() for c in "ab"
+    )
+    # 9 weights in 3 scales
+    assert report["stages"]["draw"]["calls"] == 2 * 27
+    assert report["stages"]["serialize"]["calls"] == 2
+
+    with open(trace_file) as f:
+        events = json.load(f)["traceEvents"]
+    assert sum(e["name"] == "symbol" for e in events) == 2
+    # Workers' events are merged into the parent's
+    assert (len({e["pid"] for e in events}) > 1) == (jobs > 1)
@@ -0,0 +1,130 @@
+"""Tests for vf2symbols.output"""
+import os
+import pytest
+import time
+
+from vf2symbols import instrument
+from vf2symbols import output
+
+
+def _set_mtime(path, ns=10**18):
+    os.utime(path, ns=(ns, ns), follow_symlinks=False)
+
+
+def test_write_if_changed(tmpdir):
+    path = str(tmpdir / "symbol.svg")
+    assert output.write_if_changed(path, b"<svg/>")
+    _set_mtime(path)
+    assert not output.write_if_changed(path, b"<svg/>")
+    assert os.stat(path).st_mtime_ns == 10**18
+    # Same size, different content
+    assert output.write_if_changed(path, b"<svg >")
+    with open(path, "rb") as f:
+        assert f.read() == b"<svg >"
+    assert os.listdir(tmpdir) == ["symbol.svg"]
+
+
+def test_write_if_changed_replaces_links(tmpdir):
+    target = str(tmpdir / "target.svg")
+    with open(target, "wb") as f:
+        f.write(b"<svg/>")
+    path = str(tmpdir / "symbol.svg")
+    os.symlink("target.svg", path)
+    # Holds the same bytes, but through a link
+    assert output.write_if_changed(path, b"<svg/>")
+    assert not os.path.islink(path)
+    os.remove(path)
+    os.link(target, path)
+    assert output.write_if_changed(path, b"<svg></svg>")
+    with open(target, "rb") as f:
+        assert f.read() == b"<svg/>"
+
+
+def test_write_if_changed_leaves_other_temps(tmpdir):
+    path = str(tmpdir / "symbol.svg")
+    # Another writer's, e.g. of an overlapping ninja edge, still writing
+    other_temp = str(tmpdir / "symbol.svg.tmp")
+    with open(other_temp, "wb") as f:
+        f.write(b"partial")
+    assert output.write_if_changed(path, b"<svg/>")
+    assert sorted(os.listdir(tmpdir)) == sorted(["symbol.svg", "symbol.svg.tmp"])
+    with open(other_temp, "rb") as f:
+        assert f.read() == b"partial"
+
+
+def test_write_if_changed_default_mode(tmpdir):
+    path = str(tmpdir / "symbol.svg")
+    plain = str(tmpdir / "plain.svg")
+    with open(plain, "wb"):
+        pass
+    assert output.write_if_changed(path, b"<svg/>")
+    assert os.stat(path).st_mode == os.stat(plain).st_mode
+
+
+@pytest.mark.parametrize("alias_files", output.ALIAS_FILES)
+def test_file_writer(tmpdir, alias_files):
+    paths = [str(tmpdir / f"ic_{i}.svg") for i in range(20)]
+    aliases = [str(tmpdir / f"alias_ic_{i}.svg") for i in range(20)]
+
+    def write_all(data):
+        with output.FileWriter(threads=2) as writer:
+            for path, alias in zip(paths, aliases):
+                writer.write(path, data + path.encode(), [alias], alias_files)
+        return writer
+
+    writer = write_all(b"<svg/>")
+    assert (writer.written, writer.unchanged) == (40, 0)
+    for path in paths + aliases:
+        _set_mtime(path)
+
+    writer = write_all(b"<svg/>")
+    assert (writer.written, writer.unchanged, writer.bytes_written) == (0, 40, 0)
+    assert "0 of 40 files written, 40 unchanged" in writer.stats()
+    for path in paths + aliases:
+        assert os.lstat(path).st_mtime_ns == 10**18
+
+    writer = write_all(b"<svg></svg>")
+    # Symlinks still name the file they link
+    relinked = 0 if alias_files == "symlink" else 20
+    assert (writer.written, writer.unchanged) == (20 + relinked, 20 - relinked)
+    for path, alias in zip(paths, aliases):
+        with open(alias, "rb") as f:
+            assert f.read() == b"<svg></svg>" + path.encode()
+    if alias_files == "symlink":
+        assert os.readlink(aliases[0]) == "ic_0.svg"
+    elif alias_files == "hardlink":
+        assert os.path.samefile(paths[0], aliases[0])
+
+
+def test_file_writer_counts(tmpdir):
+    instrument.enable()
+    try:
+        with output.FileWriter() as writer:
+            writer.write(str(tmpdir / "a.svg"), b"<svg/>", [str(tmpdir / "b.svg")])
+        with output.FileWriter() as writer:
+            writer.write(str(tmpdir / "a.svg"), b"<svg/>")
+        report = instrument.report()
+    finally:
+        instrument.disable()
+    counters = report["counters"]
+    assert counters["bytes_written"] == 12
+    assert counters["files_written"] == 2
+    assert counters["files_unchanged"] == 1
+    assert report["stages"]["write"]["calls"] == 4
+
+
+def test_file_writer_raises(tmpdir):
+    with pytest.raises(FileNotFoundError):
+        with output.FileWriter() as writer:
+            writer.write(str(tmpdir / "missing" / "a.svg"), b"<svg/>")
+
+
+def test_file_writer_raises_on_next_write(tmpdir):
+    writer = output.FileWriter(threads=1)
+    writer.write(str(tmpdir / "missing" / "a.svg"), b"<svg/>")
+    while writer._pending:
+        time.sleep(0.01)
+    # The write's own error, whichever Python cancels pending writes
+    with pytest.raises(FileNotFoundError):
+        writer.write(str(tmpdir / "b.svg"), b"<svg/>")
+    assert not os.path.exists(tmpdir / "b.svg")
@@ -0,0 +1,218 @@
+"""Tests for vf2symbols.path_data"""
+from fontTools import svgLib
+from fontTools import ttLib
+from fontTools.pens.recordingPen import RecordingPen
+from fontTools.pens.svgPathPen import SVGPathPen
+from fontTools.svgLib.path import parse_path
+from fontTools.pens.transformPen import TransformPen
+from fontTools.misc.transform import Identity
+from fontTools.ttLib.tables._g_l_y_f import Glyph, GlyphCoordinates
+from picosvg.geometric_types import Rect
+from picosvg.svg import SVG
+from picosvg.svg_transform import Affine2D
+
+import numpy as np
+import pytest
+
+from vf2symbols import outlines
+from vf2symbols import path_data
+from vf2symbols import svg_icon
+
+_SAMPLE_FONT = "./tests/sample_icons_vf.ttf"
+
+# As Symbol places a 1000 upem glyph in Regular-M
+_TRANSFORM = Affine2D.rect_to_rect(
+    Rect(0, 1000, 1000, -1000), Rect(0, -95.23, 120, 120)
+)
+
+
+def _pen_path_data(drawable, glyph_set, transform, ntos=str):
+    svg_pen = SVGPathPen(glyph_set, ntos)
+    drawable.draw(TransformPen(svg_pen, transform))
+    return " ".join(svg_pen._commands)
+
+
+def _assert_same(drawable, glyph_set, transform=_TRANSFORM, ntos=str):
+    expected = _pen_path_data(drawable, glyph_set, transform, ntos)
+    assert path_data.svg_path_data(drawable, glyph_set, transform, ntos) == expected
+
+
+@pytest.mark.parametrize("wght", [100, 400, 650, 900])
+def test_font_glyphs_match_pens(wght):
+    ttfont = ttLib.TTFont(_SAMPLE_FONT)
+    glyph_set = outlines.GlyphOutlines(ttfont, [{"wght": wght}]).glyph_sets()[0]
+    for glyph_name in ttfont.getGlyphOrder():
+        _assert_same(glyph_set[glyph_name], glyph_set)
+
+
+@pytest.mark.parametrize(
+    "svg",
+    [
+        "sample.svg",
+        "40px.svg",
+        "20px_with_viewbox.svg",
+        "24px_invisible_bounding_box.svg",
+    ],
+)
+def test_svgs_match_pens(svg):
+    pico = SVG.parse("./tests/" + svg).topicosvg()
+    transform = Affine2D.rect_to_rect(
+        svg_icon.view_box(pico.xpath_one("//svg:svg")), Rect(0, -95.23, 120, 120)
+    )
+    _assert_same(
+        svgLib.SVGPath.fromstring(pico.tostring()),
+        None,
+        transform,
+        lambda pt: f"{pt:.3f}".rstrip("0").rstrip("."),
+    )
+
+
+def test_pen_rules_match_pens():
+    pen = RecordingPen()
+    pen.moveTo((0, 0))
+    pen.moveTo((10, 10))  # replaces the first moveTo
+    pen.lineTo((10, 10))  # duplicate, dropped
+    pen.lineTo((20, 20))  # implicit lineto after M
+    pen.lineTo((30, 25))
+    pen.lineTo((30, 40))  # V
+    pen.lineTo((50, 40))  # H
+    pen.lineTo((60, 45))  # L
+    pen.curveTo((61, 46), (62, 47), (63, 48))
+    pen.curveTo((64, 49), (65, 50))  # quadratic
+    pen.qCurveTo((70, 50), (80, 60), (90, 60), (100, 70))
+    pen.qCurveTo((110, 70))  # line
+    pen.closePath()
+    pen.qCurveTo((0, 0), (10, 0), (10, 10), (0, 10), None)  # no on-curve
+    pen.closePath()
+    pen.moveTo((5, 5))
+    pen.lineTo((6, 7))
+    pen.endPath()
+    _assert_same(pen, None)
+
+
+class _GlyfGlyph:
+    def __init__(self, contours):
+        self.glyph = Glyph()
+        self.glyph.coordinates = GlyphCoordinates(
+            [pt for contour in contours for pt, _ in contour]
+        )
+        self.glyph.flags = bytearray(on for c in contours for _, on in c)
+        self.glyph.endPtsOfContours = list(
+            np.cumsum([len(contour) for contour in contours]) - 1
+        )
+        self.glyph.numberOfContours = len(contours)
+
+    def glyf_contours(self):
+        return (
+            np.array(self.glyph.coordinates),
+            self.glyph.endPtsOfContours,
+            list(self.glyph.flags),
+        )
+
+    def draw(self, pen):
+        self.glyph.draw(pen, None)
+
+
+def test_glyf_contours_match_pens():
+    glyph = _GlyfGlyph(
+        [
+            # starts off-curve, wraps off-curve points around the end
+            [((0, 0), 0), ((10, 0), 1), ((20, 0), 0), ((30, 10), 0), ((30, 20), 1)],
+            # no on-curve points
+            [((40, 0), 0), ((50, 0), 0), ((50, 10), 0), ((40, 10), 0)],
+            # a lone point
+            [((60, 60), 1)],
+            # lines, a V, an H and a duplicate point
+            [((0, 50), 1), ((0, 60), 1), ((10, 60), 1), ((10, 60), 1), ((20, 70), 1)],
+            # a lone on-curve point with off-curve points around it
+            [((70, 0), 0), ((80, 10), 1), ((90, 0), 0)],
+        ]
+    )
+    _assert_same(glyph, None)
+
+
+def test_unsupported_falls_back():
+    pen = RecordingPen()
+    pen.moveTo((0, 0))
+    pen.curveTo((1, 1), (2, 2), (3, 3), (4, 4))
+    pen.closePath()
+    assert path_data.svg_path_data(pen, None, _TRANSFORM) is None
+    # Integer offsets would give integer coordinates
+    assert path_data.svg_path_data(pen, None, (1, 0, 0, 1, 0, 0)) is None
+
+
+def _points(d, precision):
+    """The points d draws, dropping any at the same rounded place as the last."""
+    pen = RecordingPen()
+    parse_path(d, pen)
+    points = []
+    last = None
+    for _, pts in pen.value:
+        for pt in pts:
+            rounded = (round(pt[0], precision), round(pt[1], precision))
+            if rounded != last:
+                points.append(pt)
+            last = rounded
+    return np.array(points)
+
+
+def _assert_compact(drawable, glyph_set, transform, precision):
+    compact = path_data.svg_path_data(
+        drawable, glyph_set, transform, precision=precision
+    )
+    expected = _pen_path_data(drawable, glyph_set, transform)
+    assert len(compact) < len(expected)
+    actual, expected = _points(compact, precision), _points(expected, precision)
+    assert actual.shape == expected.shape
+    # Relative coordinates don't accumulate rounding
+    assert np.abs(actual - expected).max() <= 0.5 * 10**-precision + 1e-9
+
+    pen = path_data.CompactPathPen(glyph_set, precision)
+    drawable.draw(TransformPen(pen, transform))
+    assert pen.getCommands() == compact
+
+
+@pytest.mark.parametrize("precision", [0, 1, 2, 3])
+def test_compact_font_glyphs_within_precision(precision):
+    ttfont = ttLib.TTFont(_SAMPLE_FONT)
+    glyph_set = outlines.GlyphOutlines(ttfont, [{"wght": 400}]).glyph_sets()[0]
+    for glyph_name in ttfont.getGlyphOrder():
+        if glyph_set[glyph_name].glyf_contours() is not None:
+            _assert_compact(glyph_set[glyph_name], glyph_set, _TRANSFORM, precision)
+
+
+@pytest.mark.parametrize("precision", [1, 3])
+def test_compact_svgs_within_precision(precision):
+    pico = SVG.parse("./tests/sample.svg").topicosvg()
+    transform = Affine2D.rect_to_rect(
+        svg_icon.view_box(pico.xpath_one("//svg:svg")), Rect(0, -95.23, 120, 120)
+    )
+    _assert_compact(
+        svgLib.SVGPath.fromstring(pico.tostring()), None, transform, precision
+    )
+
+
+def test_compact_encoding():
+    pen = RecordingPen()
+    pen.moveTo((0, 0))  # replaced by the next move, not written
+    pen.moveTo((10, 10))
+    pen.lineTo((20, 10))  # H, as short as h so absolute
+    pen.lineTo((20, 20.5))  # V
+    pen.lineTo((19.5, 20))  # relative, no separators before "-"
+    pen.lineTo((19, 19.5))  # repeats l without the letter
+    pen.closePath()
+    pen.moveTo((10.25, 10.25))  # relative to where the contour started
+    pen.lineTo((10.25, 10.25))  # duplicate, dropped
+    pen.lineTo((30.126, 40))  # absolute, rounded
+    pen.lineTo((21.5, 40.5))  # no separator between .5 numbers
+    pen.endPath()
+    pen.moveTo((50, 50))  # nothing drawn from it, not written
+    pen.closePath()
+    assert (
+        path_data.svg_path_data(pen, None, Identity, precision=2)
+        == "M10 10H20V20.5l-.5-.5-.5-.5Zm.25.25L30.13 40l-8.63.5"
+    )
+    assert (
+        path_data.svg_path_data(pen, None, Identity, precision=0)
+        == "M10 10H20V20H19Zm0 0L30 40H22"
+    )
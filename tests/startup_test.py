@@ -0,0 +1,65 @@
+"""Guards the startup time of vf2symbols entry points."""
+import json
+import subprocess
+import sys
+
+import pytest
+
+# Generous, entry points import in ~100ms, mostly absl, but 300ms+ when
+# they imported fontTools and picosvg eagerly
+_BUDGET_MS = 250
+
+# Only needed once there is a symbol to draw
+_HEAVY_MODULES = (
+    "fontTools.ttLib",
+    "fontTools.varLib.instancer",
+    "lxml",
+    "numpy",
+    "picosvg",
+    "regex",
+)
+
+
+def _import(module):
+    """Milliseconds to import module, best of 3, and what it imported."""
+    best = None
+    for _ in range(3):
+        result = subprocess.run(
+            [
+                sys.executable,
+                "-X",
+                "importtime",
+                "-c",
+                f"import json, sys, {module}; print(json.dumps(list(sys.modules)))",
+            ],
+            check=True,
+            capture_output=True,
+            text=True,
+        )
+        line = next(l for l in result.stderr.splitlines() if l.endswith(f"| {module}"))
+        ms = int(line.split("|")[1]) / 1000
+        best = ms if best is None else min(best, ms)
+    return best, json.loads(result.stdout)
+
+
+@pytest.mark.parametrize(
+    "module",
+    [
+        "vf2symbols.vf2symbols",
+        "vf2symbols.svg2symbols",
+        "vf2symbols.write_symbol_from_fonts",
+        "vf2symbols.write_symbol_from_svg",
+        "vf2symbols.write_symbol_from_svgs",
+        "vf2symbols.client",
+    ],
+)
+def test_startup_budget(module):
+    ms, modules = _import(module)
+
+    heavy = [
+        m
+        for m in modules
+        if any(m == h or m.startswith(h + ".") for h in _HEAVY_MODULES)
+    ]
+    assert not heavy, f"{module} imports {', '.join(sorted(heavy))}"
+    assert ms < _BUDGET_MS, f"{module} took {ms:.0f}ms to import"
@@ -0,0 +1,58 @@
+"""Tests for vf2symbols.svg_icon"""
+from fontTools import svgLib
+from fontTools.pens.recordingPen import RecordingPen
+from picosvg.svg import SVG
+
+import pytest
+
+from vf2symbols import svg_icon
+
+# Shapes, transforms, strokes and clips that topicosvg() rewrites as paths
+_UNNORMALIZED_SVG = """\
+<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 24 24">
+  <defs>
+    <clipPath id="clip"><rect x="2" y="2" width="16" height="16"/></clipPath>
+  </defs>
+  <g transform="translate(2 1) rotate(15)">
+    <circle cx="8" cy="8" r="6"/>
+    <rect x="10" y="10" width="8" height="4" rx="1"/>
+  </g>
+  <path d="M2 20 h20" stroke="black" stroke-width="2" fill="none"/>
+  <ellipse cx="12" cy="12" rx="10" ry="4" clip-path="url(#clip)"/>
+</svg>
+"""
+
+
+def _recording(drawable):
+    pen = RecordingPen()
+    drawable.draw(pen)
+    return pen.value
+
+
+@pytest.mark.parametrize(
+    "pico",
+    [
+        *(
+            SVG.parse("./tests/" + svg).topicosvg()
+            for svg in (
+                "sample.svg",
+                "40px.svg",
+                "20px_with_viewbox.svg",
+                "24px_invisible_bounding_box.svg",
+            )
+        ),
+        SVG.fromstring(_UNNORMALIZED_SVG).topicosvg(),
+    ],
+)
+def test_pico_paths_draw_as_svg_path(pico):
+    drawn = _recording(svg_icon.PicoPaths.from_pico(pico))
+    expected = _recording(svgLib.SVGPath.fromstring(pico.tostring()))
+    assert expected
+    assert drawn == expected
+
+
+def test_pico_paths_round_trip():
+    paths = svg_icon.PicoPaths.from_pico(SVG.parse("./tests/40px.svg").topicosvg())
+    restored = svg_icon.PicoPaths.fromstring(paths.tostring())
+    assert restored.view_box == paths.view_box
+    assert _recording(restored) == _recording(paths)
@@ -0,0 +1,56 @@
+"""Tests for vf2symbols.symbol"""
+from fontTools.pens.recordingPen import RecordingPen
+from fontTools.pens.svgPathPen import SVGPathPen
+from picosvg.geometric_types import Rect
+
+import pytest
+
+from vf2symbols.symbol import Symbol
+
+
+def _square():
+    pen = RecordingPen()
+    pen.moveTo((0, 0))
+    pen.lineTo((10, 0))
+    pen.lineTo((10, 10))
+    pen.closePath()
+    return pen
+
+
+def test_symbols_do_not_share_template():
+    drawn = Symbol()
+    drawn.write_icon("Bold-M", _square(), SVGPathPen(None), Rect(0, 0, 10, 10))
+    drawn.drop_empty_icons()
+
+    assert drawn.tostring() != Symbol().tostring()
+    assert Symbol().tostring() == Symbol().tostring()
+    assert len(drawn.symbol.xpath('//svg:g[@id="Bold-M"]/*')) == 1
+    assert not Symbol().symbol.xpath('//svg:g[@id="Bold-M"]/*')
+
+
+def test_unknown_variant():
+    with pytest.raises(ValueError):
+        Symbol().write_icon("Bold-XL", _square(), SVGPathPen(None), Rect(0, 0, 1, 1))
+
+
+def test_drop_empty_icons():
+    drawn = Symbol()
+    drawn.write_icon("Bold-M", _square(), SVGPathPen(None), Rect(0, 0, 10, 10))
+    variants = '//svg:g[@id="Symbols"]/svg:g'
+    assert len(drawn.symbol.xpath(variants)) == 27
+
+    drawn.drop_empty_icons()
+    # Drawing into a dropped group doesn't bring it back
+    drawn.write_icon("Bold-S", _square(), SVGPathPen(None), Rect(0, 0, 10, 10))
+    assert [g.get("id") for g in drawn.symbol.xpath(variants)] == ["Bold-M"]
+    assert not drawn.symbol.xpath("//svg:g[not(*)]")
+
+
+def test_write_to(tmpdir, capfd):
+    drawn = Symbol()
+    drawn.write_icon("Bold-M", _square(), SVGPathPen(None), Rect(0, 0, 10, 10))
+    drawn.write_to(str(tmpdir / "symbol.svg"))
+    drawn.write_to(None)
+
+    assert (tmpdir / "symbol.svg").read_binary() == drawn.tobytes()
+    assert capfd.readouterr().out == drawn.tostring() + "\n"
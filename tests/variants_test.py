@@ -0,0 +1,81 @@
+"""Tests for vf2symbols.variants"""
+from fontTools import ttLib
+from fontTools.ttLib.tables._f_v_a_r import Axis
+
+import pytest
+
+from vf2symbols import batch
+from vf2symbols import icon_font
+from vf2symbols import variants
+
+_SAMPLE_FONT = "./tests/sample_icons_vf.ttf"
+
+
+def _sample_font(opsz=False):
+    ttfont = ttLib.TTFont(_SAMPLE_FONT)
+    if opsz:
+        axis = Axis()
+        axis.axisTag = "opsz"
+        axis.minValue, axis.defaultValue, axis.maxValue = 18, 24, 48
+        ttfont["fvar"].axes.append(axis)
+    return ttfont
+
+
+def _plan(ttfont, scales=variants.SYMBOL_SCALES):
+    return variants.plan(ttfont, icon_font.wght_range(ttfont), scales)
+
+
+def test_variants_without_opsz_share_instances():
+    instances = _plan(_sample_font())
+
+    assert len(instances) == 9
+    assert instances[0] == variants.Instance(
+        "Ultralight-M", {"wght": 100}, ("Ultralight-S", "Ultralight-M", "Ultralight-L")
+    )
+    assert len(variants.symbol_locations(instances)) == 27
+
+
+def test_variants_with_opsz_follow_scale():
+    instances = _plan(_sample_font(opsz=True))
+
+    assert len(instances) == 27
+    assert [(i.name, i.location) for i in instances[:3]] == [
+        ("Ultralight-S", {"wght": 100, "opsz": 18.94}),
+        ("Ultralight-M", {"wght": 100, "opsz": 24}),
+        ("Ultralight-L", {"wght": 100, "opsz": 30.96}),
+    ]
+    assert all(len(i.symbol_names) == 1 for i in instances)
+
+
+@pytest.mark.parametrize(
+    "scales, expected",
+    [
+        (["M"], ["Regular-M", "Bold-M"]),
+        (["L", "S"], ["Regular-S", "Regular-L", "Bold-S", "Bold-L"]),
+    ],
+)
+def test_plan_weights_and_scales(scales, expected):
+    ttfont = _sample_font()
+    instances = variants.plan(ttfont, range(400, 701, 300), scales)
+
+    assert list(variants.symbol_locations(instances)) == expected
+
+
+def test_static_font_plan():
+    ttfont = _sample_font()
+    del ttfont["fvar"]
+
+    (instance,) = variants.plan(ttfont, range(400, 401))
+    assert instance.location == {"wght": 400}
+    assert instance.symbol_names == ("Regular-S", "Regular-M", "Regular-L")
+
+
+def test_variants_at_a_location_share_glyph_set():
+    ttfont = _sample_font()
+    loaded = batch.load_variable_instances(
+        ttfont, variants.symbol_locations(_plan(ttfont, ["S", "M"]))
+    )
+
+    assert len(loaded) == 18
+    assert loaded["Bold-S"].glyph_set is loaded["Bold-M"].glyph_set
+    assert loaded["Bold-M"].glyph_set is not loaded["Black-M"].glyph_set
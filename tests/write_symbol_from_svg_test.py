@@ -11,9 +11,33 @@ from vf2symbols import write_symbol_from_svg
 def test_single_svg_matches_baseline(tmpdir):
     flags.FLAGS(sys.argv)
     actual_output = tmpdir / "temp_file"
-    with flagsaver.flagsaver(out=actual_output):
+    with flagsaver.flagsaver(out=[str(actual_output)]):
         write_symbol_from_svg.main(["", "./tests/sample.svg"])
     with open(actual_output) as actual, open(
         "./tests/sample_symbol_baseline.svg"
     ) as expected:
         assert actual.read() == expected.read()
+
+
+def test_many_svgs(tmpdir):
+    flags.FLAGS(sys.argv)
+    svgs = ["./tests/sample.svg", "./tests/40px.svg"]
+    outs = [str(tmpdir / "sample_symbol.svg"), str(tmpdir / "40px_symbol.svg")]
+    with flagsaver.flagsaver(out=outs):
+        write_symbol_from_svg.main([""] + svgs)
+
+    with open(outs[0]) as actual, open(
+        "./tests/sample_symbol_baseline.svg"
+    ) as expected:
+        assert actual.read() == expected.read()
+    with flagsaver.flagsaver(out=[str(tmpdir / "expected.svg")]):
+        write_symbol_from_svg.main(["", svgs[1]])
+    with open(outs[1]) as actual, open(tmpdir / "expected.svg") as expected:
+        assert actual.read() == expected.read()
+
+
+def test_out_per_svg(tmpdir):
+    flags.FLAGS(sys.argv)
+    with flagsaver.flagsaver(out=[str(tmpdir / "a.svg")]):
+        with pytest.raises(SystemExit):
+            write_symbol_from_svg.main(["", "./tests/sample.svg", "./tests/40px.svg"])
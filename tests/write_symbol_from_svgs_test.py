@@ -11,7 +11,7 @@ from vf2symbols import write_symbol_from_svgs
 def test_multiple_svg_matches_baseline(tmpdir):
     flags.FLAGS(sys.argv)
     actual_output = tmpdir / "temp_file"
-    with flagsaver.flagsaver(out=actual_output):
+    with flagsaver.flagsaver(out=[str(actual_output)]):
         write_symbol_from_svgs.main(
             [
                 "",